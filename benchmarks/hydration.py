@@ -0,0 +1,184 @@
+"""
+Hydration micro-benchmarks for the msgspec, pydantic and attrs backends.
+
+Each backend is timed against the same generated documents for a set of
+collection sizes, the best of `--repeat` runs is reported for every operation.
+By default the benchmarks run against mongomock, pass `--uri` to run them
+against a real server (the database named in the URI is dropped afterwards).
+
+    python -m benchmarks.hydration --sizes 1000 100000
+    python -m benchmarks.hydration --uri mongodb://localhost:27017/mongospecs_bench --json results.json
+"""
+
+import argparse
+import json
+import time
+import typing as t
+from datetime import datetime, timedelta
+
+from mongospecs.utils import to_refs
+
+BACKENDS = ("msgspec", "pydantic", "attrs")
+
+# The number of lookups timed for `one`
+ONE_LOOKUPS = 1000
+
+
+def build_spec(backend: str) -> t.Any:
+    """Return the benchmark spec class for a backend"""
+    if backend == "msgspec":
+        from mongospecs.msgspec import Spec as MsgspecSpec
+
+        class MsgspecMonster(MsgspecSpec):
+            name: str
+            breed: str
+            age: int
+            dob: datetime
+            traits: list[str]
+            hoard: dict[str, int]
+
+        return MsgspecMonster
+
+    if backend == "pydantic":
+        from mongospecs.pydantic import Spec as PydanticSpec
+
+        class PydanticMonster(PydanticSpec):
+            name: str
+            breed: str
+            age: int
+            dob: datetime
+            traits: list[str]
+            hoard: dict[str, int]
+
+        return PydanticMonster
+
+    if backend == "attrs":
+        from attrs import define
+
+        from mongospecs.attrs import Spec as AttrsSpec
+
+        @define
+        class AttrsMonster(AttrsSpec):
+            name: str
+            breed: str
+            age: int
+            dob: datetime
+            traits: list[str]
+            hoard: dict[str, int]
+
+        return AttrsMonster
+
+    raise ValueError(f"Unknown backend {backend!r}")
+
+
+def make_documents(size: int) -> list[dict[str, t.Any]]:
+    """Return a deterministic list of documents to benchmark with"""
+    epoch = datetime(2000, 1, 1)
+    return [
+        {
+            "name": f"Monster {i:07d}",
+            "breed": ("Cold-drake", "Fire-drake", "Wyvern")[i % 3],
+            "age": i % 500,
+            "dob": epoch + timedelta(days=i % 10000),
+            "traits": ["irritable", "narcissistic"][: i % 3],
+            "hoard": {"gold": i * 10, "skulls": i % 100},
+        }
+        for i in range(size)
+    ]
+
+
+def best_of(repeat: int, run: t.Callable[[], t.Any], setup: t.Optional[t.Callable[[], t.Any]] = None) -> float:
+    """Return the fastest of `repeat` timed runs (setup isn't timed)"""
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def bench_backend(spec_cls: t.Any, size: int, repeat: int) -> dict[str, float]:
+    """Return the timings for each operation for one backend and size"""
+    documents = make_documents(size)
+    specs: list[t.Any] = []
+    timings: dict[str, float] = {}
+
+    def reset() -> None:
+        spec_cls.get_collection().drop()
+        specs[:] = [spec_cls(**d) for d in documents]
+
+    timings["insert_many"] = best_of(repeat, lambda: spec_cls.insert_many(specs), setup=reset)
+    timings["many"] = best_of(repeat, spec_cls.many)
+
+    ids = [spec._id for spec in specs[:ONE_LOOKUPS]]
+    timings["one"] = best_of(repeat, lambda: [spec_cls.one({"_id": id}) for id in ids])
+
+    def touch() -> None:
+        for spec in specs:
+            spec.age += 1
+
+    timings["update_many"] = best_of(repeat, lambda: spec_cls.update_many(specs, "age"), setup=touch)
+
+    timings["to_dict"] = best_of(repeat, lambda: [spec.to_dict() for spec in specs])
+    timings["to_json_type"] = best_of(repeat, lambda: [spec.to_json_type() for spec in specs])
+    timings["encode"] = best_of(repeat, lambda: [spec.encode() for spec in specs])
+
+    encoded = [spec.encode() for spec in specs]
+    decoder = specs[0]
+    timings["decode"] = best_of(repeat, lambda: [decoder.decode(data) for data in encoded])
+
+    timings["to_refs"] = best_of(repeat, lambda: [to_refs(spec.to_dict()) for spec in specs])
+
+    spec_cls.get_collection().drop()
+    return timings
+
+
+def connect(uri: t.Optional[str]) -> t.Any:
+    """Return a client for the benchmark database"""
+    if uri is None:
+        from mongomock import MongoClient as MockClient
+
+        return MockClient("mongodb://localhost:27017/mongospecs_bench")
+
+    from pymongo import MongoClient
+
+    return MongoClient(uri)
+
+
+def main(argv: t.Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=3, help="runs per operation, the fastest is reported")
+    parser.add_argument("--uri", help="a MongoDB URI to benchmark against instead of mongomock")
+    parser.add_argument("--json", dest="json_path", help="write the results to this file as JSON")
+    args = parser.parse_args(argv)
+
+    client = connect(args.uri)
+    results = []
+
+    print(f"{'backend':<10} {'size':>9} {'operation':<14} {'seconds':>10} {'docs/s':>12}")
+    try:
+        for size in args.sizes:
+            for backend in args.backends:
+                spec_cls = build_spec(backend)
+                spec_cls._client = client
+                spec_cls._collection = f"bench_{backend}"
+
+                for operation, seconds in bench_backend(spec_cls, size, args.repeat).items():
+                    count = min(size, ONE_LOOKUPS) if operation == "one" else size
+                    rate = count / seconds if seconds else float("inf")
+                    print(f"{backend:<10} {size:>9} {operation:<14} {seconds:>10.4f} {rate:>12.0f}")
+                    results.append({"backend": backend, "size": size, "operation": operation, "seconds": seconds})
+    finally:
+        client.drop_database(client.get_default_database().name)
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
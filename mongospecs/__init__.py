@@ -3,15 +3,25 @@ from pymongo import DESCENDING as DESC
 from pymongo.collation import Collation
 from pymongo.operations import IndexModel
 
+from mongospecs.helpers.aggregation import Pipeline
 from mongospecs.helpers.empty import Empty
+from mongospecs.helpers.identity import IdentityMap, identity_map
+from mongospecs.helpers.instrumentation import QueryListener, QueryTiming
 from mongospecs.helpers.ops import All, And, ElemMatch, Exists, In, Nor, Not, NotIn, Or, Size, SortBy, Type
-from mongospecs.helpers.pagination import Page, Paginator
+from mongospecs.helpers.pagination import AsyncKeysetPaginator, AsyncPaginator, KeysetPaginator, Page, Paginator
+from mongospecs.helpers.projection import ProjectionPlan
 from mongospecs.helpers.query import Q
 from mongospecs.helpers.se import MongoDecoder, MongoEncoder
+from mongospecs.helpers.templates import Param, QueryTemplate, compile_query
 
 __all__ = [
     # Queries
     "Q",
+    "Param",
+    "QueryTemplate",
+    "compile_query",
+    # Aggregation
+    "Pipeline",
     # Operators
     "All",
     "ElemMatch",
@@ -37,7 +47,18 @@ __all__ = [
     "DESC",
     # Empty
     "Empty",
+    # Identity map
+    "IdentityMap",
+    "identity_map",
+    # Instrumentation
+    "QueryListener",
+    "QueryTiming",
     # Pagination
     "Paginator",
+    "AsyncPaginator",
+    "KeysetPaginator",
+    "AsyncKeysetPaginator",
     "Page",
+    # Projections
+    "ProjectionPlan",
 ]
@@ -1,5 +1,6 @@
 import typing as t
 from datetime import datetime
+from functools import lru_cache
 
 import attrs
 import msgspec
@@ -7,11 +8,11 @@ from attr import AttrsInstance
 from bson import ObjectId
 from pymongo import MongoClient
 
-from mongospecs.base import SpecBase, SubSpecBase
+from mongospecs.base import AsyncSpecBase, SpecBase, SubSpecBase
 from mongospecs.helpers.empty import Empty
 from mongospecs.helpers.se import MongoEncoder, mongo_dec_hook
 
-__all__ = ["Spec", "SubSpec"]
+__all__ = ["AsyncSpec", "Spec", "SubSpec"]
 
 T = t.TypeVar("T")
 
@@ -24,6 +25,19 @@ def attrs_serializer(inst: type, field: attrs.Attribute, value: t.Any) -> t.Any:
     return value
 
 
+@lru_cache(maxsize=None)
+def _construct_fields(cls: type) -> t.Optional[tuple[tuple[str, t.Any, bool], ...]]:
+    """
+    Return the name, default and whether it's an init field for each of an
+    attrs class's fields, or None if none of the init fields have validators
+    or converters (the generated `__init__` is then the cheapest constructor).
+    """
+    fields = attrs.fields(t.cast(type[AttrsInstance], cls))
+    if not any(f.validator is not None or f.converter is not None for f in fields if f.init):
+        return None
+    return tuple((f.name, f.default, f.init) for f in fields)
+
+
 @attrs.define(kw_only=True)
 class Spec(SpecBase):
     _id: t.Optional[ObjectId] = attrs.field(default=None, alias="_id", repr=True)  # type: ignore[assignment]
@@ -37,8 +51,57 @@ class Spec(SpecBase):
         self._id = value
 
     @classmethod
-    def get_fields(cls) -> set[str]:
-        return {f.name for f in attrs.fields(cls)}
+    def _field_names(cls) -> t.Iterable[str]:
+        return [f.name for f in attrs.fields(cls)]
+
+    @classmethod
+    def _build_view(cls, name: str, fields: list[str]) -> t.Any:
+        spec_fields = attrs.fields_dict(cls)
+        attributes = {}
+        for field in fields:
+            f = spec_fields[field]
+            attributes[field] = attrs.field(
+                default=f.default,
+                validator=f.validator,
+                converter=f.converter,
+                repr=f.repr,
+                eq=f.eq,
+                metadata=f.metadata,
+                type=f.type,
+                alias=f.alias,
+            )
+
+        base = AsyncSpec if issubclass(cls, AsyncSpec) else Spec
+        view = attrs.make_class(name, attributes, bases=(base,), slots=True, kw_only=True)
+        view.__module__ = cls.__module__
+        return view
+
+    @classmethod
+    def _construct(cls, document: dict[str, t.Any]) -> "Spec":
+        """Build a spec from a trusted document, bypassing validators and converters"""
+        fields = _construct_fields(t.cast(type, cls))
+        if fields is None:
+            return cls(**document)
+
+        spec = cls.__new__(cls)
+        for name, default, init in fields:
+            if init and name in document:
+                value = document[name]
+            elif default is attrs.NOTHING:
+                if not init:
+                    # Non-init fields without a default are left unset (as by `__init__`)
+                    continue
+                raise TypeError(f"{cls.__name__} is missing the field {name!r}")
+            elif isinstance(default, attrs.Factory):  # type: ignore[arg-type]
+                value = default.factory(spec) if default.takes_self else default.factory()
+            else:
+                value = default
+            object.__setattr__(spec, name, value)
+
+        post_init = getattr(spec, "__attrs_post_init__", None)
+        if post_init is not None:
+            post_init()
+        return spec
 
     def encode(self, **encode_kwargs: t.Any) -> bytes:
         return msgspec.json.encode(self, **encode_kwargs) if encode_kwargs else MongoEncoder.encode(self)
@@ -60,6 +123,11 @@ class Spec(SpecBase):
         return attrs.astuple(self)
 
 
+@attrs.define(kw_only=True)
+class AsyncSpec(AsyncSpecBase, Spec):  # type: ignore[misc]
+    """A `Spec` whose database operations are coroutines, for use with an asyncio client"""
+
+
 @attrs.define(kw_only=True)
 class SubSpec(SubSpecBase):
     _parent: t.ClassVar[t.Any] = Spec
@@ -3,6 +3,10 @@ from __future__ import annotations
 import typing as t
 from copy import deepcopy
 
+from mongospecs.mixins.async_crud import AsyncCrudMixin
+from mongospecs.mixins.async_index import AsyncIndexManagementMixin
+from mongospecs.mixins.async_integrity import AsyncIntegrityMixin
+from mongospecs.mixins.async_session import AsyncSessionTransactionMixin
 from mongospecs.mixins.crud import CrudMixin
 from mongospecs.mixins.index import IndexManagementMixin
 from mongospecs.mixins.integrity import IntegrityMixin
@@ -17,12 +21,34 @@ class SpecBase(CrudMixin, IndexManagementMixin, IntegrityMixin, SessionTransacti
     pass
 
 
+class AsyncSpecBase(
+    AsyncCrudMixin, AsyncIndexManagementMixin, AsyncIntegrityMixin, AsyncSessionTransactionMixin, SignalMixin
+):
+    """
+    Asyncio counterpart of `SpecBase`. Every database operation is a coroutine
+    and `_client` is expected to be an asyncio client (motor's
+    `AsyncIOMotorClient` or pymongo's `AsyncMongoClient`).
+    """
+
+
 class SubSpecBase(SubSpecBaseType):
     _parent: t.ClassVar[t.Any] = SpecBase
 
     @classmethod
     def _apply_projection(cls, documents: list[t.Any], projection: t.Mapping[str, t.Any]) -> None:
-        # Find reference and sub-spec mappings
+        references, subs = cls._split_projection(projection)
+
+        # Dereference the documents (if required)
+        if references:
+            cls._parent._dereference(documents, references)
+
+        # Add sub-specs to the documents (if required)
+        if subs:
+            cls._parent._apply_sub_specs(documents, subs)
+
+    @classmethod
+    def _split_projection(cls, projection: t.Mapping[str, t.Any]) -> tuple[dict[str, t.Any], dict[str, t.Any]]:
+        """Find the reference and sub-spec mappings within a projection"""
         references = {}
         subs = {}
         for key, value in deepcopy(projection).items():
@@ -35,13 +61,7 @@ class SubSpecBase(SubSpecBaseType):
             elif "$sub" in value or "$sub." in value:
                 subs[key] = value
 
-        # Dereference the documents (if required)
-        if references:
-            cls._parent._dereference(documents, references)
-
-        # Add sub-specs to the documents (if required)
-        if subs:
-            cls._parent._apply_sub_specs(documents, subs)
+        return references, subs
 
     @classmethod
     def _projection_to_paths(cls, root_key: str, projection: t.Mapping[str, t.Any]) -> t.Any:
@@ -0,0 +1,165 @@
+"""
+Aggregation pipelines, built stage by stage and run with `Spec.aggregate`,
+e.g:
+
+    pipeline = Pipeline().match(Q.breed == "Fire-drake").sort(SortBy(Q.name)).limit(10)
+
+    Dragon.aggregate(pipeline, projection={"lair": {"$ref": Lair}})
+"""
+
+import typing as t
+
+from mongospecs.helpers.query import Condition, Group
+from mongospecs.utils import copy_refs
+
+__all__ = (
+    # Classes
+    "Pipeline",
+    "ReferenceJoin",
+    # Functions
+    "join_references",
+)
+
+
+class Pipeline:
+    """
+    An aggregation pipeline. Each stage method returns a new pipeline with the
+    stage appended, so a pipeline can be shared as the base of others.
+    """
+
+    __slots__ = ("stages",)
+
+    def __init__(self, stages: t.Optional[t.Iterable[dict[str, t.Any]]] = None) -> None:
+        self.stages: list[dict[str, t.Any]] = list(stages or [])
+
+    def __repr__(self) -> str:
+        return f"Pipeline({self.stages!r})"
+
+    def __iter__(self) -> t.Iterator[dict[str, t.Any]]:
+        return iter(self.stages)
+
+    def __len__(self) -> int:
+        return len(self.stages)
+
+    def to_list(self) -> list[dict[str, t.Any]]:
+        """Return the stages of the pipeline"""
+        return list(self.stages)
+
+    def stage(self, stage: dict[str, t.Any]) -> "Pipeline":
+        """Append a stage (as a raw dictionary)"""
+        return Pipeline([*self.stages, stage])
+
+    def match(self, filter: t.Any) -> "Pipeline":
+        """
+        Append a `$match` stage for a filter (a `Q` expression or a dictionary),
+        the filter is copied so later changes to it don't change the pipeline.
+        """
+        if isinstance(filter, (Condition, Group)):
+            filter = filter.to_dict()
+
+        return self.stage({"$match": copy_refs(filter or {})})
+
+    def project(self, projection: t.Mapping[str, t.Any]) -> "Pipeline":
+        """Append a `$project` stage"""
+        return self.stage({"$project": dict(projection)})
+
+    def add_fields(self, **fields: t.Any) -> "Pipeline":
+        """Append an `$addFields` stage"""
+        return self.stage({"$addFields": fields})
+
+    def sort(self, sort: t.Union[t.Mapping[str, int], t.Iterable[tuple[str, int]]]) -> "Pipeline":
+        """Append a `$sort` stage, `sort` may be a list of sort instructions (see `SortBy`)"""
+        return self.stage({"$sort": dict(sort)})
+
+    def skip(self, skip: int) -> "Pipeline":
+        """Append a `$skip` stage"""
+        return self.stage({"$skip": skip})
+
+    def limit(self, limit: int) -> "Pipeline":
+        """Append a `$limit` stage"""
+        return self.stage({"$limit": limit})
+
+    def group(self, id: t.Any, **accumulators: t.Any) -> "Pipeline":
+        """Append a `$group` stage grouping by `id`"""
+        return self.stage({"$group": {"_id": id, **accumulators}})
+
+    def unwind(self, path: str, preserve_null_and_empty_arrays: bool = False) -> "Pipeline":
+        """Append an `$unwind` stage for a path (without the leading `$`)"""
+        unwind: dict[str, t.Any] = {"path": f"${path}"}
+        if preserve_null_and_empty_arrays:
+            unwind["preserveNullAndEmptyArrays"] = True
+        return self.stage({"$unwind": unwind})
+
+    def lookup(self, from_: t.Any, local_field: str, foreign_field: str, as_: str) -> "Pipeline":
+        """Append a `$lookup` stage, `from_` may be a collection name or a spec class"""
+        if not isinstance(from_, str):
+            from_ = from_.get_collection().name
+
+        return self.stage(
+            {"$lookup": {"from": from_, "localField": local_field, "foreignField": foreign_field, "as": as_}}
+        )
+
+    def count(self, field: str) -> "Pipeline":
+        """Append a `$count` stage"""
+        return self.stage({"$count": field})
+
+    def facet(self, **pipelines: t.Iterable[dict[str, t.Any]]) -> "Pipeline":
+        """Append a `$facet` stage with a (sub-)pipeline per output field"""
+        return self.stage({"$facet": {name: list(pipeline) for name, pipeline in pipelines.items()}})
+
+
+class ReferenceJoin(t.NamedTuple):
+    """A reference (`$ref`) projection resolved by a `$lookup` stage"""
+
+    path: str
+    """The path of the referencing field"""
+
+    ref: t.Any
+    """The referenced spec class"""
+
+    projection: dict[str, t.Any]
+    """The projection for the referenced specs"""
+
+    field: str
+    """The (temporary) field the referenced documents are looked up into"""
+
+    fields: t.Optional[frozenset[str]]
+    """The fields to trim the looked up documents to (if not projected by the lookup)"""
+
+
+def join_references(references: t.Mapping[str, t.Any]) -> tuple[list[dict[str, t.Any]], list[ReferenceJoin]]:
+    """
+    Return the `$lookup` stages that fetch the documents referenced by a set
+    of reference projections (keyed by path) server side, and the joins to
+    assign them to the documents with.
+
+    Projections selecting a subset of the referenced documents' fields are
+    applied within the lookup (which requires MongoDB 5.0+), otherwise the
+    referenced documents are trimmed to their spec's fields client side.
+    """
+    stages: list[dict[str, t.Any]] = []
+    joins: list[ReferenceJoin] = []
+    for path, projection in references.items():
+        if "$ref" not in projection:
+            continue
+
+        ref = projection["$ref"]
+        ref_projection = {k: v for k, v in projection.items() if k != "$ref"}
+        field = f"__join_{len(joins)}"
+
+        lookup: dict[str, t.Any] = {
+            "from": ref.get_collection().name,
+            "localField": path,
+            "foreignField": "_id",
+            "as": field,
+        }
+        fields: t.Optional[frozenset[str]] = ref.get_fields() | {"_id"}
+        ref_flat_projection = ref.projection_plan(ref_projection).projection
+        if ref_flat_projection != ref.projection_plan().projection:
+            lookup["pipeline"] = [{"$project": dict(ref_flat_projection)}]
+            fields = None
+
+        stages.append({"$lookup": lookup})
+        joins.append(ReferenceJoin(path, ref, ref_projection, field, fields))
+
+    return stages, joins
@@ -0,0 +1,404 @@
+"""
+Support for bulk writes.
+"""
+
+import typing as t
+from dataclasses import dataclass, field
+
+from blinker import signal
+from pymongo import DeleteOne, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from mongospecs.utils import to_refs
+
+__all__ = (
+    # Classes
+    "AsyncBulkWriter",
+    "BulkWriter",
+    "InsertChunk",
+    # Functions
+    "insert_error",
+)
+
+T = t.TypeVar("T")
+
+
+@dataclass
+class InsertChunk(t.Generic[T]):
+    """
+    The outcome of inserting one chunk of documents with a chunked
+    `insert_many`.
+    """
+
+    index: int
+    """The index of the chunk (from 0)"""
+
+    offset: int
+    """The offset of the chunk's first document from the first document of
+        the entire insert.
+    """
+
+    specs: list[T]
+    """The specs in the chunk"""
+
+    inserted: list[T] = field(default_factory=list)
+    """The specs that were inserted (Ids have been applied to these)"""
+
+    errors: list[dict[str, t.Any]] = field(default_factory=list)
+    """Any write errors for the chunk (indexes are relative to the chunk)"""
+
+    def __len__(self) -> int:
+        return len(self.specs)
+
+
+class _ChunkedInsert(t.Generic[T]):
+    """Collects the outcome of each chunk of a chunked `insert_many`"""
+
+    def __init__(self, on_chunk: t.Optional[t.Callable[[InsertChunk[T]], t.Any]]) -> None:
+        self.on_chunk = on_chunk
+        self.specs: list[T] = []
+        self.inserted: list[T] = []
+        self.errors: list[dict[str, t.Any]] = []
+
+    def complete(self, chunk: InsertChunk[T]) -> None:
+        """Add the outcome of a chunk (with error indexes made relative to the entire insert)"""
+        self.specs.extend(chunk.specs)
+        self.inserted.extend(chunk.inserted)
+        self.errors.extend({**error, "index": error["index"] + chunk.offset} for error in chunk.errors)
+        if self.on_chunk is not None:
+            self.on_chunk(chunk)
+
+    def result(self) -> list[T]:
+        """Return the specs, or raise any write errors as a single `BulkWriteError`"""
+        if self.errors:
+            raise insert_error(self.errors, len(self.inserted))
+        return self.specs
+
+
+def insert_error(errors: list[dict[str, t.Any]], inserted_count: int) -> BulkWriteError:
+    """Return a `BulkWriteError` reporting the write errors of a chunked insert"""
+    return BulkWriteError(
+        {
+            "writeErrors": errors,
+            "writeConcernErrors": [],
+            "nInserted": inserted_count,
+            "nUpserted": 0,
+            "nMatched": 0,
+            "nModified": 0,
+            "nRemoved": 0,
+            "upserted": [],
+        }
+    )
+
+
+# The signals sent before and after each kind of operation is written (upserts
+# are followed by `inserted` or `updated` depending on the outcome)
+_PRE_SIGNALS = {
+    "insert": "insert",
+    "update": "update",
+    "unset": "update",
+    "upsert": "update",
+    "delete": "delete",
+    "soft_delete": "soft_delete",
+}
+_POST_SIGNALS = {
+    "insert": "inserted",
+    "update": "updated",
+    "unset": "updated",
+    "delete": "deleted",
+    "soft_delete": "soft_deleted",
+}
+
+# A collected operation, its kind, spec and fields
+Operation = tuple[str, t.Any, tuple[str, ...]]
+
+
+class _BaseBulkWriter:
+    """
+    A unit of work that collects writes for specs (of one or more spec
+    classes) and flushes them as a single `bulk_write` per spec class.
+    """
+
+    def __init__(
+        self, spec_cls: t.Any, ordered: bool = True, transaction: bool = False, **bulk_write_kwargs: t.Any
+    ) -> None:
+        self.spec_cls = spec_cls
+        self.ordered = ordered
+        self.transaction = transaction
+        self.bulk_write_kwargs = bulk_write_kwargs
+        self._operations: dict[t.Any, list[Operation]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(operations) for operations in self._operations.values())
+
+    def insert(self, spec: t.Any) -> None:
+        """Insert a spec"""
+        self._add("insert", spec)
+
+    def update(self, spec: t.Any, *fields: str) -> None:
+        """Update a spec, optionally only the given fields"""
+        self._add("update", spec, fields, require_id=True)
+
+    def unset(self, spec: t.Any, *fields: str) -> None:
+        """Unset the given fields of a spec (they're cleared when flushed)"""
+        self._add("unset", spec, fields, require_id=True)
+
+    def upsert(self, spec: t.Any, *fields: str) -> None:
+        """
+        Atomically upsert a spec by its `_id` (specs without one are inserted),
+        see `upsert` with `atomic=True`.
+        """
+        self._add("upsert" if spec._id else "insert", spec, fields)
+
+    def delete(self, spec: t.Any) -> None:
+        """Delete a spec"""
+        self._add("delete", spec, require_id=True)
+
+    def soft_delete(self, spec: t.Any) -> None:
+        """Soft delete a spec"""
+        self._add("soft_delete", spec, require_id=True)
+
+    def clear(self) -> None:
+        """Discard any operations that haven't been flushed"""
+        self._operations.clear()
+
+    def _add(self, operation: str, spec: t.Any, fields: tuple[str, ...] = (), require_id: bool = False) -> None:
+        if require_id and not spec._id:
+            raise ValueError(f"Can't {operation.replace('_', ' ')} documents without `_id`")
+        self._operations.setdefault(spec.__class__, []).append((operation, spec, fields))
+
+    def _take(self) -> list[tuple[t.Any, list[Operation]]]:
+        """Return the operations to flush grouped by spec class"""
+        operations = list(self._operations.items())
+        self._operations = {}
+        return operations
+
+    def _session_kwargs(self, session: t.Any) -> dict[str, t.Any]:
+        kwargs = dict(self.bulk_write_kwargs, ordered=self.ordered)
+        if session is not None:
+            kwargs["session"] = session
+        return kwargs
+
+    @staticmethod
+    def _complete(written: list[tuple[t.Callable[[t.Any], None], t.Any]]) -> list[t.Any]:
+        """Complete the written operations and return the `bulk_write` results"""
+        for complete, result in written:
+            complete(result)
+        return [result for _, result in written if result is not None]
+
+    @staticmethod
+    def _prepare(
+        spec_cls: t.Any, operations: list[Operation], ordered: bool
+    ) -> tuple[list[t.Any], t.Callable[[t.Any], None]]:
+        """
+        Send the pre-write signals for a spec class' operations and return the
+        requests to write along with a function that completes the operations
+        (updating the specs and sending the post-write signals) given the
+        result of the write. Given the `BulkWriteError` of a failed write only
+        the operations that were applied are completed.
+        """
+        # Send the pre-write signals, once per signal
+        pre_signals: dict[str, list[t.Any]] = {}
+        for operation, spec, _ in operations:
+            pre_signals.setdefault(_PRE_SIGNALS[operation], []).append(spec)
+        for name, specs in pre_signals.items():
+            signal(name).send(spec_cls, specs=specs)
+
+        requests: list[t.Any] = []
+        # The operations along with the index of their request (if any)
+        written: list[tuple[str, t.Any, tuple[str, ...], t.Any, t.Optional[int]]] = []
+        for operation, spec, fields in operations:
+            index: t.Optional[int] = len(requests)
+            if operation == "insert":
+                document = spec_cls._prepare_inserts([spec])[0]
+                requests.append(InsertOne(document))
+                written.append((operation, spec, fields, document["_id"], index))
+
+            elif operation == "update":
+                spec_document = spec.to_dict()
+                if fields:
+                    field_paths = spec_cls.get_metadata().paths(fields)
+                    document = to_refs({p.path: p.get(spec_document) for p in field_paths})
+                else:
+                    document = spec_cls._changed_document(spec, to_refs(spec_document))
+                document.pop("_id", None)
+                if document or not spec_cls._track_changes:
+                    requests.append(UpdateOne({"_id": spec._id}, {"$set": document}))
+                else:
+                    index = None
+                written.append((operation, spec, fields, document, index))
+
+            elif operation == "unset":
+                # The fields are cleared once the write succeeds
+                requests.append(UpdateOne({"_id": spec._id}, {"$unset": {field: True for field in fields}}))
+                written.append((operation, spec, fields, None, index))
+
+            elif operation == "upsert":
+                filter, document = spec_cls._upsert_operation(spec, fields)
+                requests.append(UpdateOne(filter, document, upsert=True))
+                written.append((operation, spec, fields, document["$set"] if fields else None, index))
+
+            elif operation == "delete":
+                requests.append(DeleteOne({"_id": spec._id}))
+                written.append((operation, spec, fields, None, index))
+
+            else:
+                requests.append(UpdateOne({"_id": spec._id}, {"$set": {"deleted": True}}))
+                written.append((operation, spec, fields, None, index))
+
+        def complete(result: t.Any) -> None:
+            # Requests with write errors (and those after the first error of an
+            # ordered write) weren't applied
+            if isinstance(result, BulkWriteError):
+                upserted_ids = {upsert["_id"] for upsert in result.details.get("upserted", [])}
+                failed = {error["index"] for error in result.details.get("writeErrors", [])}
+                stop = min(failed) if ordered and failed else len(requests)
+            else:
+                upserted_ids = set(((result and result.upserted_ids) or {}).values())
+                failed, stop = set(), len(requests)
+
+            post_signals: dict[str, list[t.Any]] = {}
+            for operation, spec, fields, value, index in written:
+                if index is not None and (index >= stop or index in failed):
+                    continue
+                if operation == "insert":
+                    spec._id = value
+                    spec_cls._identity_map_add([spec])
+                    spec_cls._snapshot([spec])
+
+                elif operation == "upsert":
+                    if spec._id in upserted_ids:
+                        operation = "insert"
+                        spec_cls._identity_map_add([spec])
+                    else:
+                        operation = "update"
+                        spec_cls._identity_map_discard([spec])
+
+                    if value is None or operation == "insert":
+                        spec_cls._snapshot([spec])
+                    else:
+                        spec_cls._snapshot_paths(spec, value)
+
+                elif operation == "unset":
+                    spec._clear_fields(fields)
+                    spec_cls._identity_map_discard([spec])
+                    spec_cls._snapshot_paths(spec, {field: getattr(spec, field) for field in fields})
+
+                else:
+                    spec_cls._identity_map_discard([spec])
+                    if operation == "update" and fields:
+                        spec_cls._snapshot_paths(spec, value)
+                    elif operation == "update":
+                        spec_cls._snapshot([spec])
+
+                post_signals.setdefault(_POST_SIGNALS[operation], []).append(spec)
+
+            # Send the post-write signals, once per signal
+            for name, specs in post_signals.items():
+                signal(name).send(spec_cls, specs=specs)
+
+        return requests, complete
+
+
+class BulkWriter(_BaseBulkWriter):
+    """
+    A unit of work for specs, writes are collected and then flushed as a
+    single `bulk_write` per spec class, e.g:
+
+        with Dragon.bulk() as bulk:
+            bulk.insert(dragon)
+            bulk.update(lair, "name")
+            bulk.delete(old_dragon)
+
+    Operations are flushed when the block exits (unless an exception is
+    raised), or by calling `flush`. The existing signals are sent once per
+    spec class and signal for each flush. If `transaction` is True the writes
+    are made inside a transaction (and completed once it's committed),
+    otherwise if a write fails the operations written before it, and those of
+    the failed write that were applied, are still completed.
+    """
+
+    def __enter__(self) -> "BulkWriter":
+        return self
+
+    def __exit__(self, exc_type: t.Any, exc_value: t.Any, traceback: t.Any) -> None:
+        if exc_type is None:
+            self.flush()
+        else:
+            self.clear()
+
+    def flush(self) -> list[t.Any]:
+        """Write the collected operations and return the `bulk_write` results"""
+        batches = [
+            (spec_cls, *self._prepare(spec_cls, operations, self.ordered)) for spec_cls, operations in self._take()
+        ]
+        written: list[tuple[t.Callable[[t.Any], None], t.Any]] = []
+
+        def write(session: t.Any) -> None:
+            kwargs = self._session_kwargs(session)
+            for spec_cls, requests, complete in batches:
+                result = spec_cls.get_collection().bulk_write(requests, **kwargs) if requests else None
+                written.append((complete, result))
+
+        if self.transaction:
+            with self.spec_cls.transaction() as session:
+                write(session)
+        else:
+            try:
+                write(None)
+            except BaseException as error:
+                # Complete the writes made before the failure, and the
+                # operations of the failed write that were applied
+                if isinstance(error, BulkWriteError):
+                    written.append((batches[len(written)][2], error))
+                self._complete(written)
+                raise
+
+        return self._complete(written)
+
+
+class AsyncBulkWriter(_BaseBulkWriter):
+    """
+    The async counterpart of `BulkWriter`, used as an async context manager:
+
+        async with Dragon.bulk() as bulk:
+            bulk.insert(dragon)
+    """
+
+    async def __aenter__(self) -> "AsyncBulkWriter":
+        return self
+
+    async def __aexit__(self, exc_type: t.Any, exc_value: t.Any, traceback: t.Any) -> None:
+        if exc_type is None:
+            await self.flush()
+        else:
+            self.clear()
+
+    async def flush(self) -> list[t.Any]:
+        """Write the collected operations and return the `bulk_write` results"""
+        batches = [
+            (spec_cls, *self._prepare(spec_cls, operations, self.ordered)) for spec_cls, operations in self._take()
+        ]
+        written: list[tuple[t.Callable[[t.Any], None], t.Any]] = []
+
+        async def write(session: t.Any) -> None:
+            kwargs = self._session_kwargs(session)
+            for spec_cls, requests, complete in batches:
+                result = await spec_cls.get_collection().bulk_write(requests, **kwargs) if requests else None
+                written.append((complete, result))
+
+        if self.transaction:
+            async with self.spec_cls.transaction() as session:
+                await write(session)
+        else:
+            try:
+                await write(None)
+            except BaseException as error:
+                # Complete the writes made before the failure, and the
+                # operations of the failed write that were applied
+                if isinstance(error, BulkWriteError):
+                    written.append((batches[len(written)][2], error))
+                self._complete(written)
+                raise
+
+        return self._complete(written)
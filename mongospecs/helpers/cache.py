@@ -0,0 +1,92 @@
+"""
+A read-through LRU/TTL cache for spec queries.
+"""
+
+import math
+import time
+import typing as t
+from collections import OrderedDict
+from collections.abc import Mapping
+from threading import Lock
+
+__all__ = (
+    # Classes
+    "QueryCache",
+)
+
+# Query arguments that make up a cache key, queries using any other argument
+# (e.g. `session` or `hint`) bypass the cache.
+CACHEABLE_KWARGS = frozenset(["projection", "sort", "skip", "limit", "trusted"])
+
+
+def freeze(value: t.Any) -> t.Any:
+    """Convert a filter/projection/sort value into a hashable equivalent"""
+    if isinstance(value, Mapping):
+        return (dict, tuple(sorted((k, freeze(v)) for k, v in value.items())))
+    elif isinstance(value, (list, tuple)):
+        return (list, tuple(freeze(v) for v in value))
+    return value
+
+
+class QueryCache:
+    """
+    A least-recently-used cache of query results with an optional time to live
+    (in seconds). Hit, miss and eviction counters are kept to help size it.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: t.Optional[float] = None) -> None:
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[t.Hashable, tuple[float, t.Any]] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: t.Hashable) -> tuple[bool, t.Any]:
+        """Return a tuple of (found, value) for the key"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+
+    def set(self, key: t.Hashable, value: t.Any, ttl: t.Optional[float] = None) -> None:
+        """
+        Store a value against the key, evicting the least recently used entry
+        if full. A `ttl` overrides the cache's time to live for this entry.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl is not None else math.inf
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Remove all entries from the cache"""
+        with self._lock:
+            self._entries.clear()
+
+    def invalidate(self, sender: t.Any, **kwargs: t.Any) -> None:
+        """Signal receiver that clears the cache when its spec class is written to"""
+        self.clear()
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """Return the hit, miss and eviction counters and the current size"""
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "size": len(self)}
+
+    def __len__(self) -> int:
+        return len(self._entries)
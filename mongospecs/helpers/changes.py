@@ -0,0 +1,66 @@
+"""
+Snapshots of specs as last read from or written to the database, used to work
+out which fields an update needs to send.
+"""
+
+import typing as t
+import weakref
+
+__all__ = (
+    # Functions
+    "diff",
+    "discard_snapshot",
+    "get_snapshot",
+    "set_snapshot",
+)
+
+# Snapshots keyed by the `id()` of the spec they were taken of, entries are
+# removed when the spec is garbage collected.
+_snapshots: dict[int, tuple[weakref.ref[t.Any], dict[str, t.Any]]] = {}
+
+
+def set_snapshot(spec: t.Any, document: dict[str, t.Any]) -> None:
+    """Store a snapshot of a spec's document (specs that can't be weakly referenced aren't tracked)"""
+    key = id(spec)
+    try:
+        ref = weakref.ref(spec, lambda _: _snapshots.pop(key, None))
+    except TypeError:
+        return
+    _snapshots[key] = (ref, document)
+
+
+def get_snapshot(spec: t.Any) -> t.Optional[dict[str, t.Any]]:
+    """Return the snapshot for a spec (or None if it isn't tracked)"""
+    entry = _snapshots.get(id(spec))
+    if entry is None or entry[0]() is not spec:
+        return None
+    return entry[1]
+
+
+def discard_snapshot(spec: t.Any) -> None:
+    """Remove the snapshot for a spec"""
+    entry = _snapshots.get(id(spec))
+    if entry is not None and entry[0]() is spec:
+        del _snapshots[id(spec)]
+
+
+def diff(snapshot: dict[str, t.Any], document: dict[str, t.Any], prefix: str = "") -> dict[str, t.Any]:
+    """
+    Return the values in a document that differ from its snapshot keyed by
+    `.` separated path. Embedded documents are compared key by key (unless
+    keys have been removed from them), any other changed value (including
+    lists) is returned whole.
+    """
+    changes = {}
+    for key, value in document.items():
+        if key not in snapshot:
+            changes[prefix + key] = value
+            continue
+
+        previous = snapshot[key]
+        if isinstance(value, dict) and isinstance(previous, dict) and value and previous.keys() <= value.keys():
+            changes.update(diff(previous, value, f"{prefix}{key}."))
+        elif value != previous or type(value) is not type(previous):
+            changes[prefix + key] = value
+
+    return changes
@@ -0,0 +1,107 @@
+"""
+Per-class field metadata and precompiled `.` separated document paths.
+"""
+
+import typing as t
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+__all__ = (
+    # Classes
+    "FieldPath",
+    "SpecMetadata",
+    # Functions
+    "compile_path",
+)
+
+# The most compiled paths held by a spec class's metadata
+MAX_COMPILED_PATHS = 1024
+
+
+class FieldPath:
+    """
+    A precompiled `.` separated path to a value in a document, e.g
+    'parent_key.child_key.grandchild_key'.
+    """
+
+    __slots__ = ("path", "keys", "parent_keys", "leaf")
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.keys = tuple(path.split("."))
+        self.parent_keys = self.keys[:-1]
+        self.leaf = self.keys[-1]
+
+    def __repr__(self) -> str:
+        return f"FieldPath({self.path!r})"
+
+    def get(self, document: t.Mapping[str, t.Any]) -> t.Any:
+        """Return the value at the path (or None if the path is unpaved)"""
+        child: t.Any = document
+        for key in self.parent_keys:
+            child = child.get(key)
+            if child is None:
+                return None
+        return child.get(self.leaf)
+
+    def set(self, document: t.MutableMapping[str, t.Any], value: t.Any) -> None:
+        """Set the value at the path, paving it with empty documents as needed"""
+        child = document
+        for key in self.parent_keys:
+            if not isinstance(child.get(key), dict):
+                child[key] = {}
+            child = child[key]
+        child[self.leaf] = value
+
+    def replace(self, document: t.MutableMapping[str, t.Any], value: t.Any) -> None:
+        """Replace the value at a path that's known to exist"""
+        child = document
+        for key in self.parent_keys:
+            child = child[key]
+        child[self.leaf] = value
+
+    def remove(self, document: t.MutableMapping[str, t.Any]) -> None:
+        """Remove the value at the path (if there is one)"""
+        child: t.Any = document
+        for key in self.parent_keys:
+            child = child.get(key, {})
+            if not isinstance(child, dict):
+                return
+        child.pop(self.leaf, None)
+
+
+@lru_cache(maxsize=4096)
+def compile_path(path: str) -> FieldPath:
+    """Return the (cached) compiled path for a `.` separated path"""
+    return FieldPath(path)
+
+
+@dataclass(frozen=True)
+class SpecMetadata:
+    """Field metadata for a spec class, built once per class on first use"""
+
+    fields: frozenset[str]
+    """The names of the spec's fields"""
+
+    aliases: t.Mapping[str, str]
+    """The document keys for fields stored under a different name"""
+
+    compiled_paths: dict[str, FieldPath] = field(default_factory=dict, compare=False, repr=False)
+    """The compiled paths used with the spec (its fields' are compiled up front)"""
+
+    def __post_init__(self) -> None:
+        for name in (*self.fields, *self.aliases.values()):
+            self.compiled_paths.setdefault(name, FieldPath(name))
+
+    def path(self, path: str) -> FieldPath:
+        """Return the compiled path for a `.` separated path"""
+        compiled = self.compiled_paths.get(path)
+        if compiled is None:
+            compiled = compile_path(path)
+            if len(self.compiled_paths) < MAX_COMPILED_PATHS:
+                self.compiled_paths[path] = compiled
+        return compiled
+
+    def paths(self, paths: t.Iterable[str]) -> list[FieldPath]:
+        """Return the compiled paths for a list of `.` separated paths"""
+        return [self.path(path) for path in paths]
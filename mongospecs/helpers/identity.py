@@ -0,0 +1,82 @@
+"""
+An opt-in identity map that caches specs by Id for the duration of a context.
+"""
+
+import typing as t
+from collections.abc import Hashable
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+__all__ = (
+    # Classes
+    "IdentityMap",
+    # Functions
+    "identity_map",
+    "get_identity_map",
+)
+
+
+class IdentityMap:
+    """
+    A cache of specs keyed by spec class and Id. Within an `identity_map()`
+    block, `one`/`by_id` lookups by Id and dereferencing are served from the
+    map where possible, and the write methods keep it coherent.
+
+    Only specs loaded with the spec class's default projection are held, so a
+    narrowly projected read never answers a later full read.
+    """
+
+    def __init__(self) -> None:
+        self._specs: dict[tuple[type, t.Any], t.Any] = {}
+
+    def get(self, spec_cls: type, id: t.Any) -> t.Any:
+        """Return the spec with the given Id (or None if it isn't held)"""
+        if not isinstance(id, Hashable):
+            return None
+        return self._specs.get((spec_cls, id))
+
+    def add(self, spec: t.Any) -> None:
+        """Add a spec to the map (replacing any spec already held for the Id)"""
+        if spec._id and isinstance(spec._id, Hashable):
+            self._specs[(spec.__class__, spec._id)] = spec
+
+    def discard(self, spec_cls: type, id: t.Any) -> None:
+        """Remove the spec with the given Id from the map"""
+        if isinstance(id, Hashable):
+            self._specs.pop((spec_cls, id), None)
+
+    def clear(self) -> None:
+        """Remove all specs from the map"""
+        self._specs.clear()
+
+    def __contains__(self, key: tuple[type, t.Any]) -> bool:
+        return isinstance(key[1], Hashable) and key in self._specs
+
+    def __len__(self) -> int:
+        return len(self._specs)
+
+
+_identity_map: ContextVar[t.Optional[IdentityMap]] = ContextVar("mongospecs_identity_map", default=None)
+
+
+def get_identity_map() -> t.Optional[IdentityMap]:
+    """Return the identity map for the current context (if one is active)"""
+    return _identity_map.get()
+
+
+@contextmanager
+def identity_map() -> t.Iterator[IdentityMap]:
+    """
+    Activate an identity map for the current context (e.g. a web request):
+
+        with identity_map():
+            user = User.by_id(user_id)  # hits the database
+            user = User.by_id(user_id)  # served from the map
+
+    """
+    current = IdentityMap()
+    token = _identity_map.set(current)
+    try:
+        yield current
+    finally:
+        _identity_map.reset(token)
@@ -0,0 +1,214 @@
+"""
+Instrumentation of the reads specs send to the database. Each instrumented
+read is timed per phase and sent with the `query` signal, reads slower than a
+threshold are also logged (optionally with the server's query plan) and sent
+with the `slow_query` signal.
+"""
+
+import logging
+import time
+import typing as t
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from blinker import signal
+from pymongo import monitoring
+
+__all__ = (
+    # Classes
+    "Instrumentation",
+    "QueryListener",
+    "QueryTiming",
+    "Recording",
+    # Functions
+    "explain_command",
+)
+
+logger = logging.getLogger(__name__)
+
+# The phases a read is timed in
+PHASES = ("network", "decode", "dereference", "sub_specs", "construct")
+
+# The recording of the read currently fetching from the database (used to
+# attribute the commands reported to `QueryListener`).
+_fetching: ContextVar[t.Optional["Recording"]] = ContextVar("mongospecs_fetching", default=None)
+
+
+@dataclass
+class Instrumentation:
+    """The instrumentation settings for a spec class"""
+
+    slow_query_threshold: t.Optional[float] = None
+    """Reads taking longer than this (in seconds) are logged as slow"""
+
+    explain: bool = False
+    """If True the query plan for slow reads is captured with `explain`"""
+
+
+@dataclass
+class QueryTiming:
+    """The timing of a read"""
+
+    spec_cls: t.Any
+    """The spec class that made the read"""
+
+    operation: str
+    """The method that made the read (e.g. `many` or `find_one`)"""
+
+    filter: t.Any
+    """The filter for the read"""
+
+    duration: float = 0.0
+    """The total time taken (in seconds)"""
+
+    phases: dict[str, float] = field(default_factory=lambda: dict.fromkeys(PHASES, 0.0))
+    """The time taken (in seconds) by each phase of the read. The `network`
+        time is only split from the time spent decoding BSON (`decode`) when
+        the client has a `QueryListener`, otherwise it includes it.
+    """
+
+    documents: int = 0
+    """The number of documents read"""
+
+    commands: list[dict[str, t.Any]] = field(default_factory=list)
+    """The commands sent for the read (as reported to `QueryListener`)"""
+
+    explain: t.Optional[dict[str, t.Any]] = None
+    """The query plan for the read (slow reads only, if enabled)"""
+
+    slow: bool = False
+    """True if the read exceeded the slow query threshold"""
+
+
+class Recording:
+    """Records the timing of a read"""
+
+    def __init__(self, instrumentation: Instrumentation, spec_cls: t.Any, operation: str, filter: t.Any) -> None:
+        self.instrumentation = instrumentation
+        self.timing = QueryTiming(spec_cls, operation, filter)
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str) -> t.Iterator[None]:
+        """Time a phase of the read"""
+        token = _fetching.set(self) if name == "network" else None
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timing.phases[name] += time.perf_counter() - start
+            if token is not None:
+                _fetching.reset(token)
+
+    def finish(self, documents: int) -> QueryTiming:
+        """Complete the timing of the read and return it"""
+        timing = self.timing
+        timing.duration = time.perf_counter() - self._start
+        timing.documents = documents
+
+        # Split the time spent fetching into the time the server round trips
+        # took and the time spent decoding the replies.
+        if timing.commands:
+            fetching = timing.phases["network"]
+            network = min(sum(command["duration"] for command in timing.commands), fetching)
+            timing.phases["network"] = network
+            timing.phases["decode"] = fetching - network
+
+        threshold = self.instrumentation.slow_query_threshold
+        timing.slow = threshold is not None and timing.duration > threshold
+        return timing
+
+    def report(self) -> None:
+        """Send the timing of the read with the `query` (and `slow_query`) signals"""
+        timing = self.timing
+        signal("query").send(timing.spec_cls, timing=timing)
+
+        if timing.slow:
+            logger.warning(
+                "Slow query: %s.%s(%r) took %.3fs (%s)",
+                timing.spec_cls.__name__,
+                timing.operation,
+                timing.filter,
+                timing.duration,
+                ", ".join(f"{name} {seconds:.3f}s" for name, seconds in timing.phases.items()),
+                extra={"timing": timing},
+            )
+            signal("slow_query").send(timing.spec_cls, timing=timing)
+
+
+class _NullRecording:
+    """Stands in for a `Recording` when instrumentation isn't enabled"""
+
+    _phase = nullcontext()
+
+    def phase(self, name: str) -> t.ContextManager[None]:
+        return self._phase
+
+
+NULL_RECORDING = _NullRecording()
+
+
+class QueryListener(monitoring.CommandListener):
+    """
+    A pymongo command listener that attributes the commands sent by
+    instrumented reads to them (so their network time can be split from BSON
+    decoding), e.g:
+
+        client = MongoClient(uri, event_listeners=[QueryListener()])
+
+    Pass `forward` to also receive every command event.
+    """
+
+    def __init__(self, forward: t.Optional[monitoring.CommandListener] = None) -> None:
+        self.forward = forward
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        if self.forward is not None:
+            self.forward.started(event)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._record(event, True)
+        if self.forward is not None:
+            self.forward.succeeded(event)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._record(event, False)
+        if self.forward is not None:
+            self.forward.failed(event)
+
+    def _record(self, event: t.Any, succeeded: bool) -> None:
+        recording = _fetching.get()
+        if recording is not None:
+            recording.timing.commands.append(
+                {
+                    "command_name": event.command_name,
+                    "request_id": event.request_id,
+                    "duration": event.duration_micros / 1e6,
+                    "succeeded": succeeded,
+                }
+            )
+
+
+def explain_command(collection: str, timing: QueryTiming, kwargs: dict[str, t.Any]) -> dict[str, t.Any]:
+    """Return the `explain` command for a read"""
+    filter = timing.filter or {}
+    if timing.operation == "count":
+        command: dict[str, t.Any] = {"count": collection, "query": filter}
+    elif timing.operation == "distinct":
+        command = {"distinct": collection, "key": kwargs["key"], "query": filter}
+    elif timing.operation == "aggregate":
+        # The filter for an aggregation is its pipeline
+        command = {"aggregate": collection, "pipeline": timing.filter or [], "cursor": {}}
+    else:
+        command = {"find": collection, "filter": filter}
+        for key in ("projection", "sort", "skip", "limit", "hint"):
+            if kwargs.get(key):
+                command[key] = kwargs[key]
+        for key in ("sort", "hint"):
+            if isinstance(command.get(key), list):
+                command[key] = dict(command[key])
+        if timing.operation in ("one", "find_one"):
+            command["limit"] = 1
+
+    return {"explain": command, "verbosity": "queryPlanner"}
@@ -2,26 +2,42 @@
 Support for paginating specs.
 """
 
+import asyncio
+import base64
+import itertools
 import math
 import typing as t
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import copy_context
 from copy import deepcopy
 from dataclasses import dataclass
 
-from mongospecs.base import SpecBase
+import bson
+from pymongo import ASCENDING
+
+from mongospecs.base import AsyncSpecBase, SpecBase
+from mongospecs.helpers.cache import QueryCache, freeze
 from mongospecs.helpers.query import Condition, Group
-from mongospecs.utils import to_refs
+from mongospecs.mixins.base import MongoBaseMixin
+from mongospecs.utils import copy_refs, to_refs
 
 __all__ = (
     # Exceptions
     "InvalidPage",
     # Classes
+    "AsyncKeysetPaginator",
+    "AsyncPaginator",
+    "KeysetPaginator",
     "Page",
     "Paginator",
 )
 
 
 T = t.TypeVar("T")
+CountMode = t.Literal["exact", "lazy", "estimated"]
 TSpec = t.TypeVar("TSpec", bound=SpecBase)
+TAsyncSpec = t.TypeVar("TAsyncSpec", bound=AsyncSpecBase)
 
 
 class InvalidPage(Exception):
@@ -30,6 +46,10 @@ class InvalidPage(Exception):
     """
 
 
+# Totals shared between paginators that set a `count_ttl`
+_count_cache = QueryCache()
+
+
 @dataclass
 class Page(t.Generic[T]):
     """
@@ -53,6 +73,12 @@ class Page(t.Generic[T]):
     prev: t.Optional[int]
     """Previous page number"""
 
+    next_token: t.Optional[str] = None
+    """Continuation token for the next page (keyset pagination only)"""
+
+    prev_token: t.Optional[str] = None
+    """Continuation token for the previous page (keyset pagination only)"""
+
     def __getitem__(self, i: int) -> T:
         return self.items[i]
 
@@ -67,17 +93,13 @@ class Page(t.Generic[T]):
         return self.offset + self.items.index(item)
 
 
-# TODO: REFACTOR
-
-
 @dataclass
-class Paginator(t.Generic[TSpec]):
+class _BasePaginator(t.Generic[T]):
     """
-    A pagination class for slicing query results into pages. This class is
-    designed to work with Spec classes.
+    Shared state and page arithmetic for `Paginator` and `AsyncPaginator`.
     """
 
-    spec_cls: type[TSpec]
+    spec_cls: type[T]
     """The spec class results are being paginated for"""
 
     filter: t.Optional[t.Union[dict[str, t.Any], Condition, Group]] = None
@@ -94,17 +116,61 @@ class Paginator(t.Generic[TSpec]):
     """
 
     filter_kwargs: t.Any = None
-    """Any additional filter arguments applied when selecting results such as sort and projection"""
+    """Any additional filter arguments applied when selecting results such as sort, projection and trusted"""
+
+    count_mode: CountMode = "exact"
+    """How the total number of results is counted:
+
+        - `exact` counts the results up front.
+        - `lazy` counts the results when the total is first read, pages are
+          served without it by selecting one extra result to find out if
+          there's a next page.
+        - `estimated` is served like `lazy`, but the total is read from the
+          collection's metadata (`estimated_document_count`) when there's no
+          filter, so it may be approximate.
+    """
 
-    def __post_init__(self) -> None:
-        # flattern the filter at this point which effectively deep copies.
+    count_ttl: t.Optional[float] = None
+    """If set, the total is shared between paginators (for the same spec class
+        and filter) for this many seconds.
+    """
+
+    prefetch: int = 0
+    """The number of pages fetched in the background ahead of the page being
+        processed when iterating over the paginator.
+    """
+
+    def _prepare_filter(self) -> None:
+        if self.count_mode not in t.get_args(CountMode):
+            raise ValueError(f"Unknown count mode {self.count_mode!r}")
+
+        if self.prefetch < 0:
+            raise ValueError("prefetch must not be negative")
+
+        # Flatten the filter and copy it, so later changes to the caller's
+        # filter (or the values within it) don't change the paginated query.
         if isinstance(self.filter, (Condition, Group)):
             self.filter = self.filter.to_dict()
-        else:
-            self.filter = to_refs(self.filter)
+        self.filter = copy_refs(self.filter)
+
+        self._counted = False
+
+    def _count_cache_key(self) -> t.Hashable:
+        return (self.spec_cls, self.count_mode == "estimated", freeze(self.filter))
+
+    def _cached_count(self) -> tuple[bool, t.Any]:
+        """Return a tuple of (found, count) for a total shared by another paginator"""
+        if self.count_ttl is None:
+            return False, None
+        return _count_cache.get(self._count_cache_key())
+
+    def _set_item_count(self, items_count: int) -> None:
+        if self.count_ttl is not None:
+            _count_cache.set(self._count_cache_key(), items_count, ttl=self.count_ttl)
 
         # Count the total results being paginated
-        self._items_count = self.spec_cls.count(self.filter)
+        self._items_count = items_count
+        self._counted = True
 
         # Calculated the number of pages
         total = self._items_count - self.orphans
@@ -113,7 +179,8 @@ class Paginator(t.Generic[TSpec]):
         # Create a list of page number that can be used to navigate the results
         self._page_numbers = range(1, self._page_count + 1)
 
-    def __getitem__(self, page_number: int) -> Page[TSpec]:
+    def _page_args(self, page_number: int) -> tuple[dict[str, t.Any], t.Optional[int], t.Optional[int]]:
+        """Return the filter arguments, next and previous page numbers for a page"""
         if page_number not in self._page_numbers:
             raise InvalidPage(page_number, self.page_count)
 
@@ -130,28 +197,436 @@ class Paginator(t.Generic[TSpec]):
         if self.item_count - (page_number * self.per_page) <= self.orphans:
             filter_args["limit"] += self.orphans
 
-        # Select the results for the page
-        items = self.spec_cls.many(self.filter, **filter_args)
+        return filter_args, next, prev
 
-        # Build the page
-        return Page(offset=filter_args["skip"], number=page_number, items=items, next=next, prev=prev)
+    def _lookahead_args(self, page_number: int) -> dict[str, t.Any]:
+        """Return the filter arguments for a page served without a total"""
+        if page_number < 1:
+            raise InvalidPage(page_number)
 
-    def __iter__(self) -> t.Generator[Page[TSpec], t.Any, t.Any]:
-        for page_number in self._page_numbers:
-            yield self[page_number]
+        # Select one extra result (beyond any orphans) to find out if there's
+        # another page.
+        filter_args = deepcopy(self.filter_kwargs) or {}
+        filter_args["skip"] = (page_number - 1) * self.per_page
+        filter_args["limit"] = self.per_page + self.orphans + 1
+
+        return filter_args
+
+    def _lookahead_page(self, page_number: int, items: list[t.Any]) -> Page[t.Any]:
+        """Build a page served without a total from the results selected for it"""
+        # Any orphans belong to the previous page
+        if page_number > 1 and len(items) <= self.orphans:
+            raise InvalidPage(page_number)
+
+        more = len(items) > self.per_page + self.orphans
+        if more:
+            items = items[: self.per_page]
+
+        return Page(
+            offset=(page_number - 1) * self.per_page,
+            number=page_number,
+            items=items,
+            next=page_number + 1 if more else None,
+            prev=page_number - 1 if page_number > 1 else None,
+        )
+
+    def _ensure_counted(self) -> None:
+        """Count the total results (if not already counted) before it's read"""
+
+    def _estimate_count(self) -> bool:
+        """Return True if the total should be read from the collection's metadata"""
+        return self.count_mode == "estimated" and not self.filter
 
     # Read-only properties
     @property
     def item_count(self) -> int:
         """Return the total number of items being paginated"""
+        self._ensure_counted()
         return self._items_count
 
     @property
     def page_count(self) -> int:
         """Return the total number of pages"""
+        self._ensure_counted()
         return self._page_count
 
     @property
     def page_numbers(self) -> range:
         """Return a list of page numbers"""
+        self._ensure_counted()
         return self._page_numbers
+
+
+@dataclass
+class Paginator(_BasePaginator[TSpec]):
+    """
+    A pagination class for slicing query results into pages. This class is
+    designed to work with Spec classes.
+    """
+
+    def __post_init__(self) -> None:
+        self._prepare_filter()
+        if self.count_mode == "exact":
+            self._ensure_counted()
+
+    def _ensure_counted(self) -> None:
+        if self._counted:
+            return
+
+        found, count = self._cached_count()
+        if not found:
+            if self._estimate_count():
+                count = self.spec_cls.get_collection().estimated_document_count()
+            else:
+                count = self.spec_cls.count(self.filter)
+
+        self._set_item_count(count)
+
+    def __getitem__(self, page_number: int) -> Page[TSpec]:
+        if self.count_mode != "exact":
+            items = self.spec_cls.many(self.filter, **self._lookahead_args(page_number))
+            return self._lookahead_page(page_number, items)
+
+        filter_args, next, prev = self._page_args(page_number)
+
+        # Select the results for the page
+        items = self.spec_cls.many(self.filter, **filter_args)
+
+        # Build the page
+        return Page(offset=filter_args["skip"], number=page_number, items=items, next=next, prev=prev)
+
+    def __iter__(self) -> t.Generator[Page[TSpec], t.Any, t.Any]:
+        if self.prefetch:
+            yield from self._prefetched_pages()
+            return
+
+        if self.count_mode != "exact":
+            page = self[1]
+            yield page
+
+            while page.next:
+                page = self[page.next]
+                yield page
+            return
+
+        for page_number in self._page_numbers:
+            yield self[page_number]
+
+    def _prefetched_pages(self) -> t.Generator[Page[TSpec], t.Any, t.Any]:
+        """Yield each page while the pages after it are fetched on a thread pool"""
+        if self.count_mode == "exact":
+            page_numbers: t.Iterator[int] = iter(self._page_numbers)
+        else:
+            # Without a total pages are fetched speculatively until one has
+            # no next page.
+            page_numbers = itertools.count(1)
+
+        with ThreadPoolExecutor(max_workers=self.prefetch) as executor:
+            pending: deque[Future[Page[TSpec]]] = deque()
+
+            def fetch_next() -> None:
+                page_number = next(page_numbers, None)
+                if page_number is not None:
+                    pending.append(executor.submit(copy_context().run, self.__getitem__, page_number))
+
+            try:
+                for _ in range(self.prefetch + 1):
+                    fetch_next()
+
+                while pending:
+                    page = pending.popleft().result()
+                    if page.next is None:
+                        yield page
+                        break
+
+                    fetch_next()
+                    yield page
+
+            finally:
+                for future in pending:
+                    future.cancel()
+
+
+@dataclass
+class AsyncPaginator(_BasePaginator[TAsyncSpec]):
+    """
+    The asyncio counterpart of `Paginator` for `AsyncSpec` classes. Pages are
+    fetched with `await paginator[n]` or `async for page in paginator`. The
+    total is counted on first use (unless `count_mode` isn't `exact`),
+    `await paginator` counts it up front so `item_count`, `page_count` and
+    `page_numbers` can be read.
+    """
+
+    def __post_init__(self) -> None:
+        self._prepare_filter()
+
+    def __await__(self) -> t.Generator[t.Any, None, "AsyncPaginator[TAsyncSpec]"]:
+        return self._counted_self().__await__()
+
+    async def _counted_self(self) -> "AsyncPaginator[TAsyncSpec]":
+        await self._count()
+        return self
+
+    async def _count(self) -> None:
+        if self._counted:
+            return
+
+        found, count = self._cached_count()
+        if not found:
+            if self._estimate_count():
+                count = await self.spec_cls.get_collection().estimated_document_count()
+            else:
+                count = await self.spec_cls.count(self.filter)
+
+        self._set_item_count(count)
+
+    async def __getitem__(self, page_number: int) -> Page[TAsyncSpec]:
+        if self.count_mode != "exact":
+            items = await self.spec_cls.many(self.filter, **self._lookahead_args(page_number))
+            return self._lookahead_page(page_number, items)
+
+        await self._count()
+        filter_args, next, prev = self._page_args(page_number)
+
+        # Select the results for the page
+        items = await self.spec_cls.many(self.filter, **filter_args)
+
+        # Build the page
+        return Page(offset=filter_args["skip"], number=page_number, items=items, next=next, prev=prev)
+
+    async def __aiter__(self) -> t.AsyncIterator[Page[TAsyncSpec]]:
+        if self.prefetch:
+            async for page in self._prefetched_pages():
+                yield page
+            return
+
+        if self.count_mode != "exact":
+            page = await self[1]
+            yield page
+
+            while page.next:
+                page = await self[page.next]
+                yield page
+            return
+
+        await self._count()
+        for page_number in self._page_numbers:
+            yield await self[page_number]
+
+    async def _prefetched_pages(self) -> t.AsyncIterator[Page[TAsyncSpec]]:
+        """Yield each page while the pages after it are fetched as tasks"""
+        if self.count_mode == "exact":
+            await self._count()
+            page_numbers: t.Iterator[int] = iter(self._page_numbers)
+        else:
+            # Without a total pages are fetched speculatively until one has
+            # no next page.
+            page_numbers = itertools.count(1)
+
+        pending: deque[asyncio.Task[Page[TAsyncSpec]]] = deque()
+
+        def fetch_next() -> None:
+            page_number = next(page_numbers, None)
+            if page_number is not None:
+                task = asyncio.ensure_future(self[page_number])
+
+                # Speculative pages past the end fail, don't report them if
+                # they're never awaited.
+                task.add_done_callback(lambda task: task.cancelled() or task.exception())
+                pending.append(task)
+
+        try:
+            for _ in range(self.prefetch + 1):
+                fetch_next()
+
+            while pending:
+                page = await pending.popleft()
+                if page.next is None:
+                    yield page
+                    break
+
+                fetch_next()
+                yield page
+
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+@dataclass
+class _BaseKeysetPaginator(t.Generic[T]):
+    """
+    Shared state and query building for `KeysetPaginator` and
+    `AsyncKeysetPaginator`.
+    """
+
+    spec_cls: type[T]
+    """The spec class results are being paginated for"""
+
+    filter: t.Optional[t.Union[dict[str, t.Any], Condition, Group]] = None
+    """The filter applied when selecting results from the database"""
+
+    per_page: int = 20
+    """The number of results that will be displayed per page"""
+
+    sort_by: str = "_id"
+    """The (indexed) field results are ordered and seeked by, `_id` breaks ties.
+        Results with a null (or missing) sort key come before all others.
+    """
+
+    direction: int = ASCENDING
+    """The direction results are ordered in (`ASC` or `DESC`)"""
+
+    filter_kwargs: t.Any = None
+    """Any additional filter arguments applied when selecting results such as
+        projection (which must include `sort_by`) and trusted. Any sort, skip
+        or limit is replaced.
+    """
+
+    def __post_init__(self) -> None:
+        # Flatten the filter and copy it, so later changes to the caller's
+        # filter (or the values within it) don't change the paginated query.
+        if isinstance(self.filter, (Condition, Group)):
+            self.filter = self.filter.to_dict()
+        self.filter = copy_refs(self.filter)
+
+        # The document key results are sorted on
+        self.sort_key = t.cast(type[MongoBaseMixin], self.spec_cls)._document_path(self.sort_by)
+
+    def _page_args(self, token: t.Optional[str]) -> tuple[t.Any, dict[str, t.Any], bool, int]:
+        """Return the filter, filter arguments, direction and number for the page a token leads to"""
+        before = False
+        number = 1
+        filter = self.filter
+
+        if token is not None:
+            try:
+                seek = bson.decode(base64.urlsafe_b64decode(token.encode()))
+                before, number, value, id = seek["b"], seek["n"], seek["v"], seek["i"]
+            except Exception:
+                raise InvalidPage(token)
+
+            # Select results after (or before) the sort key and Id of the
+            # last (or first) result of the page the token came from.
+            seek_filter = self._seek_filter(value, id, (self.direction == ASCENDING) != before)
+            filter = {"$and": [self.filter, seek_filter]} if self.filter else seek_filter
+
+        # Walk backwards from the token when selecting a previous page
+        direction = -self.direction if before else self.direction
+        sort = [(self.sort_key, direction)]
+        if self.sort_key != "_id":
+            sort.append(("_id", direction))
+
+        filter_args = deepcopy(self.filter_kwargs) or {}
+        filter_args.pop("skip", None)
+        filter_args["sort"] = sort
+
+        # Select one extra result to find out if there's another page
+        filter_args["limit"] = self.per_page + 1
+
+        return filter, filter_args, before, number
+
+    def _seek_filter(self, value: t.Any, id: t.Any, ascending: bool) -> dict[str, t.Any]:
+        """
+        Return the filter selecting results that sort after a sort key and Id
+        (or before them if not `ascending`). Null (and missing) sort keys sort
+        before all others, so seeks across them are made with equality
+        matches rather than comparisons (which never match null).
+        """
+        operator = "$gt" if ascending else "$lt"
+        if self.sort_key == "_id":
+            return {"_id": {operator: id}}
+
+        ties = {self.sort_key: value, "_id": {operator: id}}
+        if value is None:
+            if ascending:
+                return {"$or": [ties, {self.sort_key: {"$ne": None}}]}
+            return ties
+
+        seek_filter: dict[str, t.Any] = {"$or": [{self.sort_key: {operator: value}}, ties]}
+        if not ascending:
+            seek_filter["$or"].append({self.sort_key: None})
+        return seek_filter
+
+    def _build_page(self, items: list[t.Any], token: t.Optional[str], before: bool, number: int) -> Page[t.Any]:
+        """Build a page from the results selected for it"""
+        more = len(items) > self.per_page
+        items = items[: self.per_page]
+        if before:
+            items.reverse()
+
+        has_next = True if before else more
+        has_prev = more if before else token is not None
+
+        return Page(
+            offset=(number - 1) * self.per_page,
+            number=number,
+            items=items,
+            next=number + 1 if has_next and items else None,
+            prev=number - 1 if has_prev and items else None,
+            next_token=self._token(items[-1], number + 1, False) if has_next and items else None,
+            prev_token=self._token(items[0], number - 1, True) if has_prev and items else None,
+        )
+
+    def _token(self, item: t.Any, number: int, before: bool) -> str:
+        """Return an opaque token seeking from the given item"""
+        # Read the sort key from the item as it's stored (by document key)
+        metadata = t.cast(type[MongoBaseMixin], self.spec_cls).get_metadata()
+        document = item.to_dict()
+        for name, key in metadata.aliases.items():
+            if name in document:
+                document[key] = document.pop(name)
+        value = metadata.path(self.sort_key).get(to_refs(document))
+        seek = {"v": value, "i": item._id, "n": number, "b": before}
+        return base64.urlsafe_b64encode(bson.encode(seek)).decode()
+
+
+@dataclass
+class KeysetPaginator(_BaseKeysetPaginator[TSpec]):
+    """
+    A pagination class that seeks from one page to the next on an indexed
+    sort key (with `_id` as a tiebreaker) rather than skipping, so deep pages
+    cost the same to select as the first. Pages are addressed by the opaque
+    `next_token`/`prev_token` on each `Page` instead of by number.
+    """
+
+    def page(self, token: t.Optional[str] = None) -> Page[TSpec]:
+        """Return the page a continuation token leads to (or the first page)"""
+        filter, filter_args, before, number = self._page_args(token)
+
+        # Select the results for the page
+        items = self.spec_cls.many(filter, **filter_args)
+
+        return self._build_page(items, token, before, number)
+
+    def __iter__(self) -> t.Generator[Page[TSpec], t.Any, t.Any]:
+        page = self.page()
+        yield page
+
+        while page.next_token:
+            page = self.page(page.next_token)
+            yield page
+
+
+@dataclass
+class AsyncKeysetPaginator(_BaseKeysetPaginator[TAsyncSpec]):
+    """
+    The asyncio counterpart of `KeysetPaginator` for `AsyncSpec` classes.
+    """
+
+    async def page(self, token: t.Optional[str] = None) -> Page[TAsyncSpec]:
+        """Return the page a continuation token leads to (or the first page)"""
+        filter, filter_args, before, number = self._page_args(token)
+
+        # Select the results for the page
+        items = await self.spec_cls.many(filter, **filter_args)
+
+        return self._build_page(items, token, before, number)
+
+    async def __aiter__(self) -> t.AsyncIterator[Page[TAsyncSpec]]:
+        page = await self.page()
+        yield page
+
+        while page.next_token:
+            page = await self.page(page.next_token)
+            yield page
@@ -0,0 +1,39 @@
+"""
+Compiled projections.
+"""
+
+import typing as t
+
+__all__ = (
+    # Classes
+    "ProjectionPlan",
+)
+
+
+class ProjectionPlan(t.NamedTuple):
+    """
+    A structured projection compiled for a spec class: the flat projection
+    sent to the database, and the reference (`$ref`) and sub-spec (`$sub`)
+    projections applied to the documents it returns. Plans are cached and
+    shared between reads, so they're read-only.
+
+    Plans are built (and cached) by `Spec.projection_plan` and can be passed
+    as the `projection` of a read in place of the projection they were
+    compiled from.
+    """
+
+    projection: t.Mapping[str, t.Any]
+    """The flat projection sent to the database"""
+
+    references: t.Mapping[str, t.Any]
+    """The projections for fields to dereference, keyed by path"""
+
+    subs: t.Mapping[str, t.Any]
+    """The projections for fields to wrap in sub-specs, keyed by path"""
+
+    def unpack(self) -> tuple[dict[str, t.Any], t.Mapping[str, t.Any], t.Mapping[str, t.Any]]:
+        """
+        Return the flat projection to send to the database (a copy, as drivers
+        may modify it), the reference projections and the sub-spec projections.
+        """
+        return dict(self.projection), self.references, self.subs
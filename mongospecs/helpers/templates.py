@@ -0,0 +1,121 @@
+"""
+Query templates, filters compiled once with placeholders for the values that
+change between uses, e.g:
+
+    by_owner = compile_query(Q.owner == Param("uid"))
+
+    Dragon.many(by_owner(uid=uid))
+"""
+
+import typing as t
+
+from mongospecs.helpers.query import Condition, Group
+from mongospecs.utils import copy_refs, register_ref_handler, to_refs
+
+__all__ = (
+    # Classes
+    "BoundQuery",
+    "Param",
+    "QueryTemplate",
+    # Functions
+    "compile_query",
+)
+
+# The location of a placeholder within a filter as the keys/indexes leading
+# to it, and the name of the parameter bound to it.
+Slot = tuple[tuple[t.Any, ...], str]
+
+
+class Param:
+    """A placeholder for a value that's bound when a query template is used"""
+
+    __slots__ = ("name",)
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __repr__(self) -> str:
+        return f"Param({self.name!r})"
+
+    def __eq__(self, other: t.Any) -> bool:
+        return isinstance(other, Param) and other.name == self.name
+
+    def __hash__(self) -> int:
+        return hash((Param, self.name))
+
+
+class BoundQuery(dict[str, t.Any]):
+    """
+    A filter built from a query template. Spec instances within it have
+    already been converted to Ids, so it's used as is by `to_refs`.
+
+    Parts of the filter that don't hold a parameter are shared with the
+    template, so treat it as read-only.
+    """
+
+
+register_ref_handler(BoundQuery, None)
+
+
+class QueryTemplate:
+    """
+    A filter compiled once, `Param` placeholders within it are replaced with
+    values when it's bound (by calling it or `bind`). Only the containers
+    leading to each placeholder are copied when binding.
+    """
+
+    def __init__(self, filter: t.Any) -> None:
+        if isinstance(filter, (Condition, Group)):
+            filter = filter.to_dict()
+
+        # Copied, so later changes to the caller's filter don't change the template
+        self.filter: dict[str, t.Any] = copy_refs(filter or {})
+        self.slots: list[Slot] = []
+        self._find_slots(self.filter, ())
+        self.params = frozenset(name for _, name in self.slots)
+
+    def __repr__(self) -> str:
+        return f"QueryTemplate({self.filter!r})"
+
+    def __call__(self, **params: t.Any) -> BoundQuery:
+        return self.bind(**params)
+
+    def bind(self, **params: t.Any) -> BoundQuery:
+        """Return the filter with each placeholder replaced by its parameter"""
+        if params.keys() != self.params:
+            missing = sorted(self.params - params.keys())
+            if missing:
+                raise ValueError(f"Missing query parameters: {', '.join(missing)}")
+            unexpected = sorted(params.keys() - self.params)
+            raise ValueError(f"Unexpected query parameters: {', '.join(unexpected)}")
+
+        bound = BoundQuery(self.filter)
+        copies: dict[tuple[t.Any, ...], t.Any] = {}
+        for keys, name in self.slots:
+            container: t.Any = bound
+            for i, key in enumerate(keys[:-1]):
+                # Copy each container on the way to the placeholder (once)
+                child = copies.get(keys[: i + 1])
+                if child is None:
+                    child = copies[keys[: i + 1]] = container[key].copy()
+                    container[key] = child
+                container = child
+
+            container[keys[-1]] = to_refs(params[name])
+
+        return bound
+
+    def _find_slots(self, value: t.Any, keys: tuple[t.Any, ...]) -> None:
+        if isinstance(value, Param):
+            self.slots.append((keys, value.name))
+        elif isinstance(value, dict):
+            for key, item in value.items():
+                self._find_slots(item, (*keys, key))
+        elif isinstance(value, list):
+            for i, item in enumerate(value):
+                self._find_slots(item, (*keys, i))
+
+
+def compile_query(filter: t.Any) -> QueryTemplate:
+    """Compile a filter (a `Q` expression or a dictionary) into a query template"""
+    return QueryTemplate(filter)
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import asyncio
+import typing as t
+
+from pymongo.errors import PyMongoError
+
+from mongospecs.helpers.aggregation import ReferenceJoin
+from mongospecs.helpers.instrumentation import NULL_RECORDING, explain_command
+from mongospecs.mixins.base import MongoBaseMixin
+from mongospecs.types import RawDocuments
+
+
+class AsyncMongoBaseMixin(MongoBaseMixin):
+    """
+    Base for specs backed by an asyncio MongoDB client, e.g. motor's
+    `AsyncIOMotorClient` or pymongo's `AsyncMongoClient`. Projection handling
+    is shared with `MongoBaseMixin`, only the database round trips differ.
+    """
+
+    _client: t.ClassVar[t.Any] = None
+    _collection_context: t.ClassVar[t.Any] = None
+
+    @classmethod
+    def get_collection(cls) -> t.Any:
+        """Return a reference to the database collection for the class"""
+        return super().get_collection()
+
+    @classmethod
+    def get_db(cls) -> t.Any:
+        """Return the database for the collection"""
+        return super().get_db()
+
+    @classmethod
+    async def _finish_recording(  # type: ignore[override]
+        cls, recording: t.Any, documents: int, kwargs: dict[str, t.Any]
+    ) -> None:
+        """Complete and report the recording of a read"""
+        if recording is NULL_RECORDING:
+            return
+
+        timing = recording.finish(documents)
+        if timing.slow and recording.instrumentation.explain:
+            try:
+                timing.explain = await cls.get_db().command(explain_command(cls.get_collection().name, timing, kwargs))
+            except PyMongoError as e:
+                timing.explain = {"error": str(e)}
+        recording.report()
+
+    @classmethod
+    async def _dereference(  # type: ignore[override]
+        cls, documents: RawDocuments, references: t.Mapping[str, t.Any], trusted: t.Optional[bool] = None
+    ) -> None:
+        """
+        Dereference one or more documents. Lookups are grouped and chunked as
+        in `MongoBaseMixin._dereference` and run concurrently on the event loop.
+        """
+        lookups = cls._reference_lookups(documents, references)
+        queries = cls._reference_queries(lookups)
+
+        # Find the referenced documents
+        results = await asyncio.gather(
+            *(
+                ref.many({"_id": {"$in": ids}}, projection=projection, trusted=trusted)
+                for _, ref, projection, ids in queries
+            )
+        )
+
+        # Add dereferenced specs to the documents
+        cls._assign_lookups(documents, lookups, queries, list(results))
+
+    @classmethod
+    async def _apply_sub_specs(cls, documents: RawDocuments, subs: t.Mapping[str, t.Any]) -> None:  # type: ignore[override]
+        """Convert embedded documents to sub-specs for one or more documents"""
+
+        for path, projection in subs.items():
+            sub, raw_subs, sub_projection = cls._wrap_sub_specs(documents, path, projection)
+            if sub is None or not sub_projection:
+                continue
+
+            # Apply the projection to the list of sub specs
+            sub_references, sub_subs = sub._split_projection(sub_projection)
+            if sub_references:
+                await cls._dereference(raw_subs, sub_references)
+
+            if sub_subs:
+                await cls._apply_sub_specs(raw_subs, sub_subs)
+
+    @classmethod
+    async def _assign_joins(  # type: ignore[override]
+        cls, documents: RawDocuments, joins: list[ReferenceJoin], trusted: t.Optional[bool] = None
+    ) -> None:
+        """Replace the Ids in the documents with the specs fetched by `$lookup` stages"""
+        for join in joins:
+            raw, joined, unjoined = cls._take_joined(documents, join)
+
+            # Apply the projection to the referenced documents
+            plan = join.ref.projection_plan(join.projection)
+            if plan.references:
+                await join.ref._dereference(raw, plan.references, trusted)
+            if plan.subs:
+                await join.ref._apply_sub_specs(raw, plan.subs)
+
+            cls._assign_references(joined, join.path, cls._joined_specs(join, raw, trusted))
+
+            # Dictionaries of references can't be looked up server side
+            if unjoined:
+                await cls._dereference(unjoined, {join.path: {"$ref": join.ref, **join.projection}}, trusted)
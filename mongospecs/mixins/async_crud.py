@@ -0,0 +1,316 @@
+import asyncio
+import typing as t
+from collections import deque
+
+from pymongo.errors import BulkWriteError
+from typing_extensions import Self
+
+from mongospecs.helpers.bulk import AsyncBulkWriter, InsertChunk, _ChunkedInsert
+from mongospecs.mixins.async_query import AsyncQueryMixin
+from mongospecs.types import FilterType, SpecDocumentType, SpecsOrRawDocuments
+from mongospecs.utils import achunked, chunked
+
+
+class AsyncCrudMixin(AsyncQueryMixin):
+    # Operations
+    async def insert(self, **insert_one_kwargs: t.Any) -> None:
+        """Insert this document"""
+        document = self._prepare_insert()
+
+        # Insert the document and update the Id
+        result = await self.get_collection().insert_one(document, **insert_one_kwargs)
+        self._complete_inserts([self], [result.inserted_id])
+
+    async def unset(self, *fields: t.Any, **update_one_kwargs: t.Any) -> None:
+        """Unset the given list of fields for this document."""
+        update = self._prepare_unset(fields)
+
+        # Update the document
+        await self.get_collection().update_one({"_id": self._id}, update, **update_one_kwargs)
+        self._complete_unset(fields)
+
+    async def update(self, *fields: t.Any, **update_one_kwargs: t.Any) -> None:
+        """
+        Update this document. Optionally a specific list of fields to update can
+        be specified.
+        """
+        document, update = self._prepare_update(fields)
+
+        # Update the document (unless it's tracked and nothing has changed)
+        if update is not None:
+            await self.get_collection().update_one({"_id": self._id}, update, **update_one_kwargs)
+        self._complete_update(fields, document)
+
+    async def upsert(self, *fields: t.Any, atomic: bool = False, **operation_kwargs: t.Any) -> None:
+        """
+        Update or Insert this document depending on whether it exists or not.
+        See `CrudMixin.upsert` for details.
+        """
+
+        # If no `_id` is provided then we insert the document
+        if not self._id:
+            return await self.insert()
+
+        if atomic:
+            # Upsert the document
+            filter, update = self._prepare_upsert(fields)
+            result = await self.get_collection().update_one(filter, update, upsert=True, **operation_kwargs)
+            self._complete_upsert(fields, update, result.upserted_id)
+            return None
+
+        # If an `_id` is provided then we need to check if it exists before
+        # performing the `upsert`.
+        #
+        if await self.count({"_id": self._id}) == 0:
+            await self.insert(**operation_kwargs)
+        else:
+            await self.update(*fields, **operation_kwargs)
+
+    async def delete(self, **delete_one_kwargs: t.Any) -> None:
+        """Delete this document"""
+        self._prepare_delete()
+
+        # Delete the document
+        await self.get_collection().delete_one({"_id": self._id}, **delete_one_kwargs)
+        self._complete_deletes([self])
+
+    @classmethod
+    async def find(cls, filter: FilterType = None, **kwargs: t.Any) -> list[SpecDocumentType]:
+        """Return a list of documents matching the filter"""
+        filter, references, subs = cls._prepare_find(filter, kwargs)
+
+        recording = cls._start_recording("find", filter)
+        with recording.phase("network"):
+            documents = [document async for document in cls.get_collection().find(filter, **kwargs)]
+
+        # Make sure we found documents
+        if not documents:
+            await cls._finish_recording(recording, 0, kwargs)
+            return []
+
+        # Dereference the documents (if required)
+        if references:
+            with recording.phase("dereference"):
+                await cls._dereference(documents, references)
+
+        # Add sub-specs to the documents (if required)
+        if subs:
+            with recording.phase("sub_specs"):
+                await cls._apply_sub_specs(documents, subs)
+
+        await cls._finish_recording(recording, len(documents), kwargs)
+        return documents
+
+    @classmethod
+    async def iter_find(
+        cls, filter: FilterType = None, batch_size: int = 1000, **kwargs: t.Any
+    ) -> t.AsyncIterator[SpecDocumentType]:
+        """
+        Yield documents matching the filter, streaming them from the cursor in
+        batches of `batch_size`.
+        """
+        filter, references, subs = cls._prepare_find(filter, kwargs)
+
+        # Find the documents
+        cursor = cls.get_collection().find(filter, batch_size=batch_size, **kwargs)
+
+        async for documents in achunked(cursor, batch_size):
+            # Dereference the documents (if required)
+            if references:
+                await cls._dereference(documents, references)
+
+            # Add sub-specs to the documents (if required)
+            if subs:
+                await cls._apply_sub_specs(documents, subs)
+
+            for document in documents:
+                yield document
+
+    @classmethod
+    async def find_one(cls, filter: FilterType = None, **kwargs: t.Any) -> SpecDocumentType:
+        """Return the first document matching the filter"""
+        filter, references, subs = cls._prepare_find(filter, kwargs)
+
+        recording = cls._start_recording("find_one", filter)
+        with recording.phase("network"):
+            document = await cls.get_collection().find_one(filter, **kwargs)
+
+        # Make sure we found a document
+        if not document:
+            await cls._finish_recording(recording, 0, kwargs)
+            return t.cast(SpecDocumentType, {})
+
+        # Dereference the document (if required)
+        if references:
+            with recording.phase("dereference"):
+                await cls._dereference([document], references)
+
+        # Add sub-specs to the document (if required)
+        if subs:
+            with recording.phase("sub_specs"):
+                await cls._apply_sub_specs([document], subs)
+
+        await cls._finish_recording(recording, 1, kwargs)
+        return t.cast(SpecDocumentType, document)
+
+    async def reload(self, **kwargs: t.Any) -> None:
+        """Reload the document"""
+        self._complete_reload(await self.find_one({"_id": self._id}, **kwargs), kwargs)
+
+    @classmethod
+    def bulk(cls, ordered: bool = True, transaction: bool = False, **bulk_write_kwargs: t.Any) -> AsyncBulkWriter:
+        """
+        Return a unit of work that collects inserts, updates, unsets, upserts
+        and deletes (for specs of any class) and flushes them as a single
+        `bulk_write` per spec class on exit, e.g:
+
+            async with Dragon.bulk() as bulk:
+                bulk.insert(dragon)
+                bulk.update(lair, "name")
+
+        If `transaction` is True the writes are made inside a transaction.
+        """
+        return AsyncBulkWriter(cls, ordered=ordered, transaction=transaction, **bulk_write_kwargs)
+
+    @classmethod
+    async def insert_many(
+        cls,
+        documents: SpecsOrRawDocuments,
+        chunk_size: t.Optional[int] = None,
+        max_workers: int = 1,
+        on_chunk: t.Optional[t.Callable[[InsertChunk[Self]], t.Any]] = None,
+        **kwargs: t.Any,
+    ) -> t.Sequence[Self]:
+        """
+        Insert a list of documents. See `CrudMixin.insert_many` for details,
+        here up to `max_workers` chunks are inserted concurrently as tasks.
+        """
+        if chunk_size is not None:
+            return await cls._insert_chunks(documents, chunk_size, max_workers, on_chunk, kwargs)
+
+        specs, _documents = cls._prepare_insert_many(documents)
+
+        # Bulk insert
+        ids = (await cls.get_collection().insert_many(_documents, **kwargs)).inserted_ids
+        cls._complete_inserts(specs, ids)
+
+        return specs
+
+    @classmethod
+    async def _insert_chunks(
+        cls,
+        documents: SpecsOrRawDocuments,
+        chunk_size: int,
+        max_workers: int,
+        on_chunk: t.Optional[t.Callable[[InsertChunk[Self]], t.Any]],
+        insert_many_kwargs: dict[str, t.Any],
+    ) -> list[Self]:
+        """Insert documents a chunk at a time (see `insert_many`)"""
+        insert_many_kwargs.setdefault("ordered", False)
+        ordered = insert_many_kwargs["ordered"]
+
+        async def insert_chunk(index: int, chunk: SpecsOrRawDocuments) -> InsertChunk[Self]:
+            specs, _documents = cls._prepare_insert_chunk(chunk)
+
+            # Insert the chunk
+            errors = []
+            try:
+                await cls.get_collection().insert_many(_documents, **insert_many_kwargs)
+            except BulkWriteError as error:
+                errors = error.details.get("writeErrors", [])
+
+            return cls._complete_insert_chunk(index, chunk_size, specs, _documents, errors, ordered)
+
+        results: _ChunkedInsert[Self] = _ChunkedInsert(on_chunk)
+
+        # Ordered inserts run a chunk at a time, so no chunk is written after
+        # an earlier one fails
+        chunks = enumerate(chunked(documents, chunk_size))
+        if max_workers > 1 and not ordered:
+            pending: deque[asyncio.Task[InsertChunk[Self]]] = deque()
+            try:
+                for index, chunk in chunks:
+                    pending.append(asyncio.ensure_future(insert_chunk(index, chunk)))
+
+                    # Limit the number of prepared chunks held at once
+                    while len(pending) >= max_workers:
+                        results.complete(await pending.popleft())
+
+                while pending:
+                    results.complete(await pending.popleft())
+
+            finally:
+                for task in pending:
+                    task.cancel()
+        else:
+            for index, chunk in chunks:
+                results.complete(await insert_chunk(index, chunk))
+                if ordered and results.errors:
+                    break
+
+        return results.result()
+
+    @classmethod
+    async def update_many(
+        cls,
+        documents: SpecsOrRawDocuments,
+        *fields: t.Any,
+        update_one_kwargs: t.Any = None,
+        bulk_write_kwargs: t.Any = None,
+    ) -> None:
+        """
+        Update multiple documents. Optionally a specific list of fields to
+        update can be specified.
+        """
+        specs, _documents, requests = cls._prepare_update_many(documents, fields, update_one_kwargs)
+
+        # Update the documents (skipping tracked ones where nothing has changed)
+        if requests:
+            await cls.get_collection().bulk_write(requests, **(bulk_write_kwargs or {}))
+        cls._complete_update_many(specs, fields, _documents)
+
+    @classmethod
+    async def upsert_many(
+        cls, documents: SpecsOrRawDocuments, *fields: t.Any, bulk_write_kwargs: t.Any = None
+    ) -> t.Sequence[Self]:
+        """
+        Atomically update or insert multiple documents in a single bulk write.
+        See `CrudMixin.upsert_many` for details.
+        """
+        specs, requests, complete = cls._prepare_upsert_many(documents, fields)
+        if not requests:
+            return specs
+
+        complete(await cls.get_collection().bulk_write(requests, **(bulk_write_kwargs or {})))
+        return specs
+
+    @classmethod
+    async def unset_many(cls, documents: SpecsOrRawDocuments, *fields: t.Any, **update_many_kwargs: t.Any) -> None:
+        """Unset the given list of fields for given documents."""
+        specs, filter, update = cls._prepare_unset_many(documents, fields)
+
+        # Update the document
+        await cls.get_collection().update_many(filter, update, **update_many_kwargs)
+        cls._complete_unset_many(specs)
+
+    @classmethod
+    async def delete_many(cls, documents: SpecsOrRawDocuments, **delete_many_kwargs: t.Any) -> None:
+        """Delete multiple documents"""
+        specs, ids = cls._prepare_delete_many(documents)
+
+        # Delete the documents
+        await cls.get_collection().delete_many({"_id": {"$in": ids}}, **delete_many_kwargs)
+        cls._complete_deletes(specs)
+
+    async def soft_delete(self, **update_one_kwargs: t.Any) -> None:
+        """Soft delete this document by setting a deleted flag."""
+        update = self._prepare_soft_delete()
+
+        # Update the document to set the deleted flag
+        await self.get_collection().update_one({"_id": self._id}, update, **update_one_kwargs)
+        self._complete_soft_delete()
+
+    @classmethod
+    async def find_active(cls, filter: FilterType = None, **find_kwargs: t.Any) -> list[SpecDocumentType]:
+        """Return a list of active documents (not soft deleted)."""
+        return await cls.find(cls._active_filter(filter), **find_kwargs)
@@ -0,0 +1,30 @@
+import typing as t
+
+from pymongo import ASCENDING
+
+from mongospecs.mixins.async_base import AsyncMongoBaseMixin
+from mongospecs.types import SpecDocumentType
+
+
+class AsyncIndexManagementMixin(AsyncMongoBaseMixin):
+    @classmethod
+    async def create_index(cls, keys: t.Union[str, list[tuple[str, int]]], **kwargs: t.Any) -> str:
+        """
+        Create an index on the specified keys (a single key or a list of keys).
+        """
+        index_keys = [(keys, ASCENDING)] if isinstance(keys, str) else keys
+        return t.cast(str, await cls.get_collection().create_index(index_keys, **kwargs))
+
+    @classmethod
+    async def drop_index(cls, index_name: str) -> None:
+        """
+        Drop an index by its name.
+        """
+        await cls.get_collection().drop_index(index_name)
+
+    @classmethod
+    async def list_indexes(cls) -> list[SpecDocumentType]:
+        """
+        List all indexes on the collection.
+        """
+        return [index async for index in cls.get_collection().list_indexes()]
@@ -0,0 +1,26 @@
+import typing as t
+
+from typing_extensions import Self
+
+from mongospecs.mixins.async_base import AsyncMongoBaseMixin
+from mongospecs.utils import to_refs
+
+
+class AsyncIntegrityMixin(AsyncMongoBaseMixin):
+    @classmethod
+    async def cascade(cls, ref_cls: "type[AsyncMongoBaseMixin]", field: str, specs: t.Sequence[Self]) -> None:
+        """Apply a cascading delete (does not emit signals)"""
+        ids = [to_refs(getattr(f, field)) for f in specs if hasattr(f, field)]
+        await ref_cls.get_collection().delete_many({"_id": {"$in": ids}})
+
+    @classmethod
+    async def nullify(cls, ref_cls: "type[AsyncMongoBaseMixin]", field: str, specs: t.Sequence[Self]) -> None:
+        """Nullify a reference field (does not emit signals)"""
+        ids = [to_refs(f) for f in specs]
+        await ref_cls.get_collection().update_many({field: {"$in": ids}}, {"$set": {field: None}})
+
+    @classmethod
+    async def pull(cls, ref_cls: "type[AsyncMongoBaseMixin]", field: str, specs: t.Sequence[Self]) -> None:
+        """Pull references from a list field (does not emit signals)"""
+        ids = [to_refs(f) for f in specs]
+        await ref_cls.get_collection().update_many({field: {"$in": ids}}, {"$pull": {field: {"$in": ids}}})
@@ -0,0 +1,354 @@
+import typing as t
+
+from bson import ObjectId
+from typing_extensions import Self
+
+from mongospecs.helpers.query import Condition, Group
+from mongospecs.mixins.async_base import AsyncMongoBaseMixin
+from mongospecs.mixins.async_session import _resolve
+from mongospecs.mixins.base import ID_INDEX, ID_PROJECTION
+from mongospecs.types import FilterType
+from mongospecs.utils import achunked, to_refs
+
+
+class AsyncQueryMixin(AsyncMongoBaseMixin):
+    @classmethod
+    async def by_id(cls, id: ObjectId, **kwargs: t.Any) -> t.Optional[Self]:
+        """Get a document by ID"""
+        return await cls.one({"_id": id}, **kwargs)
+
+    @classmethod
+    async def count(cls, filter: FilterType = None, **kwargs: t.Any) -> int:
+        """Return a count of documents matching the filter"""
+        if isinstance(filter, (Condition, Group)):
+            filter = filter.to_dict()
+
+        filter = to_refs(filter)
+
+        # Counts may be served from the query cache
+        cache, cache_key = cls._cache_for("count", filter, kwargs)
+        if cache is not None:
+            found, count = cache.get(cache_key)
+            if found:
+                return t.cast(int, count)
+
+        recording = cls._start_recording("count", filter)
+        with recording.phase("network"):
+            if filter:
+                count = await cls.get_collection().count_documents(filter, **kwargs)
+            else:
+                count = await cls.get_collection().estimated_document_count(**kwargs)
+        await cls._finish_recording(recording, 0, kwargs)
+
+        if cache is not None:
+            cache.set(cache_key, count)
+
+        return t.cast(int, count)
+
+    @classmethod
+    async def ids(cls, filter: FilterType = None, covered: bool = False, **kwargs: t.Any) -> list[ObjectId]:
+        """
+        Return a list of Ids for documents matching the filter. If `covered`
+        the `_id` index is hinted, so reads filtered on the Id alone are
+        served from the index.
+        """
+        # Find the documents
+        if isinstance(filter, (Condition, Group)):
+            filter = filter.to_dict()
+
+        filter = to_refs(filter)
+
+        recording = cls._start_recording("ids", filter)
+        with recording.phase("network"):
+            cursor = cls._find_ids(filter, covered, **kwargs)
+            ids = [document["_id"] async for document in cursor]
+        explain_kwargs = dict(kwargs, projection=ID_PROJECTION)
+        if covered:
+            explain_kwargs["hint"] = ID_INDEX
+        await cls._finish_recording(recording, len(ids), explain_kwargs)
+
+        return ids
+
+    @classmethod
+    async def iter_ids(
+        cls, filter: FilterType = None, batch_size: int = 1000, covered: bool = False, **kwargs: t.Any
+    ) -> t.AsyncIterator[ObjectId]:
+        """
+        Yield the Ids of documents matching the filter, streamed from the
+        cursor in batches of `batch_size` (see `ids` for `covered`).
+        """
+        if isinstance(filter, (Condition, Group)):
+            filter = filter.to_dict()
+
+        cursor = cls._find_ids(to_refs(filter), covered, batch_size=batch_size, **kwargs)
+        async for document in cursor:
+            yield document["_id"]
+
+    @classmethod
+    async def distinct(cls, field: str, filter: FilterType = None, **kwargs: t.Any) -> list[t.Any]:
+        """
+        Return the distinct values at a field (a `.` separated path) across
+        the documents matching the filter.
+        """
+        if isinstance(filter, (Condition, Group)):
+            filter = filter.to_dict()
+
+        filter = to_refs(filter)
+        key = cls._document_path(field)
+
+        recording = cls._start_recording("distinct", filter)
+        with recording.phase("network"):
+            values: list[t.Any] = await cls.get_collection().distinct(key, filter, **kwargs)
+        await cls._finish_recording(recording, len(values), dict(kwargs, key=key))
+
+        return values
+
+    @classmethod
+    async def values(cls, *fields: str, filter: FilterType = None, **kwargs: t.Any) -> list[tuple[t.Any, ...]]:
+        """
+        Return a tuple of the values at the given fields (`.` separated paths)
+        for each document matching the filter. Values are read straight from
+        the cursor without building specs (references and sub-specs are left
+        as stored), and the Id is only read if it's asked for so the query can
+        be covered by an index on the fields.
+        """
+        if isinstance(filter, (Condition, Group)):
+            filter = filter.to_dict()
+
+        filter = to_refs(filter)
+        projection, paths = cls._value_paths(fields)
+
+        recording = cls._start_recording("values", filter)
+        with recording.phase("network"):
+            cursor = cls.get_collection().find(filter, projection=projection, **kwargs)
+            values = [tuple([path.get(document) for path in paths]) async for document in cursor]
+        await cls._finish_recording(recording, len(values), dict(kwargs, projection=projection))
+
+        return values
+
+    @classmethod
+    async def scalars(cls, field: str, filter: FilterType = None, **kwargs: t.Any) -> list[t.Any]:
+        """
+        Return the value at the given field (a `.` separated path) for each
+        document matching the filter, read as by `values`.
+        """
+        if isinstance(filter, (Condition, Group)):
+            filter = filter.to_dict()
+
+        filter = to_refs(filter)
+        projection, (path,) = cls._value_paths([field])
+
+        recording = cls._start_recording("scalars", filter)
+        with recording.phase("network"):
+            cursor = cls.get_collection().find(filter, projection=projection, **kwargs)
+            values = [path.get(document) async for document in cursor]
+        await cls._finish_recording(recording, len(values), dict(kwargs, projection=projection))
+
+        return values
+
+    @classmethod
+    async def one(cls, filter: FilterType = None, **kwargs: t.Any) -> t.Optional[Self]:
+        """Return the first spec object matching the filter"""
+        projection = kwargs.get("projection", cls._default_projection)
+        identity_map = cls._identity_map_for(projection)
+
+        # Find the document
+        if isinstance(filter, (Condition, Group)):
+            filter = filter.to_dict()
+
+        filter = to_refs(filter)
+
+        # Lookups by Id may be served from the identity map
+        if identity_map is not None and isinstance(filter, dict) and list(filter) == ["_id"]:
+            spec = identity_map.get(cls, filter["_id"])
+            if spec is not None:
+                return t.cast(Self, spec)
+
+        # Queries may be served from the query cache
+        cache, cache_key = cls._cache_for("one", filter, kwargs)
+        if cache is not None:
+            found, spec = cache.get(cache_key)
+            if found:
+                return None if spec is None else t.cast(Self, cls._copy_cached([spec])[0])
+
+        # Flatten the projection
+        trusted = kwargs.pop("trusted", None)
+        kwargs["projection"], references, subs = cls.projection_plan(projection).unpack()
+
+        recording = cls._start_recording("one", filter)
+        with recording.phase("network"):
+            document = await cls.get_collection().find_one(filter, **kwargs)
+
+        # Make sure we found a document
+        if not document:
+            if cache is not None:
+                cache.set(cache_key, None)
+            await cls._finish_recording(recording, 0, kwargs)
+            return None
+
+        # Dereference the document (if required)
+        if references:
+            with recording.phase("dereference"):
+                await cls._dereference([document], references, trusted)
+
+        # Add sub-specs to the document (if required)
+        if subs:
+            with recording.phase("sub_specs"):
+                await cls._apply_sub_specs([document], subs)
+
+        with recording.phase("construct"):
+            spec = cls.from_document(document, trusted)
+        cls._snapshot([spec])
+        if identity_map is not None:
+            identity_map.add(spec)
+        if cache is not None:
+            cache.set(cache_key, cls._copy_cached([spec])[0])
+        await cls._finish_recording(recording, 1, kwargs)
+
+        return spec
+
+    @classmethod
+    async def many(cls, filter: FilterType = None, **kwargs: t.Any) -> list[Self]:
+        """Return a list of spec objects matching the filter"""
+        if isinstance(filter, (Condition, Group)):
+            filter = filter.to_dict()
+
+        filter = to_refs(filter)
+
+        # Queries may be served from the query cache
+        cache, cache_key = cls._cache_for("many", filter, kwargs)
+        if cache is not None:
+            found, specs = cache.get(cache_key)
+            if found:
+                return cls._copy_cached(specs)
+
+        # Flatten the projection
+        trusted = kwargs.pop("trusted", None)
+        kwargs["projection"], references, subs = cls.projection_plan(
+            kwargs.get("projection", cls._default_projection)
+        ).unpack()
+
+        recording = cls._start_recording("many", filter)
+        with recording.phase("network"):
+            documents = [document async for document in cls.get_collection().find(filter, **kwargs)]
+
+        # Dereference the documents (if required)
+        if references:
+            with recording.phase("dereference"):
+                await cls._dereference(documents, references, trusted)
+
+        # Add sub-specs to the documents (if required)
+        if subs:
+            with recording.phase("sub_specs"):
+                await cls._apply_sub_specs(documents, subs)
+
+        with recording.phase("construct"):
+            specs = cls.from_documents(documents, trusted)
+        cls._snapshot(specs)
+        await cls._finish_recording(recording, len(specs), kwargs)
+        if cache is not None:
+            cache.set(cache_key, cls._copy_cached(specs))
+
+        return specs
+
+    @classmethod
+    async def iter_many(
+        cls, filter: FilterType = None, batch_size: int = 1000, **kwargs: t.Any
+    ) -> t.AsyncIterator[Self]:
+        """
+        Yield spec objects matching the filter. Documents are streamed from the
+        cursor in batches of `batch_size`, and references and sub-specs are
+        applied per batch so memory use doesn't grow with the result set.
+        """
+        # Flatten the projection
+        trusted = kwargs.pop("trusted", None)
+        kwargs["projection"], references, subs = cls.projection_plan(
+            kwargs.get("projection", cls._default_projection)
+        ).unpack()
+
+        # Find the documents
+        if isinstance(filter, (Condition, Group)):
+            filter = filter.to_dict()
+
+        cursor = cls.get_collection().find(to_refs(filter), batch_size=batch_size, **kwargs)
+
+        async for documents in achunked(cursor, batch_size):
+            # Dereference the documents (if required)
+            if references:
+                await cls._dereference(documents, references, trusted)
+
+            # Add sub-specs to the documents (if required)
+            if subs:
+                await cls._apply_sub_specs(documents, subs)
+
+            specs = cls.from_documents(documents, trusted)
+            cls._snapshot(specs)
+            for spec in specs:
+                yield spec
+
+    @classmethod
+    async def aggregate(
+        cls,
+        pipeline: t.Iterable[dict[str, t.Any]],
+        hydrate: t.Any = True,
+        projection: t.Optional[t.Mapping[str, t.Any]] = None,
+        **kwargs: t.Any,
+    ) -> list[t.Any]:
+        """
+        Run an aggregation pipeline (a `Pipeline` or a list of stages) and
+        return the results, see `QueryMixin.aggregate`.
+        """
+        trusted = kwargs.pop("trusted", None)
+        stages, owner, joins, subs, target = cls._plan_aggregation(pipeline, hydrate, projection)
+
+        recording = cls._start_recording("aggregate", stages)
+        with recording.phase("network"):
+            cursor = await _resolve(cls.get_collection().aggregate(stages, **kwargs))
+            documents = [document async for document in cursor]
+
+        # Assign the referenced specs to the documents (if required)
+        if joins:
+            with recording.phase("dereference"):
+                await owner._assign_joins(documents, joins, trusted)
+
+        # Add sub-specs to the documents (if required)
+        if subs:
+            with recording.phase("sub_specs"):
+                await owner._apply_sub_specs(documents, subs)
+
+        with recording.phase("construct"):
+            results = cls._hydrate_results(target, documents, trusted)
+        await cls._finish_recording(recording, len(results), kwargs)
+
+        return results
+
+    @classmethod
+    async def iter_aggregate(
+        cls,
+        pipeline: t.Iterable[dict[str, t.Any]],
+        hydrate: t.Any = True,
+        projection: t.Optional[t.Mapping[str, t.Any]] = None,
+        batch_size: int = 1000,
+        **kwargs: t.Any,
+    ) -> t.AsyncIterator[t.Any]:
+        """
+        Yield the results of an aggregation pipeline (see `aggregate`).
+        Results are streamed from the cursor in batches of `batch_size`, and
+        references and sub-specs are applied per batch.
+        """
+        trusted = kwargs.pop("trusted", None)
+        stages, owner, joins, subs, target = cls._plan_aggregation(pipeline, hydrate, projection)
+
+        cursor = await _resolve(cls.get_collection().aggregate(stages, batchSize=batch_size, **kwargs))
+
+        async for documents in achunked(cursor, batch_size):
+            # Assign the referenced specs to the documents (if required)
+            if joins:
+                await owner._assign_joins(documents, joins, trusted)
+
+            # Add sub-specs to the documents (if required)
+            if subs:
+                await owner._apply_sub_specs(documents, subs)
+
+            for result in cls._hydrate_results(target, documents, trusted):
+                yield result
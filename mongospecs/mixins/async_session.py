@@ -0,0 +1,38 @@
+import inspect
+import typing as t
+from contextlib import asynccontextmanager
+
+from blinker import signal
+from pymongo.errors import ConnectionFailure, OperationFailure
+
+from mongospecs.mixins.async_base import AsyncMongoBaseMixin
+
+
+async def _resolve(value: t.Any) -> t.Any:
+    """
+    Await `value` if the driver returned an awaitable. motor and pymongo's
+    async client disagree on which session methods are coroutines.
+    """
+    return await value if inspect.isawaitable(value) else value
+
+
+class AsyncSessionTransactionMixin(AsyncMongoBaseMixin):
+    @classmethod
+    @asynccontextmanager
+    async def transaction(cls, **start_transaction_kwargs: t.Any) -> t.AsyncGenerator[t.Any, None]:
+        """Async context manager for handling MongoDB transactions."""
+        if not cls._client:
+            raise RuntimeError("MongoDB client (_client) is not set. Cannot start a transaction.")
+        session = await _resolve(cls._client.start_session())
+        await _resolve(session.start_transaction(**start_transaction_kwargs))
+
+        try:
+            yield session  # Allow operations to be performed within this session
+            await session.commit_transaction()  # Commit if no exceptions
+            signal("transaction_committed").send(cls)  # Emit signal after commit
+        except (ConnectionFailure, OperationFailure) as e:
+            await session.abort_transaction()  # Abort on error
+            signal("transaction_aborted").send(cls)  # Emit signal after abort
+            raise e  # Re-raise the exception for handling
+        finally:
+            await session.end_session()
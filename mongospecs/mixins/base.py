@@ -1,18 +1,99 @@
 from __future__ import annotations
 
+import inspect
 import typing as t
 from abc import abstractmethod
+from concurrent.futures import Executor, ThreadPoolExecutor
 from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
 from copy import deepcopy
+from threading import Lock
+from types import MappingProxyType
 
-from bson import BSON, ObjectId
-from pymongo import MongoClient
+from blinker import signal
+from bson import ObjectId, decode
+from bson.raw_bson import RawBSONDocument
+from pymongo import ASCENDING, InsertOne, MongoClient, UpdateOne
 from pymongo.collection import Collection
 from pymongo.database import Database
+from pymongo.errors import PyMongoError
 from typing_extensions import Self
 
+from mongospecs.helpers.aggregation import ReferenceJoin, join_references
+from mongospecs.helpers.bulk import InsertChunk
+from mongospecs.helpers.cache import CACHEABLE_KWARGS, QueryCache, freeze
+from mongospecs.helpers.changes import diff, discard_snapshot, get_snapshot, set_snapshot
 from mongospecs.helpers.empty import Empty, EmptyObject
-from mongospecs.types import RawDocuments, SpecBaseType, SpecDocumentType, SpecsOrRawDocuments
+from mongospecs.helpers.fields import FieldPath, SpecMetadata, compile_path
+from mongospecs.helpers.identity import IdentityMap, get_identity_map
+from mongospecs.helpers.instrumentation import NULL_RECORDING, Instrumentation, Recording, explain_command
+from mongospecs.helpers.projection import ProjectionPlan
+from mongospecs.helpers.query import Condition, Group
+from mongospecs.types import FilterType, RawDocuments, SpecBaseType, SpecDocumentType, SpecsOrRawDocuments
+from mongospecs.utils import chunked, copy_refs, to_refs
+
+# Signals that invalidate a spec class's query cache
+CACHE_INVALIDATING_SIGNALS = ("inserted", "updated", "deleted", "soft_deleted")
+
+# The index hinted by covered Id reads, and the projection Id reads select
+ID_INDEX = [("_id", ASCENDING)]
+ID_PROJECTION = {"_id": True}
+
+# The class-level settings a view reads from the class it's a view of
+VIEW_SETTINGS = (
+    "_client",
+    "_db",
+    "_track_changes",
+    "_instrumentation",
+    "_trusted_reads",
+    "_dereference_chunk_size",
+    "_dereference_max_workers",
+    "_dereference_executor",
+)
+
+
+class _ViewSetting:
+    """
+    A class-level setting of a view that's read from the class it's a view of
+    each time it's used, so clients and settings configured after the view is
+    created still apply to it.
+    """
+
+    __slots__ = ("name",)
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __get__(self, instance: t.Any, owner: t.Any) -> t.Any:
+        return getattr(owner._view_of, self.name)
+
+
+# Compiled projection plans keyed by (spec class, frozen projection)
+_projection_plans = QueryCache(max_size=4096)
+
+# Executors shared by dereferences, created on first use and keyed by the
+# maximum number of worker threads (so classes with the same
+# `_dereference_max_workers` share, and are limited to, the same threads).
+_dereference_executors: dict[int, ThreadPoolExecutor] = {}
+_dereference_executors_lock = Lock()
+
+# Set within a dereference worker so nested dereferences run in that thread
+# (rather than waiting on the shared executor they're occupying).
+_dereferencing: ContextVar[bool] = ContextVar("mongospecs_dereferencing", default=False)
+
+
+def _shared_dereference_executor(max_workers: int) -> ThreadPoolExecutor:
+    """Return the shared dereference executor for `max_workers` threads"""
+    with _dereference_executors_lock:
+        executor = _dereference_executors.get(max_workers)
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mongospecs-dereference")
+            _dereference_executors[max_workers] = executor
+        return executor
+
+
+# A group of reference paths served by one lookup: (spec class, projection, paths, ids)
+ReferenceLookup = tuple[t.Any, dict[str, t.Any], list[str], set[t.Any]]
 
 
 class MongoBaseMixin(SpecBaseType):
@@ -22,16 +103,58 @@ class MongoBaseMixin(SpecBaseType):
     _collection_context: t.ClassVar[t.Optional[Collection[t.Any]]] = None
     _default_projection: t.ClassVar[dict[str, t.Any]] = {}
     _empty_type: t.ClassVar[t.Any] = Empty
+    _dereference_chunk_size: t.ClassVar[int] = 10000
+    _dereference_max_workers: t.ClassVar[int] = 4
+    _dereference_executor: t.ClassVar[t.Optional[Executor]] = None
+    _query_cache: t.ClassVar[t.Optional[QueryCache]] = None
+    _track_changes: t.ClassVar[bool] = False
+    _instrumentation: t.ClassVar[t.Optional[Instrumentation]] = None
+    _metadata: t.ClassVar[t.Optional[SpecMetadata]] = None
+    _trusted_reads: t.ClassVar[t.Optional[bool]] = None
+    _views: t.ClassVar[t.Optional[dict[tuple[str, ...], t.Any]]] = None
+    _view_of: t.ClassVar[t.Optional[type[MongoBaseMixin]]] = None
     _id: t.Union[EmptyObject, ObjectId]
 
     @classmethod
-    def from_document(cls, document: dict[str, t.Any]) -> Self:
+    def from_document(cls, document: dict[str, t.Any], trusted: t.Optional[bool] = None) -> Self:
+        """
+        Return a spec object for a document. Trusted documents (by default
+        those read by classes with `_trusted_reads` set) are built without
+        validation by the cheapest constructor the backend has.
+        """
+        if cls._trusted_reads if trusted is None else trusted:
+            return cls._construct(document)
+        return cls(**document)
+
+    @classmethod
+    def from_documents(cls, documents: t.Iterable[dict[str, t.Any]], trusted: t.Optional[bool] = None) -> list[Self]:
+        """Return a list of spec objects for documents (see `from_document`)"""
+        if cls._trusted_reads if trusted is None else trusted:
+            construct = cls._construct
+            return [construct(document) for document in documents]
+        return cls._validate_documents(documents)
+
+    @classmethod
+    def _construct(cls, document: dict[str, t.Any]) -> Self:
+        """Build a spec object for a trusted document without validating it"""
         return cls(**document)
 
     @classmethod
-    def from_raw_bson(cls, raw_bson: t.Any) -> t.Any:
-        decoded_data = BSON.decode(raw_bson)
-        return cls(**decoded_data)
+    def _validate_documents(cls, documents: t.Iterable[dict[str, t.Any]]) -> list[Self]:
+        """Build (and validate) spec objects for a batch of documents"""
+        return [cls(**document) for document in documents]
+
+    @classmethod
+    def from_raw_bson(cls, raw_bson: t.Union[bytes, RawBSONDocument], trusted: t.Optional[bool] = None) -> Self:
+        """
+        Return a spec object for a raw BSON document (bytes or
+        `RawBSONDocument`). The document is validated unless it's `trusted`
+        (by default if the class has `_trusted_reads` set, see
+        `from_document`).
+        """
+        if isinstance(raw_bson, RawBSONDocument):
+            raw_bson = raw_bson.raw
+        return cls.from_document(decode(raw_bson), bool(cls._trusted_reads if trusted is None else trusted))
 
     def __eq__(self, other: t.Any) -> bool:
         if not isinstance(other, self.__class__):
@@ -48,6 +171,10 @@ class MongoBaseMixin(SpecBaseType):
         if cls._collection_context is not None:
             return cls._collection_context
 
+        # Views read from the collection (and options) of the class they're of
+        if cls._view_of is not None:
+            return cls._view_of.get_collection()
+
         return t.cast(Collection[t.Any], getattr(cls.get_db(), cls._collection or cls.__name__))
 
     @classmethod
@@ -72,25 +199,165 @@ class MongoBaseMixin(SpecBaseType):
             cls._collection_context = existing_context
 
     @classmethod
-    def _path_to_value(cls, path: str, parent_dict: SpecDocumentType) -> t.Any:
-        """Return a value from a dictionary at the given path"""
-        keys: list[str] = cls._path_to_keys(path)
+    def enable_cache(cls, max_size: int = 1024, ttl: t.Optional[float] = None) -> QueryCache:
+        """
+        Enable a read-through cache (LRU with an optional TTL in seconds) for
+        `one`, `by_id`, `many` and `count` on this class. The cache is cleared
+        whenever the class emits an `inserted`, `updated`, `deleted` or
+        `soft_deleted` signal.
+        """
+        cls.disable_cache()
 
-        # Traverse to the tip of the path
-        child_dict = parent_dict
-        for key in keys[:-1]:
-            child_dict = child_dict.get(key)  # type: ignore[assignment]
+        cache = QueryCache(max_size=max_size, ttl=ttl)
+        for event in CACHE_INVALIDATING_SIGNALS:
+            signal(event).connect(cache.invalidate, sender=cls)
 
-            # unpaved path- return None
-            if child_dict is None:
-                return None
+        cls._query_cache = cache
+        return cache
+
+    @classmethod
+    def disable_cache(cls) -> None:
+        """Disable the query cache for this class"""
+        cache = cls.__dict__.get("_query_cache")
+        if cache is None:
+            return
 
-        return child_dict.get(keys[-1])
+        for event in CACHE_INVALIDATING_SIGNALS:
+            signal(event).disconnect(cache.invalidate, sender=cls)
+
+        cls._query_cache = None
+
+    @classmethod
+    def _copy_cached(cls, specs: list[t.Any]) -> list[t.Any]:
+        """
+        Return copies of specs stored in or served from the query cache, so
+        cached specs are never shared with (and changed by) callers.
+        """
+        copies = deepcopy(specs)
+        cls._snapshot(copies)
+        return copies
+
+    @classmethod
+    def _cache_for(
+        cls, method: str, filter: t.Any, kwargs: dict[str, t.Any]
+    ) -> tuple[t.Optional[QueryCache], t.Hashable]:
+        """
+        Return the query cache for this class and the key for a query, or
+        `(None, None)` if caching isn't enabled or the query can't be cached.
+        """
+        # Subclasses don't share their parent's cache (nor its invalidation),
+        # views share the cache of the class they're of (keyed apart).
+        cache = cls.__dict__.get("_query_cache")
+        scope = None
+        if cache is None and cls._view_of is not None:
+            cache = cls._view_of.__dict__.get("_query_cache")
+            scope = cls
+        if cache is None or not CACHEABLE_KWARGS.issuperset(kwargs):
+            return None, None
+
+        key = (
+            scope,
+            method,
+            freeze(filter),
+            freeze(kwargs.get("projection", cls._default_projection)),
+            freeze(kwargs.get("sort")),
+            kwargs.get("skip", 0),
+            kwargs.get("limit", 0),
+            kwargs.get("trusted"),
+        )
+        try:
+            hash(key)
+        except TypeError:
+            return None, None
+
+        return cache, key
+
+    @classmethod
+    def enable_instrumentation(
+        cls, slow_query_threshold: t.Optional[float] = None, explain: bool = False
+    ) -> Instrumentation:
+        """
+        Instrument the reads (`one`, `many`, `count`, `ids`, `find` and
+        `find_one`) this class and its subclasses send to the database. The
+        timing of each read (split into network, BSON decoding, dereferencing,
+        sub-spec and spec construction phases) is sent with the `query`
+        signal. Reads that take longer than `slow_query_threshold` seconds are
+        logged and sent with the `slow_query` signal, with their query plan if
+        `explain` is True.
+        """
+        cls._instrumentation = Instrumentation(slow_query_threshold=slow_query_threshold, explain=explain)
+        return cls._instrumentation
+
+    @classmethod
+    def disable_instrumentation(cls) -> None:
+        """Disable instrumentation for this class"""
+        cls._instrumentation = None
+
+    @classmethod
+    def _start_recording(cls, operation: str, filter: t.Any) -> t.Any:
+        """Return a recording for a read (a no-op unless instrumentation is enabled)"""
+        if cls._instrumentation is None:
+            return NULL_RECORDING
+        return Recording(cls._instrumentation, cls, operation, filter)
+
+    @classmethod
+    def _finish_recording(cls, recording: t.Any, documents: int, kwargs: dict[str, t.Any]) -> None:
+        """Complete and report the recording of a read"""
+        if recording is NULL_RECORDING:
+            return
+
+        timing = recording.finish(documents)
+        if timing.slow and recording.instrumentation.explain:
+            try:
+                timing.explain = cls.get_db().command(explain_command(cls.get_collection().name, timing, kwargs))
+            except PyMongoError as e:
+                timing.explain = {"error": str(e)}
+        recording.report()
+
+    @classmethod
+    def _path_to_value(cls, path: str, parent_dict: SpecDocumentType) -> t.Any:
+        """Return a value from a dictionary at the given path"""
+        return cls.get_metadata().path(path).get(parent_dict)
 
     @classmethod
     def _path_to_keys(cls, path: str) -> list[str]:
         """Return a list of keys for a given path"""
-        return path.split(".")
+        return list(cls.get_metadata().path(path).keys)
+
+    @classmethod
+    def _document_path(cls, field: str) -> str:
+        """Return a `.` separated field path with its root mapped to its document key"""
+        root, _, rest = field.partition(".")
+        root = cls.get_metadata().aliases.get(root, root)
+        return f"{root}.{rest}" if rest else root
+
+    @classmethod
+    def _find_ids(cls, filter: t.Any, covered: bool, **kwargs: t.Any) -> t.Any:
+        """
+        Return a cursor over the Ids of the documents matching a filter. If
+        `covered` the `_id` index is hinted so (for filters on the Id alone)
+        Ids are read from the index without fetching the documents.
+        """
+        cursor = cls.get_collection().find(filter, projection=dict(ID_PROJECTION), **kwargs)
+        if covered:
+            cursor = cursor.hint(ID_INDEX)
+        return cursor
+
+    @classmethod
+    def _value_paths(cls, fields: t.Sequence[str]) -> tuple[dict[str, t.Any], list[FieldPath]]:
+        """
+        Return the projection selecting the values at the given `.` separated
+        paths (field names are mapped to their document keys) and the compiled
+        paths to read them with. The Id is only selected if it's asked for, so
+        queries selecting indexed fields can be covered by the index.
+        """
+        if not fields:
+            raise ValueError("At least one field is required")
+
+        paths = cls.get_metadata().paths([cls._document_path(field) for field in fields])
+        projection: dict[str, t.Any] = {path.path: True for path in paths}
+        projection.setdefault("_id", False)
+        return projection, paths
 
     @classmethod
     def _ensure_specs(cls, documents: SpecsOrRawDocuments) -> t.Sequence[Self]:
@@ -106,66 +373,538 @@ class MongoBaseMixin(SpecBaseType):
         return specs
 
     @classmethod
-    def _apply_sub_specs(cls, documents: RawDocuments, subs: dict[str, t.Any]) -> None:
+    def _prepare_inserts(cls, specs: t.Sequence[t.Any]) -> list[dict[str, t.Any]]:
+        """
+        Return the documents to insert for a list of specs, Ids are assigned
+        (client side, as the driver would) to documents that don't have one so
+        they're known even if the insert partially fails.
+        """
+        documents = [to_refs(spec.to_dict()) for spec in specs]
+        for document in documents:
+            if not document.get("_id"):
+                document["_id"] = ObjectId()
+        return documents
+
+    @classmethod
+    def _apply_inserts(
+        cls,
+        specs: t.Sequence[t.Any],
+        documents: list[dict[str, t.Any]],
+        errors: list[dict[str, t.Any]],
+        ordered: bool,
+    ) -> list[t.Any]:
+        """
+        Apply the Ids of the documents that were inserted (i.e. without a write
+        error, or before the first one for an ordered insert) to their specs and
+        return them.
+        """
+        failed = {error["index"] for error in errors}
+        stop = min(failed) if ordered and failed else len(specs)
+
+        inserted = []
+        for i, (spec, document) in enumerate(zip(specs[:stop], documents)):
+            if i not in failed:
+                spec._id = document["_id"]
+                inserted.append(spec)
+
+        cls._identity_map_add(inserted)
+        cls._snapshot(inserted)
+        return inserted
+
+    @classmethod
+    def _upsert_operation(cls, spec: t.Any, fields: t.Sequence[str]) -> tuple[dict[str, t.Any], dict[str, t.Any]]:
+        """
+        Return the filter and update for a write that atomically upserts a spec
+        by its `_id`. Without fields the whole document is `$set` (as `update`
+        does, so stored keys that aren't on the spec are kept), otherwise the
+        fields are `$set` and the rest of the document is only set if the
+        upsert inserts it (`$setOnInsert`).
+        """
+        spec_document = spec.to_dict()
+        document = to_refs(spec_document)
+        document.pop("_id", None)
+
+        if not fields:
+            # An empty `$set` is rejected, a spec with only an Id is inserted if
+            # it's missing and otherwise left as it is.
+            if not document:
+                return {"_id": spec._id}, {"$setOnInsert": {"_id": spec._id}}
+            return {"_id": spec._id}, {"$set": document}
+
+        field_paths = cls.get_metadata().paths(fields)
+        update: dict[str, t.Any] = {"$set": to_refs({p.path: p.get(spec_document) for p in field_paths})}
+
+        # Insert-only values can't overlap the fields being set
+        roots = {p.keys[0] for p in field_paths}
+        on_insert = {k: v for k, v in document.items() if k not in roots}
+        if on_insert:
+            update["$setOnInsert"] = on_insert
+
+        return {"_id": spec._id}, update
+
+    # Writes, the sync and async CRUD mixins make the database calls between
+    # preparing and completing each operation.
+
+    def _prepare_insert(self) -> dict[str, t.Any]:
+        """Send the `insert` signal and return the document to insert for this spec"""
+        signal("insert").send(self.__class__, specs=[self])
+
+        document_dict = self.to_dict()
+        if not self._id:
+            document_dict.pop("_id", None)
+        return t.cast(dict[str, t.Any], to_refs(document_dict))
+
+    @classmethod
+    def _prepare_insert_many(cls, documents: SpecsOrRawDocuments) -> tuple[t.Sequence[Self], list[dict[str, t.Any]]]:
+        """Send the `insert` signal and return the specs and the documents to insert"""
+        # Ensure all documents have been converted to specs
+        specs = cls._ensure_specs(documents)
+
+        # Send insert signal
+        signal("insert").send(cls, specs=specs)
+
+        # Prepare the documents to be inserted
+        _documents = [to_refs(f.to_dict()) for f in specs]
+        for _document in _documents:
+            if not _document.get("_id"):
+                _document.pop("_id", None)
+
+        return specs, _documents
+
+    @classmethod
+    def _complete_inserts(cls, specs: t.Sequence[t.Any], ids: t.Iterable[t.Any]) -> None:
+        """Apply the Ids of inserted documents to their specs and send the `inserted` signal"""
+        for spec, id in zip(specs, ids):
+            spec._id = id
+        cls._identity_map_add(specs)
+        cls._snapshot(specs)
+
+        # Send inserted signal
+        signal("inserted").send(cls, specs=specs)
+
+    @classmethod
+    def _prepare_insert_chunk(cls, chunk: SpecsOrRawDocuments) -> tuple[list[Self], list[dict[str, t.Any]]]:
+        """Send the `insert` signal for a chunk of a chunked insert and return its specs and documents"""
+        # Ensure all documents have been converted to specs
+        specs = list(cls._ensure_specs(chunk))
+
+        # Send insert signal
+        signal("insert").send(cls, specs=specs)
+
+        return specs, cls._prepare_inserts(specs)
+
+    @classmethod
+    def _complete_insert_chunk(
+        cls,
+        index: int,
+        chunk_size: int,
+        specs: list[Self],
+        documents: list[dict[str, t.Any]],
+        errors: list[dict[str, t.Any]],
+        ordered: bool,
+    ) -> InsertChunk[Self]:
+        """Apply the outcome of inserting a chunk of a chunked insert and send the `inserted` signal"""
+        inserted = cls._apply_inserts(specs, documents, errors, ordered)
+
+        # Send inserted signal
+        if inserted:
+            signal("inserted").send(cls, specs=inserted)
+
+        return InsertChunk(index, index * chunk_size, specs, inserted, errors)
+
+    def _prepare_unset(self, fields: t.Sequence[str]) -> dict[str, t.Any]:
+        """Send the `update` signal, clear the fields of this spec and return the update to write"""
+        signal("update").send(self.__class__, specs=[self])
+
+        # Clear the fields from the document and build the unset object
+        self._clear_fields(fields)
+        return {"$unset": {field: True for field in fields}}
+
+    def _complete_unset(self, fields: t.Sequence[str]) -> None:
+        """Snapshot the unset fields of this spec and send the `updated` signal"""
+        self._identity_map_discard([self])
+        self._snapshot_paths(self, {field: getattr(self, field) for field in fields})
+
+        # Send updated signal
+        signal("updated").send(self.__class__, specs=[self])
+
+    def _prepare_update(self, fields: t.Sequence[str]) -> tuple[dict[str, t.Any], t.Optional[dict[str, t.Any]]]:
+        """
+        Send the `update` signal and return the values to set for this spec
+        along with the update to write (None if it's tracked and nothing has
+        changed).
+        """
+        self_document = self.to_dict()
+        if "_id" not in self_document:
+            raise ValueError("Can't update documents without `_id`")
+
+        # Send update signal
+        signal("update").send(self.__class__, specs=[self])
+
+        # Check for selective updates
+        if fields:
+            document = to_refs({p.path: p.get(self_document) for p in self.get_metadata().paths(fields)})
+        else:
+            # Only the values that have changed are updated for tracked specs
+            document = self._changed_document(self, to_refs(self_document))
+
+        # Prepare the document to be updated
+        document.pop("_id", None)
+
+        if document or not self._track_changes:
+            return document, {"$set": document}
+        return document, None
+
+    def _complete_update(self, fields: t.Sequence[str], document: dict[str, t.Any]) -> None:
+        """Snapshot the updated values of this spec and send the `updated` signal"""
+        self._identity_map_discard([self])
+
+        if fields:
+            self._snapshot_paths(self, document)
+        else:
+            self._snapshot([self])
+
+        # Send updated signal
+        signal("updated").send(self.__class__, specs=[self])
+
+    def _prepare_upsert(self, fields: t.Sequence[str]) -> tuple[dict[str, t.Any], dict[str, t.Any]]:
+        """Send the `update` signal and return the filter and update that atomically upsert this spec"""
+        signal("update").send(self.__class__, specs=[self])
+        return self._upsert_operation(self, fields)
+
+    def _complete_upsert(self, fields: t.Sequence[str], update: dict[str, t.Any], upserted_id: t.Any) -> None:
+        """Snapshot this spec after an atomic upsert and send the `inserted` or `updated` signal"""
+        if fields and upserted_id is None:
+            self._snapshot_paths(self, update["$set"])
+        else:
+            self._snapshot([self])
+
+        # Send inserted or updated signal
+        if upserted_id is None:
+            self._identity_map_discard([self])
+            signal("updated").send(self.__class__, specs=[self])
+        else:
+            self._identity_map_add([self])
+            signal("inserted").send(self.__class__, specs=[self])
+
+    def _prepare_delete(self) -> None:
+        """Send the `delete` signal for this spec"""
+        if "_id" not in self.to_dict():
+            raise ValueError("Can't delete documents without `_id`")
+
+        # Send delete signal
+        signal("delete").send(self.__class__, specs=[self])
+
+    @classmethod
+    def _prepare_delete_many(cls, documents: SpecsOrRawDocuments) -> tuple[t.Sequence[Self], list[t.Any]]:
+        """Send the `delete` signal and return the specs and their Ids"""
+        # Ensure all documents have been converted to specs
+        specs = cls._ensure_specs(documents)
+
+        if not all(f._id for f in specs):
+            raise ValueError("Can't delete documents without `_id`s")
+
+        # Send delete signal
+        signal("delete").send(cls, specs=specs)
+
+        return specs, [f._id for f in specs]
+
+    @classmethod
+    def _complete_deletes(cls, specs: t.Sequence[t.Any]) -> None:
+        """Send the `deleted` signal for deleted specs"""
+        cls._identity_map_discard(specs)
+
+        # Send deleted signal
+        signal("deleted").send(cls, specs=specs)
+
+    def _prepare_soft_delete(self) -> dict[str, t.Any]:
+        """Send the `soft_delete` signal and return the update that sets this spec's deleted flag"""
+        if "_id" not in self.to_dict():
+            raise ValueError("Can't delete documents without `_id`")
+
+        # Send delete signal
+        signal("soft_delete").send(self.__class__, specs=[self])
+
+        return {"$set": {"deleted": True}}
+
+    def _complete_soft_delete(self) -> None:
+        """Send the `soft_deleted` signal for this spec"""
+        self._identity_map_discard([self])
+
+        # Send deleted signal
+        signal("soft_deleted").send(self.__class__, specs=[self])
+
+    @classmethod
+    def _prepare_update_many(
+        cls, documents: SpecsOrRawDocuments, fields: t.Sequence[str], update_one_kwargs: t.Any
+    ) -> tuple[t.Sequence[Self], list[dict[str, t.Any]], list[UpdateOne]]:
+        """
+        Send the `update` signal and return the specs, the values to set for
+        each and the requests to write (skipping tracked specs where nothing
+        has changed).
+        """
+        # Ensure all documents have been converted to specs
+        specs = cls._ensure_specs(documents)
+
+        if not all(f._id for f in specs):
+            raise ValueError("Can't update documents without `_id`s")
+
+        # Send update signal
+        signal("update").send(cls, specs=specs)
+
+        # Check for selective updates
+        _documents = []
+        if fields:
+            field_paths = cls.get_metadata().paths(fields)
+            for spec in specs:
+                spec_document = spec.to_dict()
+                _documents.append(to_refs({p.path: p.get(spec_document) for p in field_paths}))
+        else:
+            # Only the values that have changed are updated for tracked specs
+            for spec in specs:
+                document = cls._changed_document(spec, to_refs(spec.to_dict()))
+                document.pop("_id", None)
+                _documents.append(document)
+
+        requests = [
+            UpdateOne({"_id": spec._id}, {"$set": document}, **(update_one_kwargs or {}))
+            for spec, document in zip(specs, _documents)
+            if document or not cls._track_changes
+        ]
+        return specs, _documents, requests
+
+    @classmethod
+    def _complete_update_many(
+        cls, specs: t.Sequence[t.Any], fields: t.Sequence[str], documents: list[dict[str, t.Any]]
+    ) -> None:
+        """Snapshot the updated values of the specs and send the `updated` signal"""
+        cls._identity_map_discard(specs)
+
+        if fields:
+            for spec, document in zip(specs, documents):
+                cls._snapshot_paths(spec, document)
+        else:
+            cls._snapshot(specs)
+
+        # Send updated signal
+        signal("updated").send(cls, specs=specs)
+
+    @classmethod
+    def _prepare_upsert_many(
+        cls, documents: SpecsOrRawDocuments, fields: t.Sequence[str]
+    ) -> tuple[t.Sequence[Self], list[t.Any], t.Callable[[t.Any], None]]:
+        """
+        Send the `insert` and `update` signals and return the specs, the
+        requests to write along with a function that completes the upsert
+        given the result of the write.
+        """
+        # Ensure all documents have been converted to specs
+        specs = cls._ensure_specs(documents)
+        new_specs = [spec for spec in specs if not spec._id]
+        upsert_specs = [spec for spec in specs if spec._id]
+
+        # Send insert and update signals
+        if new_specs:
+            signal("insert").send(cls, specs=new_specs)
+        if upsert_specs:
+            signal("update").send(cls, specs=upsert_specs)
+
+        # Prepare the writes, Ids for new documents are assigned up front so
+        # they can be applied to the specs.
+        new_documents = cls._prepare_inserts(new_specs)
+        requests: list[t.Any] = [InsertOne(document) for document in new_documents]
+        upserts = []
+        for spec in upsert_specs:
+            filter, document = cls._upsert_operation(spec, fields)
+            upserts.append(document)
+            requests.append(UpdateOne(filter, document, upsert=True))
+
+        def complete(result: t.Any) -> None:
+            # Apply the Ids to the new specs
+            for spec, document in zip(new_specs, new_documents):
+                spec._id = document["_id"]
+
+            # Split the upserted specs by whether they were inserted or updated
+            upserted_ids = set((result.upserted_ids or {}).values())
+            inserted = new_specs + [spec for spec in upsert_specs if spec._id in upserted_ids]
+            updated = [spec for spec in upsert_specs if spec._id not in upserted_ids]
+            cls._identity_map_add(inserted)
+            cls._identity_map_discard(updated)
+            cls._snapshot(inserted)
+            if fields:
+                for spec, document in zip(upsert_specs, upserts):
+                    if spec._id not in upserted_ids:
+                        cls._snapshot_paths(spec, document["$set"])
+            else:
+                cls._snapshot(updated)
+
+            # Send inserted and updated signals
+            if inserted:
+                signal("inserted").send(cls, specs=inserted)
+            if updated:
+                signal("updated").send(cls, specs=updated)
+
+        return specs, requests, complete
+
+    @classmethod
+    def _prepare_unset_many(
+        cls, documents: SpecsOrRawDocuments, fields: t.Sequence[str]
+    ) -> tuple[t.Sequence[Self], dict[str, t.Any], dict[str, t.Any]]:
+        """Send the `update` signal and return the specs with the filter and update to write"""
+        # Ensure all documents have been converted to specs
+        specs = cls._ensure_specs(documents)
+
+        if not all(f._id for f in specs):
+            raise ValueError("Can't update documents without `_id`s")
+
+        # Send update signal
+        signal("update").send(cls, specs=specs)
+
+        ids = [spec._id for spec in specs if spec._id]
+        return specs, {"_id": {"$in": ids}}, {"$unset": {field: True for field in fields}}
+
+    @classmethod
+    def _complete_unset_many(cls, specs: t.Sequence[t.Any]) -> None:
+        """Send the `updated` signal for specs with unset fields"""
+        cls._identity_map_discard(specs)
+
+        # The specs keep their values so they're no longer as stored
+        for spec in specs:
+            discard_snapshot(spec)
+
+        # Send updated signal
+        signal("updated").send(cls, specs=specs)
+
+    @classmethod
+    def _prepare_find(cls, filter: FilterType, kwargs: dict[str, t.Any]) -> tuple[t.Any, t.Any, t.Any]:
+        """
+        Flatten the projection in the arguments of a find and return the
+        filter with the references and sub-specs to apply to the documents.
+        """
+        # Flatten the projection
+        kwargs["projection"], references, subs = cls.projection_plan(
+            kwargs.get("projection", cls._default_projection)
+        ).unpack()
+
+        if isinstance(filter, (Condition, Group)):
+            filter = filter.to_dict()
+
+        return to_refs(filter), references, subs
+
+    def _complete_reload(self, document: SpecDocumentType, kwargs: dict[str, t.Any]) -> None:
+        """Apply a reloaded document to this spec"""
+        for field in document:
+            setattr(self, field, document[field])
+        self._snapshot_paths(self, dict(document))
+
+        # A reload with the default projection leaves this spec complete
+        if self._identity_map_for(kwargs.get("projection", self._default_projection)) is not None:
+            self._identity_map_add([self])
+
+    @classmethod
+    def _active_filter(cls, filter: FilterType) -> t.MutableMapping[str, t.Any]:
+        """Return the filter restricted to active documents (not soft deleted)"""
+        if filter is None:
+            filter = {}
+        if isinstance(filter, (Condition, Group)):
+            filter = filter.to_dict()
+        filter["deleted"] = {"$ne": True}  # Exclude soft deleted documents
+        return filter
+
+    @classmethod
+    def _apply_sub_specs(cls, documents: RawDocuments, subs: t.Mapping[str, t.Any]) -> None:
         """Convert embedded documents to sub-specs for one or more documents"""
 
         # Dereference each reference
         for path, projection in subs.items():
-            # Get the SubSpec class we'll use to wrap the embedded document
-            sub = None
-            expect_map = False
-            if "$sub" in projection:
-                sub = projection.pop("$sub")
-            elif "$sub." in projection:
-                sub = projection.pop("$sub.")
-                expect_map = True
-            else:
-                continue
+            sub, raw_subs, sub_projection = cls._wrap_sub_specs(documents, path, projection)
 
-            # Add sub-specs to the documents
-            raw_subs: list[t.Any] = []
-            for document in documents:
-                value = cls._path_to_value(path, document)
-                if value is None:
-                    continue
+            # Apply the projection to the list of sub specs
+            if sub is not None and sub_projection:
+                sub._apply_projection(raw_subs, sub_projection)
 
-                if isinstance(value, dict):
-                    if expect_map:
-                        # Dictionary of embedded documents
-                        raw_subs += value.values()
-                        for k, v in value.items():
-                            if isinstance(v, list):
-                                value[k] = [sub(u) for u in v if isinstance(u, dict)]
-                            else:
-                                value[k] = sub(**v)
-
-                    # Single embedded document
-                    else:
-                        raw_subs.append(value)
-                        value = sub(**value)
-
-                elif isinstance(value, list):
-                    # List of embedded documents
-                    raw_subs += value
-                    value = [sub(**v) for v in value if isinstance(v, dict)]
+    @classmethod
+    def _wrap_sub_specs(
+        cls, documents: RawDocuments, path: str, projection: dict[str, t.Any]
+    ) -> tuple[t.Any, list[t.Any], dict[str, t.Any]]:
+        """
+        Wrap the embedded documents at `path` in the sub-spec class named by
+        the `$sub`/`$sub.` projection. Returns the sub-spec class, the raw
+        embedded documents and the remaining projection for the sub-specs.
+        """
+
+        # Get the SubSpec class we'll use to wrap the embedded document
+        sub = None
+        expect_map = False
+        if "$sub" in projection:
+            sub = projection["$sub"]
+        elif "$sub." in projection:
+            sub = projection["$sub."]
+            expect_map = True
+        else:
+            return None, [], {}
+        projection = {k: v for k, v in projection.items() if k not in ["$sub", "$sub."]}
+
+        # Add sub-specs to the documents
+        field_path = cls.get_metadata().path(path)
+        raw_subs: list[t.Any] = []
+        for document in documents:
+            value = field_path.get(document)
+            if value is None:
+                continue
 
+            if isinstance(value, dict):
+                if expect_map:
+                    # Dictionary of embedded documents
+                    raw_subs += value.values()
+                    for k, v in value.items():
+                        if isinstance(v, list):
+                            value[k] = [sub(u) for u in v if isinstance(u, dict)]
+                        else:
+                            value[k] = sub(**v)
+
+                # Single embedded document
                 else:
-                    raise TypeError("Not a supported sub-spec type")
+                    raw_subs.append(value)
+                    value = sub(**value)
 
-                child_document = document
-                keys = cls._path_to_keys(path)
-                for key in keys[:-1]:
-                    child_document = child_document[key]
-                child_document[keys[-1]] = value
+            elif isinstance(value, list):
+                # List of embedded documents
+                raw_subs += value
+                value = [sub(**v) for v in value if isinstance(v, dict)]
 
-            # Apply the projection to the list of sub specs
-            if projection:
-                sub._apply_projection(raw_subs, projection)
+            else:
+                raise TypeError("Not a supported sub-spec type")
+
+            field_path.replace(document, value)
+
+        return sub, raw_subs, projection
 
     @classmethod
-    def _flatten_projection(
-        cls, projection: dict[str, t.Any]
-    ) -> tuple[dict[str, t.Any], dict[str, t.Any], dict[str, t.Any]]:
+    def projection_plan(cls, projection: t.Union[t.Mapping[str, t.Any], ProjectionPlan, None] = None) -> ProjectionPlan:
+        """
+        Return the compiled plan for a structured projection (an empty
+        projection selects every field). Plans are cached per spec class and
+        projection, a plan can be built up front and passed as the
+        `projection` of a read to skip the lookup.
+        """
+        if isinstance(projection, ProjectionPlan):
+            return projection
+
+        key = (cls, freeze(projection) if projection else None)
+        try:
+            found, plan = _projection_plans.get(key)
+        except TypeError:
+            # Projections that can't be hashed aren't cached
+            return cls._flatten_projection(projection or {})
+
+        if not found:
+            plan = cls._flatten_projection(projection or {})
+            _projection_plans.set(key, plan)
+        return t.cast(ProjectionPlan, plan)
+
+    @classmethod
+    def _flatten_projection(cls, projection: t.Mapping[str, t.Any]) -> ProjectionPlan:
         """
         Flatten a structured projection (structure projections support for
         projections of (to be) dereferenced fields.
@@ -173,7 +912,9 @@ class MongoBaseMixin(SpecBaseType):
 
         # If `projection` is empty return a full projection based on `_fields`
         if not projection:
-            return {f: True for f in cls.get_fields()}, {}, {}
+            return ProjectionPlan(
+                MappingProxyType({f: True for f in cls.get_fields()}), MappingProxyType({}), MappingProxyType({})
+            )
 
         # Flatten the projection
         flat_projection: dict[str, t.Any] = {}
@@ -235,62 +976,342 @@ class MongoBaseMixin(SpecBaseType):
         if inclusive:
             flat_projection = {f: True for f in cls.get_fields()}
 
-        return flat_projection, references, subs
+        return ProjectionPlan(MappingProxyType(flat_projection), MappingProxyType(references), MappingProxyType(subs))
 
     @classmethod
-    def _dereference(cls, documents: RawDocuments, references: dict[str, t.Any]) -> None:
-        """Dereference one or more documents"""
+    def _dereference(
+        cls, documents: RawDocuments, references: t.Mapping[str, t.Any], trusted: t.Optional[bool] = None
+    ) -> None:
+        """
+        Dereference one or more documents. Paths referencing the same spec class
+        (with the same projection) share a lookup, `$in` lists are split into
+        chunks of `_dereference_chunk_size` Ids and the resulting queries are
+        run in parallel.
+
+        Queries run on the class's `_dereference_executor` if one is set,
+        otherwise on a thread pool of `_dereference_max_workers` threads that's
+        shared by every class with that setting, which therefore also limits
+        the number of dereference queries those classes run at once.
+        """
+        lookups = cls._reference_lookups(documents, references)
+        queries = cls._reference_queries(lookups)
+
+        def run_query(query: tuple[int, t.Any, dict[str, t.Any], list[t.Any]]) -> list[t.Any]:
+            _, ref, projection, ids = query
+            return ref.many({"_id": {"$in": ids}}, projection=projection, trusted=trusted)  # type: ignore[no-any-return]
+
+        def run_worker_query(query: tuple[int, t.Any, dict[str, t.Any], list[t.Any]]) -> list[t.Any]:
+            _dereferencing.set(True)
+            return run_query(query)
+
+        # Find the referenced documents (each thread runs in a copy of the
+        # caller's context so the identity map is shared).
+        executor = None
+        if len(queries) > 1 and not _dereferencing.get():
+            executor = cls._dereference_executor
+            if executor is None and cls._dereference_max_workers > 1:
+                executor = _shared_dereference_executor(cls._dereference_max_workers)
+
+        if executor is not None:
+            futures = [executor.submit(copy_context().run, run_worker_query, query) for query in queries]
+            results = [future.result() for future in futures]
+        else:
+            results = [run_query(query) for query in queries]
+
+        # Add dereferenced specs to the documents
+        cls._assign_lookups(documents, lookups, queries, results)
 
-        # Dereference each reference
+    @classmethod
+    def _reference_lookups(cls, documents: RawDocuments, references: t.Mapping[str, t.Any]) -> list[ReferenceLookup]:
+        """Group the reference paths in a projection by the spec class (and projection) they reference"""
+        lookups: list[ReferenceLookup] = []
         for path, projection in references.items():
             # Check there is a $ref in the projection, else skip it
             if "$ref" not in projection:
                 continue
 
+            ref = projection["$ref"]
+            ref_projection = {k: v for k, v in projection.items() if k != "$ref"}
+
             # Collect Ids of documents to dereference
-            ids = set()
-            for document in documents:
-                value = cls._path_to_value(path, document)
-                if not value:
-                    continue
+            ids = cls._reference_ids(documents, path)
 
-                if isinstance(value, list):
-                    ids.update(value)
+            for lookup_ref, lookup_projection, paths, lookup_ids in lookups:
+                if lookup_ref is ref and lookup_projection == ref_projection:
+                    paths.append(path)
+                    lookup_ids.update(ids)
+                    break
+            else:
+                lookups.append((ref, ref_projection, [path], ids))
 
-                elif isinstance(value, dict):
-                    ids.update(value.values())
+        return lookups
 
-                else:
-                    ids.add(value)
+    @classmethod
+    def _reference_queries(
+        cls, lookups: list[ReferenceLookup]
+    ) -> list[tuple[int, t.Any, dict[str, t.Any], list[t.Any]]]:
+        """
+        Split each lookup into `$in` queries of at most `_dereference_chunk_size`
+        Ids, skipping Ids already held in the identity map.
+        """
+        queries = []
+        for i, (ref, projection, _, ids) in enumerate(lookups):
+            identity_map = ref._identity_map_for(projection)
+            if identity_map is not None:
+                ids = {id for id in ids if (ref, id) not in identity_map}
 
-            # Find the referenced documents
-            ref = projection.pop("$ref")
+            queries += [(i, ref, projection, chunk) for chunk in chunked(ids, cls._dereference_chunk_size)]
 
-            specs = ref.many({"_id": {"$in": list(ids)}}, projection=projection)
-            specs = {f._id: f for f in specs}
+        return queries
 
-            # Add dereferenced specs to the document
-            for document in documents:
-                value = cls._path_to_value(path, document)
-                if not value:
-                    continue
+    @classmethod
+    def _assign_lookups(
+        cls,
+        documents: RawDocuments,
+        lookups: list[ReferenceLookup],
+        queries: list[tuple[int, t.Any, dict[str, t.Any], list[t.Any]]],
+        results: list[list[t.Any]],
+    ) -> None:
+        """Replace the Ids in the documents with the specs found for each lookup"""
+        identity_maps = [ref._identity_map_for(projection) for ref, projection, _, _ in lookups]
+
+        # Start from the specs already held in the identity map
+        specs: list[dict[t.Any, t.Any]] = [{} for _ in lookups]
+        for lookup_specs, (ref, _, _, ids), identity_map in zip(specs, lookups, identity_maps):
+            if identity_map is not None:
+                held = {id: identity_map.get(ref, id) for id in ids}
+                lookup_specs.update({id: spec for id, spec in held.items() if spec is not None})
+
+        for (i, *_), result in zip(queries, results):
+            specs[i].update({f._id: f for f in result})
+
+            identity_map = identity_maps[i]
+            if identity_map is not None:
+                for spec in result:
+                    identity_map.add(spec)
+
+        for (_, _, paths, _), lookup_specs in zip(lookups, specs):
+            for path in paths:
+                cls._assign_references(documents, path, lookup_specs)
+
+    @classmethod
+    def _reference_ids(cls, documents: RawDocuments, path: str) -> set[t.Any]:
+        """Return the set of Ids referenced at `path` across the documents"""
+        field_path = cls.get_metadata().path(path)
+        ids = set()
+        for document in documents:
+            value = field_path.get(document)
+            if not value:
+                continue
 
-                if isinstance(value, list):
-                    # List of references
-                    value = [specs[id] for id in value if id in specs]
+            if isinstance(value, list):
+                ids.update(value)
 
-                elif isinstance(value, dict):
-                    # Dictionary of references
-                    value = {key: specs.get(id) for key, id in value.items()}
+            elif isinstance(value, dict):
+                ids.update(value.values())
 
-                else:
-                    value = specs.get(value)
+            else:
+                ids.add(value)
 
-                child_document = document
-                keys = cls._path_to_keys(path)
-                for key in keys[:-1]:
-                    child_document = child_document[key]
-                child_document[keys[-1]] = value
+        return ids
+
+    @classmethod
+    def _assign_references(cls, documents: RawDocuments, path: str, specs: dict[t.Any, t.Any]) -> None:
+        """Replace the Ids at `path` in the documents with the referenced specs"""
+        field_path = cls.get_metadata().path(path)
+        for document in documents:
+            value = field_path.get(document)
+            if not value:
+                continue
+
+            if isinstance(value, list):
+                # List of references
+                value = [specs[id] for id in value if id in specs]
+
+            elif isinstance(value, dict):
+                # Dictionary of references
+                value = {key: specs.get(id) for key, id in value.items()}
+
+            else:
+                value = specs.get(value)
+
+            field_path.replace(document, value)
+
+    @classmethod
+    def _plan_aggregation(
+        cls, pipeline: t.Iterable[dict[str, t.Any]], hydrate: t.Any, projection: t.Any
+    ) -> tuple[list[dict[str, t.Any]], t.Any, list[ReferenceJoin], t.Mapping[str, t.Any], t.Any]:
+        """
+        Return the stages to run for an aggregation, the spec class the
+        projection is resolved by, the joins and sub-spec projections to apply
+        to the results and the class (if any) to hydrate the results into.
+        """
+        stages = list(pipeline)
+        target = cls if hydrate is True else hydrate or None
+        owner = target if isinstance(target, type) and issubclass(target, MongoBaseMixin) else cls
+
+        # Results hydrated into a spec class are projected to its fields
+        if projection is None and owner is target:
+            projection = owner._default_projection
+
+        joins: list[ReferenceJoin] = []
+        subs: t.Mapping[str, t.Any] = {}
+        if projection is not None:
+            flat_projection, references, subs = owner.projection_plan(projection).unpack()
+            lookups, joins = join_references(references)
+            stages += [{"$project": flat_projection}, *lookups]
+
+        return stages, owner, joins, subs, target
+
+    @classmethod
+    def _hydrate_results(cls, target: t.Any, documents: list[t.Any], trusted: t.Optional[bool] = None) -> list[t.Any]:
+        """Return the results of an aggregation hydrated into the target class (if any)"""
+        if not target:
+            return documents
+        if issubclass(target, MongoBaseMixin):
+            specs: list[t.Any] = target.from_documents(documents, trusted)
+            return specs
+        return [target(**document) for document in documents]
+
+    @classmethod
+    def _assign_joins(
+        cls, documents: RawDocuments, joins: list[ReferenceJoin], trusted: t.Optional[bool] = None
+    ) -> None:
+        """Replace the Ids in the documents with the specs fetched by `$lookup` stages"""
+        for join in joins:
+            raw, joined, unjoined = cls._take_joined(documents, join)
+
+            # Apply the projection to the referenced documents
+            plan = join.ref.projection_plan(join.projection)
+            if plan.references:
+                join.ref._dereference(raw, plan.references, trusted)
+            if plan.subs:
+                join.ref._apply_sub_specs(raw, plan.subs)
+
+            cls._assign_references(joined, join.path, cls._joined_specs(join, raw, trusted))
+
+            # Dictionaries of references can't be looked up server side
+            if unjoined:
+                cls._dereference(unjoined, {join.path: {"$ref": join.ref, **join.projection}}, trusted)
+
+    @classmethod
+    def _take_joined(
+        cls, documents: RawDocuments, join: ReferenceJoin
+    ) -> tuple[list[dict[str, t.Any]], list[t.Any], list[t.Any]]:
+        """
+        Remove the documents looked up for a join from the documents. Returns
+        the (distinct) looked up documents, the documents they're assigned to
+        and the documents holding references the lookup can't resolve.
+        """
+        field_path = cls.get_metadata().path(join.path)
+        raw: dict[t.Any, dict[str, t.Any]] = {}
+        joined: list[t.Any] = []
+        unjoined: list[t.Any] = []
+        for document in documents:
+            found = document.pop(join.field, None) or []
+            if isinstance(field_path.get(document), dict):
+                unjoined.append(document)
+                continue
+
+            joined.append(document)
+            for ref_document in found:
+                raw.setdefault(ref_document["_id"], ref_document)
+
+        # Documents that weren't projected by the lookup are looked up whole
+        if join.fields is not None:
+            # Fields may be stored under their name or their alias, so both are kept
+            fields = join.fields.union(join.ref._field_aliases().values())
+            return [{k: v for k, v in d.items() if k in fields} for d in raw.values()], joined, unjoined
+
+        return list(raw.values()), joined, unjoined
+
+    @classmethod
+    def _joined_specs(
+        cls, join: ReferenceJoin, raw: list[dict[str, t.Any]], trusted: t.Optional[bool] = None
+    ) -> dict[t.Any, t.Any]:
+        """Return the specs for the documents looked up for a join, keyed by Id"""
+        ref = join.ref
+        identity_map = ref._identity_map_for(join.projection)
+
+        specs: dict[t.Any, t.Any] = {}
+        for document in raw:
+            spec = identity_map.get(ref, document["_id"]) if identity_map is not None else None
+            if spec is None:
+                spec = ref.from_document(document, trusted)
+                ref._snapshot([spec])
+                if identity_map is not None:
+                    identity_map.add(spec)
+            specs[spec._id] = spec
+
+        return specs
+
+    @classmethod
+    def _identity_map_for(cls, projection: t.Any) -> t.Optional[IdentityMap]:
+        """
+        Return the active identity map if specs of this class loaded with the
+        given projection may be held in it (i.e. it's the default projection).
+        """
+        identity_map = get_identity_map()
+        if identity_map is None:
+            return None
+
+        if isinstance(projection, ProjectionPlan):
+            default = cls.projection_plan(cls._default_projection)
+            if projection is default or projection == default:
+                return identity_map
+        elif projection == cls._default_projection:
+            return identity_map
+        return None
+
+    @classmethod
+    def _identity_map_add(cls, specs: t.Iterable[t.Any]) -> None:
+        """Add specs to the active identity map (if any)"""
+        identity_map = get_identity_map()
+        if identity_map is not None:
+            for spec in specs:
+                identity_map.add(spec)
+
+    @classmethod
+    def _identity_map_discard(cls, specs: t.Iterable[t.Any]) -> None:
+        """Remove specs from the active identity map (if any)"""
+        identity_map = get_identity_map()
+        if identity_map is not None:
+            for spec in specs:
+                identity_map.discard(spec.__class__, spec._id)
+
+    @classmethod
+    def _snapshot(cls, specs: t.Iterable[t.Any]) -> None:
+        """Snapshot specs as they're stored in the database (if changes are tracked)"""
+        if cls._track_changes:
+            for spec in specs:
+                set_snapshot(spec, copy_refs(spec.to_dict()))
+
+    @classmethod
+    def _snapshot_paths(cls, spec: t.Any, values: dict[str, t.Any]) -> None:
+        """Apply values written to the database by path to a spec's snapshot (if any)"""
+        snapshot = get_snapshot(spec) if cls._track_changes else None
+        if snapshot is None:
+            return
+
+        metadata = cls.get_metadata()
+        for path, value in values.items():
+            metadata.path(path).set(snapshot, copy_refs(value))
+
+    def _clear_fields(self, fields: t.Sequence[str]) -> None:
+        """Clear the given fields of this spec (as done by `unset`)"""
+        for field in fields:
+            setattr(self, field, self._empty_type)
+
+    @classmethod
+    def _changed_document(cls, spec: t.Any, document: dict[str, t.Any]) -> dict[str, t.Any]:
+        """
+        Return the values in a spec's prepared document that have changed since
+        it was snapshot keyed by path, or the whole document if it isn't tracked.
+        """
+        snapshot = get_snapshot(spec) if cls._track_changes else None
+        if snapshot is None:
+            return document
+        return diff(snapshot, document)
 
     @classmethod
     def _remove_keys(cls, parent_dict: dict[str, t.Any], paths: list[str]) -> None:
@@ -302,22 +1323,104 @@ class MongoBaseMixin(SpecBaseType):
         """
 
         for path in paths:
-            keys = cls._path_to_keys(path)
+            compile_path(path).remove(parent_dict)
+
+    @classmethod
+    def get_fields(cls) -> frozenset[str]:
+        """Return the names of this class's fields"""
+        return cls.get_metadata().fields
 
-            # Traverse to the tip of the path
-            child_dict = parent_dict
-            for key in keys[:-1]:
-                child_dict = child_dict.get(key, {})
+    @classmethod
+    def get_metadata(cls) -> SpecMetadata:
+        """Return the field metadata for this class (built on first use)"""
+        metadata = cls.__dict__.get("_metadata")
+        if metadata is None:
+            metadata = cls._build_metadata()
+            cls._metadata = metadata
+        return t.cast(SpecMetadata, metadata)
 
-                if not isinstance(child_dict, dict):
+    @classmethod
+    def _build_metadata(cls) -> SpecMetadata:
+        """Build the field metadata for this class"""
+        return SpecMetadata(fields=frozenset(cls._field_names()), aliases=MappingProxyType(cls._field_aliases()))
+
+    @classmethod
+    @abstractmethod
+    def _field_names(cls) -> t.Iterable[str]:
+        """Return the names of this class's fields"""
+        raise NotImplementedError
+
+    @classmethod
+    def _field_aliases(cls) -> dict[str, str]:
+        """Return the document keys for fields stored under a different name"""
+        return {}
+
+    @classmethod
+    def view(cls, *fields: str) -> t.Any:
+        """
+        Return a partial spec class (a view) with only the given fields (and
+        the Id), reading from this class's collection. A view's projection
+        selects just its fields (keeping this class's reference and sub-spec
+        projections for them), so reads such as `many`, `iter_many` and
+        paginators fetch and hydrate only those fields. Views are generated
+        once per class and set of fields.
+
+        A view resolves its collection (including `with_options`), client and
+        settings (change tracking, instrumentation, trusted reads and the
+        query cache) through this class when they're used, and has this
+        class's own methods.
+        """
+        views = cls.__dict__.get("_views")
+        if views is None:
+            views = cls._views = {}
+
+        view = views.get(fields)
+        if view is None:
+            unknown = set(fields) - cls.get_fields()
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+
+            view = cls._build_view(f"{cls.__name__}View", [f for f in fields if f not in ("_id", "id")])
+            view._view_of = cls
+            view._collection = cls._collection or cls.__name__
+            # The view projects its own fields, only this class's reference and
+            # sub-spec projections are carried over
+            view._default_projection = {
+                k: v
+                for k, v in cls._default_projection.items()
+                if k in fields and isinstance(v, dict) and {"$ref", "$sub", "$sub."} & v.keys()
+            }
+            for name in VIEW_SETTINGS:
+                setattr(view, name, _ViewSetting(name))
+
+            # Copy the methods this class adds to its spec base
+            methods: dict[str, t.Any] = {}
+            for klass in reversed(cls.__mro__):
+                if klass not in view.__mro__:
+                    methods.update(vars(klass))
+            for name, value in methods.items():
+                if name.startswith("__") or name in fields or hasattr(view, name):
                     continue
+                if inspect.isfunction(value) or isinstance(value, (classmethod, staticmethod, property)):
+                    setattr(view, name, value)
 
-            if not isinstance(child_dict, dict):
-                continue
+            # Writes through the view invalidate the cache it shares
+            for event in CACHE_INVALIDATING_SIGNALS:
+                signal(event).connect(view._invalidate_view_cache, sender=view, weak=False)
 
-            child_dict.pop(keys[-1], None)
+            views[fields] = view
+
+        return view
 
     @classmethod
-    @abstractmethod
-    def get_fields(cls) -> set[str]:
+    def _invalidate_view_cache(cls, sender: t.Any, **kwargs: t.Any) -> None:
+        """Signal receiver that clears the query cache a view shares when it's written to"""
+        if cls._view_of is not None:
+            cache = cls._view_of.__dict__.get("_query_cache")
+            if cache is not None:
+                cache.clear()
+
+    @classmethod
+    def _build_view(cls, name: str, fields: list[str]) -> t.Any:
+        """Return a new spec class (for the same backend) with the given fields of this class"""
         raise NotImplementedError
@@ -1,99 +1,79 @@
 import typing as t
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import copy_context
 
-from blinker import signal
-from pymongo import UpdateOne
 from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError
 from typing_extensions import Self
 
-from mongospecs.helpers.query import Condition, Group
+from mongospecs.helpers.bulk import BulkWriter, InsertChunk, _ChunkedInsert
 from mongospecs.mixins.query import QueryMixin
 from mongospecs.types import FilterType, SpecDocumentType, SpecsOrRawDocuments
-from mongospecs.utils import to_refs
+from mongospecs.utils import chunked
 
 
 class CrudMixin(QueryMixin):
     # Operations
     def insert(self, **insert_one_kwargs: t.Any) -> None:
         """Insert this document"""
-        # Send insert signal
-        signal("insert").send(self.__class__, specs=[self])
-
-        document_dict = self.to_dict()
-        if not self._id:
-            document_dict.pop("_id", None)
-        # Prepare the document to be inserted
-        document = to_refs(document_dict)
+        document = self._prepare_insert()
 
         # Insert the document and update the Id
-        self._id = self.get_collection().insert_one(document, **insert_one_kwargs).inserted_id
-
-        # Send inserted signal
-        signal("inserted").send(self.__class__, specs=[self])
+        result = self.get_collection().insert_one(document, **insert_one_kwargs)
+        self._complete_inserts([self], [result.inserted_id])
 
     def unset(self, *fields: t.Any, **update_one_kwargs: t.Any) -> None:
         """Unset the given list of fields for this document."""
-
-        # Send update signal
-        signal("update").send(self.__class__, specs=[self])
-
-        # Clear the fields from the document and build the unset object
-        unset = {}
-        for field in fields:
-            setattr(self, field, self._empty_type)
-            unset[field] = True
+        update = self._prepare_unset(fields)
 
         # Update the document
-        self.get_collection().update_one({"_id": self._id}, {"$unset": unset}, **update_one_kwargs)
-
-        # Send updated signal
-        signal("updated").send(self.__class__, specs=[self])
+        self.get_collection().update_one({"_id": self._id}, update, **update_one_kwargs)
+        self._complete_unset(fields)
 
     def update(self, *fields: t.Any, **update_one_kwargs: t.Any) -> None:
         """
         Update this document. Optionally a specific list of fields to update can
         be specified.
         """
-        self_document = self.to_dict()
-        if "_id" not in self_document:
-            raise ValueError("Can't update documents without `_id`")
-
-        # Send update signal
-        signal("update").send(self.__class__, specs=[self])
-
-        # Check for selective updates
-        if fields:
-            document = {field: self._path_to_value(field, self_document) for field in fields}
-        else:
-            document = self_document
-
-        # Prepare the document to be updated
-        document = to_refs(document)
-        document.pop("_id", None)
-
-        # Update the document
-        self.get_collection().update_one({"_id": self._id}, {"$set": document}, **update_one_kwargs)
+        document, update = self._prepare_update(fields)
 
-        # Send updated signal
-        signal("updated").send(self.__class__, specs=[self])
+        # Update the document (unless it's tracked and nothing has changed)
+        if update is not None:
+            self.get_collection().update_one({"_id": self._id}, update, **update_one_kwargs)
+        self._complete_update(fields, document)
 
-    def upsert(self, *fields: t.Any, **operation_kwargs: t.Any) -> None:
+    def upsert(self, *fields: t.Any, atomic: bool = False, **operation_kwargs: t.Any) -> None:
         """
         Update or Insert this document depending on whether it exists or not.
         The presense of an `_id` value in the document is used to determine if
         the document exists.
 
-        NOTE: This method is not the same as specifying the `upsert` flag when
-        calling MongoDB. When called for a document with an `_id` value, this
-        method will call the database to see if a record with that Id exists,
-        if not it will call `insert`, if so it will call `update`. This
-        operation is therefore not atomic and much slower than the equivalent
-        MongoDB operation (due to the extra call).
+        NOTE: By default this method is not the same as specifying the `upsert`
+        flag when calling MongoDB. When called for a document with an `_id`
+        value, this method will call the database to see if a record with that
+        Id exists, if not it will call `insert`, if so it will call `update`.
+        This operation is therefore not atomic and much slower than the
+        equivalent MongoDB operation (due to the extra call).
+
+        If `atomic` is True a single upserting `update_one` is used instead
+        (when a list of fields is specified the rest of the document is set on
+        insert only). As whether the document exists isn't
+        known until it's written the `update` signal is sent beforehand,
+        followed by `inserted` or `updated` depending on the outcome.
         """
 
         # If no `_id` is provided then we insert the document
         if not self._id:
             return self.insert()
 
+        if atomic:
+            # Upsert the document
+            filter, update = self._prepare_upsert(fields)
+            result = self.get_collection().update_one(filter, update, upsert=True, **operation_kwargs)
+            self._complete_upsert(fields, update, result.upserted_id)
+            return None
+
         # If an `_id` is provided then we need to check if it exists before
         # performing the `upsert`.
         #
@@ -104,109 +84,193 @@ class CrudMixin(QueryMixin):
 
     def delete(self, **delete_one_kwargs: t.Any) -> None:
         """Delete this document"""
-
-        if "_id" not in self.to_dict():
-            raise ValueError("Can't delete documents without `_id`")
-
-        # Send delete signal
-        signal("delete").send(self.__class__, specs=[self])
+        self._prepare_delete()
 
         # Delete the document
         self.get_collection().delete_one({"_id": self._id}, **delete_one_kwargs)
-
-        # Send deleted signal
-        signal("deleted").send(self.__class__, specs=[self])
+        self._complete_deletes([self])
 
     @classmethod
     def find(cls, filter: FilterType = None, **kwargs: t.Any) -> list[SpecDocumentType]:
         """Return a list of documents matching the filter"""
-        # Flatten the projection
-        kwargs["projection"], references, subs = cls._flatten_projection(
-            kwargs.get("projection", cls._default_projection)
-        )
+        filter, references, subs = cls._prepare_find(filter, kwargs)
 
-        # Find the document
-        if isinstance(filter, (Condition, Group)):
-            filter = filter.to_dict()
-
-        documents = list(cls.get_collection().find(to_refs(filter), **kwargs))
+        recording = cls._start_recording("find", filter)
+        with recording.phase("network"):
+            documents = list(cls.get_collection().find(filter, **kwargs))
 
         # Make sure we found documents
         if not documents:
+            cls._finish_recording(recording, 0, kwargs)
             return []
 
         # Dereference the documents (if required)
         if references:
-            cls._dereference(documents, references)
+            with recording.phase("dereference"):
+                cls._dereference(documents, references)
 
         # Add sub-specs to the documents (if required)
         if subs:
-            cls._apply_sub_specs(documents, subs)
+            with recording.phase("sub_specs"):
+                cls._apply_sub_specs(documents, subs)
 
+        cls._finish_recording(recording, len(documents), kwargs)
         return documents
 
+    @classmethod
+    def iter_find(
+        cls, filter: FilterType = None, batch_size: int = 1000, **kwargs: t.Any
+    ) -> t.Iterator[SpecDocumentType]:
+        """
+        Yield documents matching the filter, streaming them from the cursor in
+        batches of `batch_size`.
+        """
+        filter, references, subs = cls._prepare_find(filter, kwargs)
+
+        # Find the documents
+        cursor = cls.get_collection().find(filter, batch_size=batch_size, **kwargs)
+
+        for documents in chunked(cursor, batch_size):
+            # Dereference the documents (if required)
+            if references:
+                cls._dereference(documents, references)
+
+            # Add sub-specs to the documents (if required)
+            if subs:
+                cls._apply_sub_specs(documents, subs)
+
+            yield from documents
+
     @classmethod
     def find_one(cls, filter: FilterType = None, **kwargs: t.Any) -> SpecDocumentType:
         """Return the first document matching the filter"""
-        # Flatten the projection
-        kwargs["projection"], references, subs = cls._flatten_projection(
-            kwargs.get("projection", cls._default_projection)
-        )
-
-        # Find the document
-        if isinstance(filter, (Condition, Group)):
-            filter = filter.to_dict()
+        filter, references, subs = cls._prepare_find(filter, kwargs)
 
+        recording = cls._start_recording("find_one", filter)
         coll: Collection[SpecDocumentType] = cls.get_collection()
-        document = coll.find_one(to_refs(filter), **kwargs)
+        with recording.phase("network"):
+            document = coll.find_one(filter, **kwargs)
 
         # Make sure we found a document
         if not document:
+            cls._finish_recording(recording, 0, kwargs)
             return t.cast(SpecDocumentType, {})
 
         # Dereference the document (if required)
         if references:
-            cls._dereference([document], references)
+            with recording.phase("dereference"):
+                cls._dereference([document], references)
 
         # Add sub-specs to the document (if required)
         if subs:
-            cls._apply_sub_specs([document], subs)
+            with recording.phase("sub_specs"):
+                cls._apply_sub_specs([document], subs)
 
+        cls._finish_recording(recording, 1, kwargs)
         return document
 
     def reload(self, **kwargs: t.Any) -> None:
         """Reload the document"""
-        spec = self.find_one({"_id": self._id}, **kwargs)
-        for field in spec:
-            setattr(self, field, spec[field])
+        self._complete_reload(self.find_one({"_id": self._id}, **kwargs), kwargs)
 
     @classmethod
-    def insert_many(cls, documents: SpecsOrRawDocuments, **kwargs: t.Any) -> t.Sequence[Self]:
-        """Insert a list of documents"""
-        # Ensure all documents have been converted to specs
-        specs = cls._ensure_specs(documents)
+    def bulk(cls, ordered: bool = True, transaction: bool = False, **bulk_write_kwargs: t.Any) -> BulkWriter:
+        """
+        Return a unit of work that collects inserts, updates, unsets, upserts
+        and deletes (for specs of any class) and flushes them as a single
+        `bulk_write` per spec class on exit, e.g:
 
-        # Send insert signal
-        signal("insert").send(cls, specs=specs)
+            with Dragon.bulk() as bulk:
+                bulk.insert(dragon)
+                bulk.update(lair, "name")
 
-        # Prepare the documents to be inserted
-        _documents = [to_refs(f.to_dict()) for f in specs]
+        If `transaction` is True the writes are made inside a transaction.
+        """
+        return BulkWriter(cls, ordered=ordered, transaction=transaction, **bulk_write_kwargs)
+
+    @classmethod
+    def insert_many(
+        cls,
+        documents: SpecsOrRawDocuments,
+        chunk_size: t.Optional[int] = None,
+        max_workers: int = 1,
+        on_chunk: t.Optional[t.Callable[[InsertChunk[Self]], t.Any]] = None,
+        **kwargs: t.Any,
+    ) -> t.Sequence[Self]:
+        """
+        Insert a list of documents.
+
+        If a `chunk_size` is given the documents are prepared and inserted a
+        chunk at a time (unordered unless `ordered=True` is given), and the
+        insert/inserted signals are sent per chunk. Up to `max_workers` chunks
+        are inserted at once (each on its own pooled connection) and
+        `on_chunk` is called with an `InsertChunk` as each one completes. Any
+        write errors are raised as a single `BulkWriteError` (with indexes
+        relative to all of the documents) once every chunk has been tried.
+
+        An ordered insert inserts one chunk at a time (whatever the value of
+        `max_workers`) and stops at the first chunk with errors.
+        """
+        if chunk_size is not None:
+            return cls._insert_chunks(documents, chunk_size, max_workers, on_chunk, kwargs)
 
-        for _document in _documents:
-            if not _document["_id"]:
-                _document.pop("_id")
+        specs, _documents = cls._prepare_insert_many(documents)
 
         # Bulk insert
         ids = cls.get_collection().insert_many(_documents, **kwargs).inserted_ids
+        cls._complete_inserts(specs, ids)
 
-        # Apply the Ids to the specs
-        for i, id in enumerate(ids):
-            specs[i]._id = id
+        return specs
 
-        # Send inserted signal
-        signal("inserted").send(cls, specs=specs)
+    @classmethod
+    def _insert_chunks(
+        cls,
+        documents: SpecsOrRawDocuments,
+        chunk_size: int,
+        max_workers: int,
+        on_chunk: t.Optional[t.Callable[[InsertChunk[Self]], t.Any]],
+        insert_many_kwargs: dict[str, t.Any],
+    ) -> list[Self]:
+        """Insert documents a chunk at a time (see `insert_many`)"""
+        insert_many_kwargs.setdefault("ordered", False)
+        ordered = insert_many_kwargs["ordered"]
+
+        def insert_chunk(index: int, chunk: SpecsOrRawDocuments) -> InsertChunk[Self]:
+            specs, _documents = cls._prepare_insert_chunk(chunk)
+
+            # Insert the chunk
+            errors = []
+            try:
+                cls.get_collection().insert_many(_documents, **insert_many_kwargs)
+            except BulkWriteError as error:
+                errors = error.details.get("writeErrors", [])
+
+            return cls._complete_insert_chunk(index, chunk_size, specs, _documents, errors, ordered)
+
+        results: _ChunkedInsert[Self] = _ChunkedInsert(on_chunk)
+
+        # Ordered inserts run a chunk at a time, so no chunk is written after
+        # an earlier one fails
+        chunks = enumerate(chunked(documents, chunk_size))
+        if max_workers > 1 and not ordered:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                pending: deque[Future[InsertChunk[Self]]] = deque()
+                for index, chunk in chunks:
+                    pending.append(executor.submit(copy_context().run, insert_chunk, index, chunk))
+
+                    # Limit the number of prepared chunks held at once
+                    while len(pending) >= max_workers:
+                        results.complete(pending.popleft().result())
+
+                while pending:
+                    results.complete(pending.popleft().result())
+        else:
+            for index, chunk in chunks:
+                results.complete(insert_chunk(index, chunk))
+                if ordered and results.errors:
+                    break
 
-        return specs
+        return results.result()
 
     @classmethod
     def update_many(
@@ -220,113 +284,57 @@ class CrudMixin(QueryMixin):
         Update multiple documents. Optionally a specific list of fields to
         update can be specified.
         """
-        # Ensure all documents have been converted to specs
-        specs = cls._ensure_specs(documents)
-
-        if not all(f._id for f in specs):
-            raise ValueError("Can't update documents without `_id`s")
-
-        # Send update signal
-        signal("update").send(cls, specs=specs)
-
-        # Prepare the documents to be updated
+        specs, _documents, requests = cls._prepare_update_many(documents, fields, update_one_kwargs)
 
-        # Check for selective updates
-        if fields:
-            _documents = []
-            for spec in specs:
-                document = {"_id": spec._id}
-                for field in fields:
-                    document[field] = cls._path_to_value(field, spec.to_dict())
-                _documents.append(to_refs(document))
-        else:
-            _documents = [to_refs(f.to_dict()) for f in specs]
-
-        if not update_one_kwargs:
-            update_one_kwargs = {}
-        if not bulk_write_kwargs:
-            bulk_write_kwargs = {}
+        # Update the documents (skipping tracked ones where nothing has changed)
+        if requests:
+            cls.get_collection().bulk_write(requests, **(bulk_write_kwargs or {}))
+        cls._complete_update_many(specs, fields, _documents)
 
-        # Update the documents
-        requests = []
-        for _document in _documents:
-            _id = _document.pop("_id")
-            requests.append(UpdateOne({"_id": _id}, {"$set": _document}, **update_one_kwargs))
-
-        cls.get_collection().bulk_write(requests, **bulk_write_kwargs)
+    @classmethod
+    def upsert_many(
+        cls, documents: SpecsOrRawDocuments, *fields: t.Any, bulk_write_kwargs: t.Any = None
+    ) -> t.Sequence[Self]:
+        """
+        Atomically update or insert multiple documents in a single bulk write.
+        Documents without an `_id` are inserted, the rest are upserted by `_id`
+        (see `upsert` with `atomic=True`). Optionally a specific list of fields
+        to update can be specified.
+        """
+        specs, requests, complete = cls._prepare_upsert_many(documents, fields)
+        if not requests:
+            return specs
 
-        # Send updated signal
-        signal("updated").send(cls, specs=specs)
+        complete(cls.get_collection().bulk_write(requests, **(bulk_write_kwargs or {})))
+        return specs
 
     @classmethod
     def unset_many(cls, documents: SpecsOrRawDocuments, *fields: t.Any, **update_many_kwargs: t.Any) -> None:
         """Unset the given list of fields for given documents."""
-
-        # Ensure all documents have been converted to specs
-        specs = cls._ensure_specs(documents)
-
-        if not all(f._id for f in specs):
-            raise ValueError("Can't update documents without `_id`s")
-
-        # Send update signal
-        signal("update").send(cls, specs=specs)
-
-        ids = [spec._id for spec in specs if spec._id]
-        # Build the unset object
-        unset = {}
-        for field in fields:
-            unset[field] = True
-            for spec in specs:
-                spec.to_dict().pop(field, None)
+        specs, filter, update = cls._prepare_unset_many(documents, fields)
 
         # Update the document
-        cls.get_collection().update_many({"_id": {"$in": ids}}, {"$unset": unset}, **update_many_kwargs)
-
-        # Send updated signal
-        signal("updated").send(cls, specs=specs)
+        cls.get_collection().update_many(filter, update, **update_many_kwargs)
+        cls._complete_unset_many(specs)
 
     @classmethod
     def delete_many(cls, documents: SpecsOrRawDocuments, **delete_many_kwargs: t.Any) -> None:
         """Delete multiple documents"""
-
-        # Ensure all documents have been converted to specs
-        specs = cls._ensure_specs(documents)
-
-        if not all(f._id for f in specs):
-            raise ValueError("Can't delete documents without `_id`s")
-
-        # Send delete signal
-        signal("delete").send(cls, specs=specs)
-
-        # Prepare the documents to be deleted
-        ids = [f._id for f in specs]
+        specs, ids = cls._prepare_delete_many(documents)
 
         # Delete the documents
         cls.get_collection().delete_many({"_id": {"$in": ids}}, **delete_many_kwargs)
-
-        # Send deleted signal
-        signal("deleted").send(cls, specs=specs)
+        cls._complete_deletes(specs)
 
     def soft_delete(self, **update_one_kwargs: t.Any) -> None:
         """Soft delete this document by setting a deleted flag."""
-        if "_id" not in self.to_dict():
-            raise ValueError("Can't delete documents without `_id`")
-
-        # Send delete signal
-        signal("soft_delete").send(self.__class__, specs=[self])
+        update = self._prepare_soft_delete()
 
         # Update the document to set the deleted flag
-        self.get_collection().update_one({"_id": self._id}, {"$set": {"deleted": True}}, **update_one_kwargs)
-
-        # Send deleted signal
-        signal("soft_deleted").send(self.__class__, specs=[self])
+        self.get_collection().update_one({"_id": self._id}, update, **update_one_kwargs)
+        self._complete_soft_delete()
 
     @classmethod
     def find_active(cls, filter: FilterType = None, **find_kwargs: t.Any) -> list[SpecDocumentType]:
         """Return a list of active documents (not soft deleted)."""
-        if filter is None:
-            filter = {}
-        if isinstance(filter, (Condition, Group)):
-            filter = filter.to_dict()
-        filter["deleted"] = {"$ne": True}  # Exclude soft deleted documents
-        return cls.find(filter, **find_kwargs)
+        return cls.find(cls._active_filter(filter), **find_kwargs)
@@ -4,11 +4,11 @@ import msgspec
 from bson import ObjectId
 from pymongo import MongoClient
 
-from mongospecs.base import SpecBase, SubSpecBase
+from mongospecs.base import AsyncSpecBase, SpecBase, SubSpecBase
 from mongospecs.helpers.empty import Empty, EmptyObject
 from mongospecs.helpers.se import MongoEncoder, mongo_dec_hook, mongo_enc_hook
 
-__all__ = ["Spec", "SubSpec"]
+__all__ = ["AsyncSpec", "Spec", "SubSpec"]
 
 
 class Spec(msgspec.Struct, SpecBase, kw_only=True):
@@ -31,8 +31,16 @@ class Spec(msgspec.Struct, SpecBase, kw_only=True):
         return msgspec.structs.astuple(self)
 
     @classmethod
-    def get_fields(cls) -> set[str]:
-        return set(cls.__struct_fields__)
+    def _field_names(cls) -> t.Iterable[str]:
+        return cls.__struct_fields__
+
+    @classmethod
+    def _field_aliases(cls) -> dict[str, str]:
+        return {k: v for k, v in zip(cls.__struct_fields__, cls.__struct_encode_fields__) if k != v}
+
+    @classmethod
+    def _build_view(cls, name: str, fields: list[str]) -> t.Any:
+        return _build_view(cls, name, fields)
 
     # msgspec Struct includes these by default- so we need to override them
     def __eq__(self, other: t.Any) -> bool:
@@ -45,6 +53,27 @@ class Spec(msgspec.Struct, SpecBase, kw_only=True):
         return self._id < other._id
 
 
+class AsyncSpec(AsyncSpecBase, Spec, kw_only=True):  # type: ignore[misc]
+    """A `Spec` whose database operations are coroutines, for use with an asyncio client"""
+
+
+def _build_view(spec_cls: t.Any, name: str, fields: list[str]) -> t.Any:
+    """Return a struct with the given fields of a spec class (see `SpecBase.view`)"""
+    info = {f.name: f for f in msgspec.structs.fields(spec_cls)}
+    struct_fields: list[t.Any] = []
+    for field in fields:
+        f = info[field]
+        if f.required:
+            struct_fields.append((f.name, f.type, msgspec.field(name=f.encode_name)))
+        elif f.default_factory is not msgspec.NODEFAULT:
+            struct_fields.append((f.name, f.type, msgspec.field(name=f.encode_name, default_factory=f.default_factory)))
+        else:
+            struct_fields.append((f.name, f.type, msgspec.field(name=f.encode_name, default=f.default)))
+
+    base = AsyncSpec if issubclass(spec_cls, AsyncSpecBase) else Spec
+    return msgspec.defstruct(name, struct_fields, bases=(base,), kw_only=True, module=spec_cls.__module__)
+
+
 class SubSpec(msgspec.Struct, SubSpecBase, kw_only=True, dict=True):
     _parent: t.ClassVar[t.Any] = Spec
 
@@ -91,8 +120,16 @@ class AdapterBuilder:
                 return msgspec.structs.astuple(self)
 
             @classmethod
-            def get_fields(cls) -> set[str]:
-                return set(cls.__struct_fields__)
+            def _field_names(cls) -> t.Iterable[str]:
+                return cls.__struct_fields__  # type: ignore[no-any-return]
+
+            @classmethod
+            def _field_aliases(cls) -> dict[str, str]:
+                return {k: v for k, v in zip(cls.__struct_fields__, cls.__struct_encode_fields__) if k != v}
+
+            @classmethod
+            def _build_view(cls, name: str, fields: list[str]) -> t.Any:
+                return _build_view(cls, name, fields)
 
             # msgspec Struct includes these by default- so we need to override them
             def __eq__(self, other: t.Any) -> bool:
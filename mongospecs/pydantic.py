@@ -1,15 +1,16 @@
 import typing as t
+from copy import copy
+from functools import lru_cache
 
-from blinker import signal
 from bson import ObjectId
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, create_model
 from pydantic_core import core_schema
 from pymongo import MongoClient
 
-from mongospecs.base import SpecBase, SubSpecBase
+from mongospecs.base import AsyncSpecBase, SpecBase, SubSpecBase
 from mongospecs.helpers.empty import EmptyObject
 
-__all__ = ["Spec", "SubSpec"]
+__all__ = ["AsyncSpec", "Spec", "SubSpec"]
 
 
 class _ObjectIdPydanticAnnotation:
@@ -37,14 +38,72 @@ class _ObjectIdPydanticAnnotation:
 PyObjectId = t.Annotated[ObjectId, _ObjectIdPydanticAnnotation]
 
 
+@lru_cache(maxsize=None)
+def _construct_fields(cls: type[BaseModel]) -> t.Optional[tuple[tuple[str, str, t.Any], ...]]:
+    """
+    Return the document key, name and field info of each of a model's fields,
+    or None if the model needs `model_construct` (it has private attributes,
+    a `model_post_init` or allows extra fields).
+    """
+    if cls.__private_attributes__ or cls.__pydantic_post_init__ or cls.model_config.get("extra") == "allow":
+        return None
+    return tuple((field.alias or name, name, field) for name, field in cls.model_fields.items())
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(cls: type[BaseModel]) -> TypeAdapter[list[t.Any]]:
+    """Return the (cached) adapter validating a list of a model"""
+    return TypeAdapter(list[cls])  # type: ignore[valid-type]
+
+
 class Spec(BaseModel, SpecBase):
     model_config = ConfigDict(arbitrary_types_allowed=True, populate_by_name=True)
 
     id: t.Optional[PyObjectId] = Field(default=None, alias="_id")
 
     @classmethod
-    def from_document(cls, document: dict[str, t.Any]) -> "Spec":
-        return cls.model_construct(**document)
+    def from_document(cls, document: dict[str, t.Any], trusted: t.Optional[bool] = None) -> "Spec":
+        # Single documents are built with `model_construct` unless validation is asked for
+        if trusted is None and cls._trusted_reads is None:
+            trusted = True
+        return super().from_document(document, trusted)
+
+    @classmethod
+    def _construct(cls, document: dict[str, t.Any]) -> "Spec":
+        """
+        Build a spec from a trusted document without validation. This is a
+        leaner `model_construct` (which loops over the fields in Python too,
+        but also handles extra fields, private attributes and post-init).
+        """
+        fields = _construct_fields(cls)
+        if fields is None:
+            return cls.model_construct(**document)
+
+        values = {}
+        fields_set = set()
+        for key, name, field in fields:
+            if key in document:
+                values[name] = document[key]
+                fields_set.add(name)
+            elif name in document:
+                values[name] = document[name]
+                fields_set.add(name)
+            elif not field.is_required():
+                # Required fields missing from the document (e.g. projected
+                # out) are left unset, as by `model_construct`
+                values[name] = field.get_default(call_default_factory=True)
+
+        spec = cls.__new__(cls)
+        object.__setattr__(spec, "__dict__", values)
+        object.__setattr__(spec, "__pydantic_fields_set__", fields_set)
+        object.__setattr__(spec, "__pydantic_extra__", None)
+        object.__setattr__(spec, "__pydantic_private__", None)
+        return spec
+
+    @classmethod
+    def _validate_documents(cls, documents: t.Iterable[dict[str, t.Any]]) -> list["Spec"]:
+        """Validate a batch of documents in one call (so the loop stays within pydantic-core)"""
+        return _list_adapter(cls).validate_python(documents if isinstance(documents, list) else list(documents))
 
     @property
     def _id(self) -> t.Union[EmptyObject, ObjectId]:
@@ -54,27 +113,11 @@ class Spec(BaseModel, SpecBase):
     def _id(self, value: ObjectId) -> None:
         self.id = value
 
-    def unset(self, *fields: t.Any) -> None:
-        """Unset the given list of fields for this document."""
-
-        # Send update signal
-        signal("update").send(self.__class__, specs=[self])
-
-        # Clear the fields from the document and build the unset object
-        unset = {}
+    def _clear_fields(self, fields: t.Sequence[str]) -> None:
+        # Cleared fields are removed from the fields set so `to_json_type` excludes them
         for field in fields:
             setattr(self, field, self._empty_type)
-            unset[field] = True
-
-            ## pydantic specific change:
-            ## remove from model fields set so it excludes when `to_json_type` is called
-            self.model_fields_set.remove(field)
-
-        # Update the document
-        self.get_collection().update_one({"_id": self._id}, {"$unset": unset})
-
-        # Send updated signal
-        signal("updated").send(self.__class__, specs=[self])
+            self.model_fields_set.discard(field)
 
     def encode(self, **encode_kwargs: t.Any) -> bytes:
         return str.encode(self.model_dump_json(**encode_kwargs))
@@ -94,8 +137,28 @@ class Spec(BaseModel, SpecBase):
         return tuple(self.to_dict())
 
     @classmethod
-    def get_fields(cls) -> set[str]:
-        return set(cls.model_fields.keys())  # type: ignore[attr-defined,unused-ignore]
+    def _field_names(cls) -> t.Iterable[str]:
+        return cls.model_fields.keys()  # type: ignore[attr-defined,unused-ignore]
+
+    @classmethod
+    def _field_aliases(cls) -> dict[str, str]:
+        fields = cls.model_fields.items()  # type: ignore[attr-defined,unused-ignore]
+        return {name: field.alias for name, field in fields if field.alias and field.alias != name}
+
+    @classmethod
+    def _build_view(cls, name: str, fields: list[str]) -> t.Any:
+        model_fields = cls.model_fields  # type: ignore[attr-defined,unused-ignore]
+        base = AsyncSpec if issubclass(cls, AsyncSpec) else Spec
+        return create_model(  # type: ignore[call-overload]
+            name,
+            __base__=base,
+            __module__=cls.__module__,
+            **{field: (model_fields[field].annotation, copy(model_fields[field])) for field in fields},
+        )
+
+
+class AsyncSpec(AsyncSpecBase, Spec):  # type: ignore[misc]
+    """A `Spec` whose database operations are coroutines, for use with an asyncio client"""
 
 
 class SubSpec(BaseModel, SubSpecBase):
@@ -1,8 +1,11 @@
 import typing as t
+from itertools import islice
 
 from mongospecs.types import SpecBaseType, SubSpecBaseType
 
-__all__ = ["deep_merge"]
+__all__ = ["copy_refs", "deep_merge", "register_ref_handler", "to_refs"]
+
+T = t.TypeVar("T")
 
 
 def deep_merge(source: dict[str, t.Any], dest: dict[str, t.Any]) -> None:
@@ -26,21 +29,151 @@ def deep_merge(source: dict[str, t.Any], dest: dict[str, t.Any]) -> None:
 
 
 def to_refs(value: t.Any) -> t.Any:
-    """Convert all Spec instances within the given value to Ids"""
+    """
+    Convert all Spec instances within the given value to Ids. Lists and
+    dictionaries are only copied if they contain a Spec or SubSpec, otherwise
+    they're returned as is (tuples are always converted to lists).
+    """
+    handler = _ref_handlers.get(value.__class__, _UNRESOLVED)
+    if handler is _UNRESOLVED:
+        handler = _resolve_ref_handler(value.__class__)
+    return value if handler is None else handler(value)
+
+
+def copy_refs(value: t.Any) -> t.Any:
+    """
+    Return a copy of the given value with all Spec instances converted to Ids
+    (lists and dictionaries are always copied).
+    """
     # Spec
     if isinstance(value, SpecBaseType):
         return getattr(value, "_id")
 
     # SubSpec
     elif isinstance(value, SubSpecBaseType):
-        return to_refs(value.to_dict())
+        return copy_refs(value.to_dict())
 
     # Lists
     elif isinstance(value, (list, tuple)):
-        return [to_refs(v) for v in value]
+        return [copy_refs(v) for v in value]
 
     # Dictionaries
     elif isinstance(value, dict):
-        return {k: to_refs(v) for k, v in value.items()}
+        return {k: copy_refs(v) for k, v in value.items()}
 
     return value
+
+
+def _spec_ref(value: t.Any) -> t.Any:
+    return getattr(value, "_id")
+
+
+def _sub_spec_refs(value: t.Any) -> t.Any:
+    return to_refs(value.to_dict())
+
+
+def _tuple_refs(value: tuple[t.Any, ...]) -> list[t.Any]:
+    return [to_refs(v) for v in value]
+
+
+def _list_refs(value: list[t.Any]) -> list[t.Any]:
+    refs = None
+    for i, item in enumerate(value):
+        handler = _ref_handlers.get(item.__class__, _UNRESOLVED)
+        if handler is None:
+            continue
+        if handler is _UNRESOLVED:
+            handler = _resolve_ref_handler(item.__class__)
+            if handler is None:
+                continue
+
+        ref = handler(item)
+        if ref is not item:
+            # Copy the list on the first change
+            if refs is None:
+                refs = list(value)
+            refs[i] = ref
+
+    return value if refs is None else refs
+
+
+def _dict_refs(value: dict[t.Any, t.Any]) -> dict[t.Any, t.Any]:
+    refs = None
+    for key, item in value.items():
+        handler = _ref_handlers.get(item.__class__, _UNRESOLVED)
+        if handler is None:
+            continue
+        if handler is _UNRESOLVED:
+            handler = _resolve_ref_handler(item.__class__)
+            if handler is None:
+                continue
+
+        ref = handler(item)
+        if ref is not item:
+            # Copy the dictionary on the first change
+            if refs is None:
+                refs = dict(value)
+            refs[key] = ref
+
+    return value if refs is None else refs
+
+
+_UNRESOLVED: t.Any = object()
+
+# The `to_refs` handler for each type (None for values that are returned as
+# is), resolved on first use.
+_ref_handlers: dict[type, t.Optional[t.Callable[[t.Any], t.Any]]] = {}
+
+
+def register_ref_handler(cls: type, handler: t.Optional[t.Callable[[t.Any], t.Any]]) -> None:
+    """
+    Register the `to_refs` handler for a type (and not its subclasses), a
+    handler of None returns values of the type as is.
+    """
+    _ref_handlers[cls] = handler
+
+
+def _resolve_ref_handler(cls: type) -> t.Optional[t.Callable[[t.Any], t.Any]]:
+    handler: t.Optional[t.Callable[[t.Any], t.Any]] = None
+    if issubclass(cls, SpecBaseType):
+        handler = _spec_ref
+    elif issubclass(cls, SubSpecBaseType):
+        handler = _sub_spec_refs
+    elif issubclass(cls, tuple):
+        handler = _tuple_refs
+    elif issubclass(cls, list):
+        handler = _list_refs
+    elif issubclass(cls, dict):
+        handler = _dict_refs
+
+    _ref_handlers[cls] = handler
+    return handler
+
+
+def chunked(iterable: t.Iterable[T], size: int) -> t.Iterator[list[T]]:
+    """Yield successive lists of (at most) `size` items from the iterable"""
+    if size < 1:
+        raise ValueError("Chunk size must be at least 1")
+
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+async def achunked(iterable: t.AsyncIterable[T], size: int) -> t.AsyncIterator[list[T]]:
+    """Yield successive lists of (at most) `size` items from the async iterable"""
+    if size < 1:
+        raise ValueError("Chunk size must be at least 1")
+
+    chunk: list[T] = []
+    async for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
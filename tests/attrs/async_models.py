@@ -0,0 +1,56 @@
+from typing import Optional
+
+from attrs import define, field
+
+from mongospecs.attrs import AsyncSpec, SubSpec
+
+__all__ = [
+    "AsyncDragon",
+    "AsyncInventory",
+    "AsyncLair",
+    "AsyncComplexDragon",
+]
+
+
+@define
+class AsyncDragon(AsyncSpec):
+    """
+    A dragon.
+    """
+
+    _collection = "Dragon"
+
+    name: str
+    breed: Optional[str] = None
+
+
+@define
+class AsyncInventory(SubSpec):
+    """
+    An inventory of items kept within a lair.
+    """
+
+    gold: int = 0
+    skulls: int = 0
+
+
+@define
+class AsyncLair(AsyncSpec):
+    """
+    A lair in which a dragon resides.
+    """
+
+    _collection = "Lair"
+
+    name: str = ""
+    inventory: AsyncInventory = field(factory=AsyncInventory)
+
+
+@define
+class AsyncComplexDragon(AsyncDragon):
+    _collection = "ComplexDragon"
+
+    lair: AsyncLair = field(factory=AsyncLair)
+    traits: list[str] = []
+
+    _default_projection = {"lair": {"$ref": AsyncLair, "inventory": {"$sub": AsyncInventory}}}
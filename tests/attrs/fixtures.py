@@ -1,9 +1,12 @@
+import asyncio
 from datetime import datetime
 
 import pytest
 from mongomock import MongoClient
+from mongomock_motor import AsyncMongoMockClient
 
 from mongospecs.attrs import Spec
+from mongospecs.base import AsyncSpecBase
 
 from .models import ComplexDragon, Inventory, Lair
 
@@ -23,6 +26,20 @@ def mongo_client():
     del Spec._client
 
 
+@pytest.fixture
+def async_mongo_client(request):
+    """Connect to the test database with an asyncio client"""
+
+    client = AsyncMongoMockClient()
+    AsyncSpecBase._client = client
+    AsyncSpecBase._db = client["attrs_test"]
+    yield client
+
+    asyncio.run(client.drop_database("attrs_test"))
+    AsyncSpecBase._client = None
+    AsyncSpecBase._db = None
+
+
 @pytest.fixture
 def example_dataset_one(mongo_client):
     """Create an example set of data that can be used in testing"""
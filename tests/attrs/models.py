@@ -11,6 +11,7 @@ __all__ = [
     "Lair",
     "ComplexDragon",
     "MonitoredDragon",
+    "TrackedLair",
 ]
 
 
@@ -97,3 +98,13 @@ class MonitoredDragon(Dragon):
         """
         for spec in specs:
             spec.modified = datetime.now(timezone.utc)
+
+
+@define
+class TrackedLair(Lair):
+    """
+    A lair whose changes are tracked so only changed values are updated.
+    """
+
+    _collection = "TrackedLair"
+    _track_changes = True
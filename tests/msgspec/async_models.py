@@ -0,0 +1,52 @@
+from typing import Optional
+
+from msgspec import field
+
+from mongospecs.msgspec import AsyncSpec, SubSpec
+
+__all__ = [
+    "AsyncDragon",
+    "AsyncInventory",
+    "AsyncLair",
+    "AsyncComplexDragon",
+]
+
+
+class AsyncDragon(AsyncSpec):
+    """
+    A dragon.
+    """
+
+    _collection = "Dragon"
+
+    name: str
+    breed: Optional[str] = None
+
+
+class AsyncInventory(SubSpec):
+    """
+    An inventory of items kept within a lair.
+    """
+
+    gold: int = 0
+    skulls: int = 0
+
+
+class AsyncLair(AsyncSpec):
+    """
+    A lair in which a dragon resides.
+    """
+
+    _collection = "Lair"
+
+    name: str = ""
+    inventory: AsyncInventory = field(default_factory=AsyncInventory)
+
+
+class AsyncComplexDragon(AsyncDragon, kw_only=True):
+    _collection = "ComplexDragon"
+
+    lair: AsyncLair = field(default_factory=AsyncLair)
+    traits: list[str] = []
+
+    _default_projection = {"lair": {"$ref": AsyncLair, "inventory": {"$sub": AsyncInventory}}}
@@ -11,6 +11,7 @@ __all__ = [
     "Lair",
     "ComplexDragon",
     "MonitoredDragon",
+    "TrackedLair",
 ]
 
 
@@ -92,3 +93,12 @@ class MonitoredDragon(Dragon):
         """
         for spec in specs:
             spec.modified = datetime.now(timezone.utc)
+
+
+class TrackedLair(Lair):
+    """
+    A lair whose changes are tracked so only changed values are updated.
+    """
+
+    _collection = "TrackedLair"
+    _track_changes = True
@@ -0,0 +1,388 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from bson import ObjectId
+from msgspec import UNSET
+from pymongo.errors import BulkWriteError
+
+from mongospecs import ASC, AsyncPaginator, In, Pipeline, Q, SortBy
+
+from .async_models import AsyncComplexDragon, AsyncDragon, AsyncInventory, AsyncLair
+from .fixtures import async_mongo_client  # noqa
+
+
+async def _example_dataset_many():
+    """Create an example set of data that can be used in testing"""
+    for name, lair_name, gold in [("Burt", "Cave", 1000), ("Fred", "Castle", 2000), ("Albert", "Mountain", 3000)]:
+        lair = AsyncLair(name=lair_name, inventory=AsyncInventory(gold=gold))
+        await lair.insert()
+        await AsyncComplexDragon(name=name, lair=lair).insert()
+
+
+# Tests
+
+
+def test_insert_and_one(async_mongo_client):
+    """Should insert a document and read it back"""
+
+    async def run():
+        burt = AsyncDragon(name="Burt", breed="Cold-drake")
+        await burt.insert()
+        assert burt._id
+
+        burt = await AsyncDragon.one(Q.name == "Burt")
+        assert burt
+        assert burt.breed == "Cold-drake"
+
+        assert await AsyncDragon.by_id(burt._id) == burt
+        assert await AsyncDragon.one(Q.name == "Fred") is None
+
+    asyncio.run(run())
+
+
+def test_many_and_iter_many(async_mongo_client):
+    """Should select specs, dereferencing and applying sub-specs"""
+
+    async def run():
+        await _example_dataset_many()
+
+        dragons = await AsyncComplexDragon.many(sort=[("_id", ASC)])
+        assert [d.name for d in dragons] == ["Burt", "Fred", "Albert"]
+        assert [d.lair.name for d in dragons] == ["Cave", "Castle", "Mountain"]
+        assert [d.lair.inventory.gold for d in dragons] == [1000, 2000, 3000]
+
+        dragons = [d async for d in AsyncComplexDragon.iter_many(sort=[("_id", ASC)], batch_size=2)]
+        assert [d.lair.name for d in dragons] == ["Cave", "Castle", "Mountain"]
+
+        documents = await AsyncComplexDragon.find(Q.name == "Fred")
+        assert documents[0]["lair"].name == "Castle"
+
+        document = await AsyncComplexDragon.find_one(Q.name == "Albert")
+        assert document["lair"].name == "Mountain"
+
+    asyncio.run(run())
+
+
+def test_count_and_ids(async_mongo_client):
+    """Should count and list the Ids of documents matching a filter"""
+
+    async def run():
+        await _example_dataset_many()
+
+        assert await AsyncComplexDragon.count() == 3
+        assert await AsyncComplexDragon.count(In(Q.name, ["Burt", "Fred"])) == 2
+        assert len(await AsyncComplexDragon.ids(Q.name == "Burt")) == 1
+
+    asyncio.run(run())
+
+
+def test_update_unset_delete(async_mongo_client):
+    """Should update, unset and delete a document"""
+
+    async def run():
+        burt = AsyncDragon(name="Burt", breed="Cold-drake")
+        await burt.insert()
+
+        burt.breed = "Fire-drake"
+        await burt.update()
+        burt = await AsyncDragon.by_id(burt._id)
+        assert burt
+        assert burt.breed == "Fire-drake"
+
+        await burt.unset("breed")
+        assert burt.breed == UNSET
+        assert "breed" not in await AsyncDragon.find_one({"_id": burt._id})
+
+        await burt.delete()
+        assert await AsyncDragon.count() == 0
+
+    asyncio.run(run())
+
+
+def test_many_operations(async_mongo_client):
+    """Should insert, update and delete multiple documents"""
+
+    async def run():
+        dragons = await AsyncDragon.insert_many([AsyncDragon(name="Burt"), AsyncDragon(name="Fred")])
+        assert all(d._id for d in dragons)
+
+        for dragon in dragons:
+            dragon.breed = "Cold-drake"
+        await AsyncDragon.update_many(dragons)
+        assert await AsyncDragon.count(Q.breed == "Cold-drake") == 2
+
+        await AsyncDragon.delete_many(dragons)
+        assert await AsyncDragon.count() == 0
+
+    asyncio.run(run())
+
+
+def test_upsert_atomic_and_many(async_mongo_client):
+    """Should upsert documents in single atomic writes"""
+
+    async def run():
+        burt = AsyncDragon(_id=ObjectId(), name="Burt", breed="Cold-drake")
+        await burt.upsert(atomic=True)
+        assert (await AsyncDragon.by_id(burt._id)).name == "Burt"
+
+        burt.name = "Burt II"
+        burt.breed = "Fire-drake"
+        await burt.upsert("name", atomic=True)
+        dragon = await AsyncDragon.by_id(burt._id)
+        assert dragon.name == "Burt II"
+        assert dragon.breed == "Cold-drake"
+
+        fred = AsyncDragon(name="Fred")
+        await AsyncDragon.upsert_many([burt, fred])
+        assert fred._id
+        assert await AsyncDragon.count() == 2
+        assert (await AsyncDragon.by_id(burt._id)).breed == "Fire-drake"
+
+        # Stored keys that aren't on the spec are kept
+        await AsyncDragon.get_collection().update_one({"_id": burt._id}, {"$set": {"deleted": True}})
+        await burt.upsert(atomic=True)
+        assert (await AsyncDragon.get_collection().find_one({"_id": burt._id}))["deleted"] is True
+
+    asyncio.run(run())
+
+
+def test_bulk(async_mongo_client):
+    """Should flush mixed operations as a single bulk write per spec class"""
+
+    async def run():
+        burt = AsyncDragon(name="Burt", breed="Cold-drake")
+        fred = AsyncDragon(name="Fred")
+        lair = AsyncLair(name="Cave")
+        await AsyncDragon.insert_many([burt, fred])
+
+        async with AsyncDragon.bulk() as bulk:
+            bulk.insert(lair)
+            burt.breed = "Fire-drake"
+            bulk.update(burt)
+            bulk.delete(fred)
+
+        assert lair._id
+        assert await AsyncDragon.count() == 1
+        assert await AsyncLair.count() == 1
+        assert (await AsyncDragon.by_id(burt._id)).breed == "Fire-drake"
+
+    asyncio.run(run())
+
+
+def test_instrumentation(async_mongo_client):
+    """Should report the timing of reads"""
+    timings = []
+
+    def on_query(sender, timing):
+        timings.append(timing)
+
+    async def run():
+        await _example_dataset_many()
+
+        AsyncComplexDragon.listen("query", on_query)
+        AsyncComplexDragon.enable_instrumentation()
+        try:
+            await AsyncComplexDragon.many(projection={"lair": {"$ref": AsyncLair}})
+            await AsyncComplexDragon.one(Q.name == "Burt")
+            await AsyncComplexDragon.find()
+            await AsyncComplexDragon.count()
+        finally:
+            AsyncComplexDragon.disable_instrumentation()
+            AsyncComplexDragon.stop_listening("query", on_query)
+
+        assert [(timing.operation, timing.documents) for timing in timings] == [
+            ("many", 3),
+            ("one", 1),
+            ("find", 3),
+            ("count", 0),
+        ]
+        assert timings[0].phases["dereference"] > 0
+
+    asyncio.run(run())
+
+
+def test_aggregate(async_mongo_client):
+    """Should run aggregation pipelines, looking up references server side"""
+
+    async def run():
+        await _example_dataset_many()
+        pipeline = Pipeline().match(In(Q.name, ["Burt", "Fred"])).sort(SortBy(Q.name))
+
+        dragons = await AsyncComplexDragon.aggregate(pipeline)
+        assert [d.name for d in dragons] == ["Burt", "Fred"]
+        assert dragons[0].lair.name == "Cave"
+        assert isinstance(dragons[0].lair.inventory, AsyncInventory)
+        assert dragons[0].lair.inventory.gold == 1000
+
+        # Streamed in batches
+        assert [d async for d in AsyncComplexDragon.iter_aggregate(pipeline, batch_size=1)] == dragons
+
+        # Raw documents
+        assert await AsyncComplexDragon.aggregate(Pipeline().count("total"), hydrate=False) == [{"total": 3}]
+
+    asyncio.run(run())
+
+
+def test_trusted_reads(async_mongo_client):
+    """Should build trusted documents (and their references) without validation"""
+
+    async def run():
+        await _example_dataset_many()
+        dragons = await AsyncComplexDragon.many(sort=[("name", ASC)])
+
+        with patch.object(AsyncComplexDragon, "_construct", wraps=AsyncComplexDragon._construct) as construct:
+            with patch.object(AsyncLair, "_construct", wraps=AsyncLair._construct) as construct_lair:
+                trusted = await AsyncComplexDragon.many(sort=[("name", ASC)], trusted=True)
+            assert [d.to_dict() for d in trusted] == [d.to_dict() for d in dragons]
+            assert construct.call_count == 3
+            assert construct_lair.call_count == 3
+
+            assert (await AsyncComplexDragon.one(Q.name == "Burt", trusted=True)).name == "Burt"
+            assert [d.name async for d in AsyncComplexDragon.iter_many(trusted=True)] == ["Burt", "Fred", "Albert"]
+            assert construct.call_count == 7
+
+    asyncio.run(run())
+
+
+def test_view(async_mongo_client):
+    """Should read into partial spec classes with only the given fields"""
+
+    async def run():
+        await _example_dataset_many()
+        view = AsyncComplexDragon.view("name", "lair")
+
+        dragons = await view.many(sort=[("name", ASC)])
+        assert [d.name for d in dragons] == ["Albert", "Burt", "Fred"]
+        assert dragons[0].lair.name == "Mountain"
+        assert isinstance(dragons[0].lair.inventory, AsyncInventory)
+        assert [d.name async for d in view.iter_many(sort=[("name", ASC)], batch_size=2)] == ["Albert", "Burt", "Fred"]
+
+        # The client is resolved through the class the view is of
+        with patch.object(AsyncComplexDragon, "_client", None):
+            with pytest.raises(NotImplementedError):
+                await view.count()
+
+    asyncio.run(run())
+
+
+def test_values(async_mongo_client):
+    """Should read the values of fields without building specs"""
+
+    async def run():
+        await _example_dataset_many()
+        sort = [("name", ASC)]
+        assert await AsyncComplexDragon.values("name", "breed", filter=Q.name != "Burt", sort=sort) == [
+            ("Albert", None),
+            ("Fred", None),
+        ]
+        assert await AsyncComplexDragon.scalars("name", sort=sort) == ["Albert", "Burt", "Fred"]
+        assert await AsyncLair.scalars("inventory.gold", sort=[("name", ASC)]) == [2000, 1000, 3000]
+
+    asyncio.run(run())
+
+
+def test_ids(async_mongo_client):
+    """Should read and stream ids, and distinct values, for documents matching the given query"""
+
+    async def run():
+        await _example_dataset_many()
+        ids = await AsyncComplexDragon.ids(sort=[("_id", ASC)])
+        assert len(ids) == 3
+        assert await AsyncComplexDragon.ids(Q.name == "Burt", covered=True) == ids[:1]
+        assert [i async for i in AsyncComplexDragon.iter_ids(batch_size=2, sort=[("_id", ASC)], covered=True)] == ids
+
+        lairs = await AsyncComplexDragon.distinct("lair", Q.name != "Burt")
+        assert sorted(await AsyncLair.distinct("name", In(Q._id, lairs))) == ["Castle", "Mountain"]
+
+    asyncio.run(run())
+
+
+def test_insert_many_chunked(async_mongo_client):
+    """Should insert multiple documents a chunk at a time"""
+
+    async def run():
+        for max_workers in (1, 3):
+            chunks = []
+            dragons = [AsyncDragon(name=f"Dragon {i:02d}") for i in range(25)]
+            await AsyncDragon.insert_many(dragons, chunk_size=10, max_workers=max_workers, on_chunk=chunks.append)
+
+            assert all(dragon._id for dragon in dragons)
+            assert [len(chunk.inserted) for chunk in chunks] == [10, 10, 5]
+
+        assert await AsyncDragon.count() == 50
+
+    asyncio.run(run())
+
+
+def test_insert_many_chunked_ordered(async_mongo_client):
+    """Should stop an ordered insert at the first chunk with errors"""
+
+    async def run():
+        burt = AsyncDragon(name="Burt")
+        await burt.insert()
+
+        dragons = [AsyncDragon(name=f"Dragon {i}") for i in range(10)]
+        dragons[1]._id = burt._id
+        with pytest.raises(BulkWriteError) as error:
+            await AsyncDragon.insert_many(dragons, chunk_size=5, max_workers=3, ordered=True)
+
+        assert error.value.details["nInserted"] == 1
+        assert await AsyncDragon.count() == 2
+
+    asyncio.run(run())
+
+
+def test_paginator(async_mongo_client):
+    """Should paginate async specs"""
+
+    async def run():
+        await AsyncDragon.insert_many([AsyncDragon(name=f"Dragon {i:02d}") for i in range(25)])
+
+        paginator = await AsyncPaginator(AsyncDragon, per_page=10)
+        assert paginator.item_count == 25
+        assert paginator.page_count == 3
+
+        page = await paginator[3]
+        assert len(page) == 5
+        assert page.prev == 2
+
+        names = [dragon.name async for page in AsyncPaginator(AsyncDragon, per_page=10) for dragon in page]
+        assert names == [f"Dragon {i:02d}" for i in range(25)]
+
+    asyncio.run(run())
+
+
+def test_paginator_lazy_count(async_mongo_client):
+    """Should paginate async specs without counting them up front"""
+
+    async def run():
+        await AsyncDragon.insert_many([AsyncDragon(name=f"Dragon {i:02d}") for i in range(25)])
+
+        paginator = AsyncPaginator(AsyncDragon, per_page=10, count_mode="lazy")
+        page = await paginator[3]
+        assert len(page) == 5
+        assert page.next is None
+        assert page.prev == 2
+
+        names = [dragon.name async for page in paginator for dragon in page]
+        assert names == [f"Dragon {i:02d}" for i in range(25)]
+
+        paginator = await paginator
+        assert paginator.item_count == 25
+
+    asyncio.run(run())
+
+
+def test_paginator_with_prefetch(async_mongo_client):
+    """Should paginate async specs fetching pages ahead in the background"""
+
+    async def run():
+        await AsyncDragon.insert_many([AsyncDragon(name=f"Dragon {i:02d}") for i in range(25)])
+
+        for count_mode in ("exact", "lazy"):
+            paginator = AsyncPaginator(AsyncDragon, per_page=10, prefetch=2, count_mode=count_mode)
+            names = [dragon.name async for page in paginator for dragon in page]
+            assert names == [f"Dragon {i:02d}" for i in range(25)]
+
+    asyncio.run(run())
@@ -1,15 +1,22 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from time import sleep
-from unittest.mock import Mock
+from unittest.mock import Mock, call, patch
 
+import pytest
+from bson import encode
 from bson.objectid import ObjectId
+from bson.raw_bson import RawBSONDocument
 from msgspec import UNSET
-from pymongo import ReadPreference
+from pymongo import ReadPreference, UpdateOne
+from pymongo.errors import BulkWriteError
 
-from mongospecs import ASC, DESC, In, Q
+from mongospecs import ASC, DESC, In, Paginator, Param, Pipeline, Q, SortBy, compile_query, identity_map
+from mongospecs.mixins import base
+from mongospecs.msgspec import Spec
 
 from .fixtures import example_dataset_many, example_dataset_one, mongo_client  # noqa
-from .models import ComplexDragon, Dragon, Inventory, Lair, MonitoredDragon
+from .models import ComplexDragon, Dragon, Inventory, Lair, MonitoredDragon, TrackedLair
 
 # Tests
 
@@ -219,6 +226,243 @@ def test_upsert(mongo_client):
     assert albert.breed == "Stone dragon"
 
 
+def test_upsert_atomic(mongo_client):
+    """Should update or insert a document in a single atomic write"""
+    mock = Mock()
+
+    def on_inserted(sender, specs):
+        mock.inserted([s.name for s in specs])
+
+    def on_updated(sender, specs):
+        mock.updated([s.name for s in specs])
+
+    Dragon.listen("inserted", on_inserted)
+    Dragon.listen("updated", on_updated)
+
+    # Insert
+    albert = Dragon(_id=ObjectId(), name="Albert", breed="Stone dragon")
+    with patch.object(Dragon, "count") as count:
+        albert.upsert(atomic=True)
+        assert count.call_count == 0
+
+    mock.inserted.assert_called_once_with(["Albert"])
+    assert Dragon.by_id(albert._id).breed == "Stone dragon"
+
+    # Update selected fields, the rest is only set on insert
+    albert.name = "Albert II"
+    albert.breed = "Fire-drake"
+    albert.upsert("name", atomic=True)
+
+    mock.updated.assert_called_once_with(["Albert II"])
+    dragon = Dragon.by_id(albert._id)
+    assert dragon.name == "Albert II"
+    assert dragon.breed == "Stone dragon"
+
+    # Insert with selected fields sets the full document
+    fred = Dragon(_id=ObjectId(), name="Fred", breed="Fire-drake")
+    fred.upsert("name", atomic=True)
+    assert Dragon.by_id(fred._id).breed == "Fire-drake"
+
+    Dragon.stop_listening("inserted", on_inserted)
+    Dragon.stop_listening("updated", on_updated)
+
+
+def test_upsert_atomic_id_only(mongo_client):
+    """Should atomically upsert specs with only an Id without an empty `$set`"""
+
+    class Marker(Spec):
+        _collection = "Marker"
+
+    marker = Marker(_id=ObjectId())
+    collection = Mock(wraps=Marker.get_collection())
+    with patch.object(Marker, "get_collection", return_value=collection):
+        marker.upsert(atomic=True)
+        Marker.upsert_many([marker])
+        with Marker.bulk() as bulk:
+            bulk.upsert(marker)
+
+    assert collection.update_one.call_args[0][1] == {"$setOnInsert": {"_id": marker._id}}
+    update = UpdateOne({"_id": marker._id}, {"$setOnInsert": {"_id": marker._id}}, upsert=True)
+    assert [call[0][0] for call in collection.bulk_write.call_args_list] == [[update], [update]]
+    assert Marker.get_collection().find_one({"_id": marker._id}) == {"_id": marker._id}
+
+
+def test_upsert_many(mongo_client):
+    """Should update or insert multiple documents in a single bulk write"""
+    mock = Mock()
+
+    def on_inserted(sender, specs):
+        mock.inserted(sorted(s.name for s in specs))
+
+    def on_updated(sender, specs):
+        mock.updated(sorted(s.name for s in specs))
+
+    Dragon.listen("inserted", on_inserted)
+    Dragon.listen("updated", on_updated)
+
+    burt = Dragon(name="Burt", breed="Cold-drake")
+    burt.insert()
+    burt.breed = "Fire-drake"
+
+    fred = Dragon(name="Fred", breed="Fire-drake")
+    albert = Dragon(_id=ObjectId(), name="Albert", breed="Stone dragon")
+    specs = Dragon.upsert_many([burt, fred, albert])
+
+    assert specs == [burt, fred, albert]
+    assert fred._id
+    mock.inserted.assert_called_with(["Albert", "Fred"])
+    mock.updated.assert_called_once_with(["Burt"])
+
+    assert Dragon.count() == 3
+    assert Dragon.by_id(burt._id).breed == "Fire-drake"
+    assert Dragon.by_id(fred._id).name == "Fred"
+    assert Dragon.by_id(albert._id).name == "Albert"
+
+    Dragon.stop_listening("inserted", on_inserted)
+    Dragon.stop_listening("updated", on_updated)
+
+
+def test_upsert_atomic_keeps_stored_keys(mongo_client):
+    """Should keep stored keys that aren't on the spec when atomically upserting"""
+    burt = Dragon(name="Burt", breed="Cold-drake")
+    fred = Dragon(name="Fred", breed="Fire-drake")
+    albert = Dragon(name="Albert", breed="Stone dragon")
+    Dragon.insert_many([burt, fred, albert])
+    Dragon.get_collection().update_many({}, {"$set": {"deleted": True}})
+
+    burt.breed = "Fire-drake"
+    burt.upsert(atomic=True)
+    fred.breed = "Cold-drake"
+    Dragon.upsert_many([fred])
+    albert.breed = "Fire-drake"
+    with Dragon.bulk() as bulk:
+        bulk.upsert(albert)
+
+    for dragon in (burt, fred, albert):
+        document = Dragon.get_collection().find_one({"_id": dragon._id})
+        assert document["breed"] == dragon.breed
+        assert document["deleted"] is True
+
+
+def test_bulk(mongo_client):
+    """Should flush mixed operations as a single bulk write per spec class"""
+    burt = Dragon(name="Burt", breed="Cold-drake")
+    fred = Dragon(name="Fred", breed="Fire-drake")
+    lair = Lair(name="Cave")
+    Dragon.insert_many([burt, fred])
+    lair.insert()
+
+    mock = Mock()
+
+    def on_signal(name):
+        return lambda sender, specs: getattr(mock, name)(sender, sorted(s.name for s in specs))
+
+    listeners = {name: on_signal(name) for name in ("insert", "inserted", "update", "updated", "deleted")}
+    for name, listener in listeners.items():
+        Dragon.listen(name, listener)
+        Lair.listen(name, listener)
+
+    albert = Dragon(name="Albert", breed="Stone dragon")
+    with patch.object(Dragon, "get_collection", return_value=Mock(wraps=Dragon.get_collection())) as get_collection:
+        with Dragon.bulk() as bulk:
+            bulk.insert(albert)
+            burt.breed = "Fire-drake"
+            bulk.update(burt, "breed")
+            bulk.delete(fred)
+            lair.name = "Castle"
+            bulk.update(lair)
+            bulk.unset(lair, "inventory")
+            assert len(bulk) == 5
+
+        assert get_collection.return_value.bulk_write.call_count == 1
+
+    assert albert._id
+    mock.insert.assert_called_once_with(Dragon, ["Albert"])
+    mock.inserted.assert_called_once_with(Dragon, ["Albert"])
+    mock.update.assert_has_calls([call(Dragon, ["Burt"]), call(Lair, ["Castle", "Castle"])])
+    mock.updated.assert_has_calls([call(Dragon, ["Burt"]), call(Lair, ["Castle", "Castle"])])
+    mock.deleted.assert_called_once_with(Dragon, ["Fred"])
+
+    assert Dragon.count() == 2
+    assert Dragon.by_id(burt._id).breed == "Fire-drake"
+    assert Dragon.by_id(albert._id).name == "Albert"
+    assert Lair.by_id(lair._id).name == "Castle"
+    assert "inventory" not in Lair.find_one({"_id": lair._id})
+
+    # Operations are discarded if the block raises
+    with pytest.raises(RuntimeError):
+        with Dragon.bulk() as bulk:
+            bulk.delete(burt)
+            raise RuntimeError()
+    assert Dragon.count() == 2
+
+    # Unset fields are only cleared once they've been written
+    collection = Mock(
+        wraps=Lair.get_collection(), **{"bulk_write.side_effect": BulkWriteError({"writeErrors": [{"index": 0}]})}
+    )
+    with patch.object(Lair, "get_collection", return_value=collection):
+        with pytest.raises(BulkWriteError):
+            with Lair.bulk() as bulk:
+                bulk.unset(lair, "name")
+    assert lair.name == "Castle"
+    assert Lair.by_id(lair._id).name == "Castle"
+
+    # The operations a failed write applied are completed
+    for ordered in (False, True):
+        mock.reset_mock()
+        duplicate = Dragon(_id=burt._id, name="Burt")
+        albert = Dragon(name="Albert")
+        with pytest.raises(BulkWriteError):
+            with Dragon.bulk(ordered=ordered) as bulk:
+                bulk.insert(albert)
+                bulk.insert(duplicate)
+                bulk.update(burt, "breed")
+        assert Dragon.by_id(albert._id).name == "Albert"
+        mock.inserted.assert_called_once_with(Dragon, ["Albert"])
+        assert mock.updated.call_count == (0 if ordered else 1)
+
+    with pytest.raises(ValueError):
+        Dragon.bulk().update(Dragon(name="Nobody"))
+
+    for name, listener in listeners.items():
+        Dragon.stop_listening(name, listener)
+        Lair.stop_listening(name, listener)
+
+
+def test_track_changes(mongo_client):
+    """Should only update the values of tracked specs that have changed"""
+    lair = TrackedLair(name="Cave", inventory=Inventory(gold=1000, skulls=100))
+    lair.insert()
+    lair = TrackedLair.one({"_id": lair._id}, projection={"inventory": {"$sub": Inventory}})
+
+    collection = TrackedLair.get_collection()
+    with patch.object(TrackedLair, "get_collection", return_value=Mock(wraps=collection)) as get_collection:
+        collection_mock = get_collection.return_value
+
+        # Only the changed (nested) value is set
+        lair.inventory.gold = 2000
+        lair.update()
+        collection_mock.update_one.assert_called_once_with({"_id": lair._id}, {"$set": {"inventory.gold": 2000}})
+
+        # Nothing has changed so the update is skipped
+        lair.update()
+        assert collection_mock.update_one.call_count == 1
+
+        # The same applies to bulk updates
+        lair.name = "Castle"
+        TrackedLair.update_many([lair])
+        requests = collection_mock.bulk_write.call_args[0][0]
+        assert requests == [UpdateOne({"_id": lair._id}, {"$set": {"name": "Castle"}})]
+
+        TrackedLair.update_many([lair])
+        assert collection_mock.bulk_write.call_count == 1
+
+    lair = TrackedLair.by_id(lair._id)
+    assert lair.name == "Castle"
+    assert lair.inventory["gold"] == 2000
+    assert lair.inventory["skulls"] == 100
+
+
 def test_delete(mongo_client, example_dataset_one):
     """Should delete a document from the database"""
     burt = ComplexDragon.one(Q.name == "Burt")
@@ -230,6 +474,76 @@ def test_delete(mongo_client, example_dataset_one):
     assert burt is None
 
 
+def test_insert_many_chunked(mongo_client):
+    """Should insert multiple documents a chunk at a time"""
+    mock = Mock()
+
+    def on_inserted(sender, specs):
+        mock.inserted(len(specs))
+
+    Dragon.listen("inserted", on_inserted)
+
+    for max_workers in (1, 3):
+        chunks = []
+        dragons = [Dragon(name=f"Dragon {i:02d}") for i in range(25)]
+        specs = Dragon.insert_many(dragons, chunk_size=10, max_workers=max_workers, on_chunk=chunks.append)
+
+        assert specs == dragons
+        assert all(dragon._id for dragon in dragons)
+        assert [(c.index, c.offset, len(c), len(c.inserted)) for c in chunks] == [
+            (0, 0, 10, 10),
+            (1, 10, 10, 10),
+            (2, 20, 5, 5),
+        ]
+
+    # Check the inserted signal was sent once per chunk
+    assert Dragon.count() == 50
+    assert mock.inserted.call_args_list == [call(10), call(10), call(5)] * 2
+
+    Dragon.stop_listening("inserted", on_inserted)
+
+
+def test_insert_many_chunked_errors(mongo_client):
+    """Should report write errors per chunk and raise them once every chunk is tried"""
+    burt = Dragon(name="Burt")
+    burt.insert()
+
+    dragons = [Dragon(name=f"Dragon {i}") for i in range(5)]
+    dragons[3]._id = burt._id
+
+    chunks = []
+    with pytest.raises(BulkWriteError) as error:
+        Dragon.insert_many(dragons, chunk_size=2, on_chunk=chunks.append)
+
+    # Check the duplicate was reported and the rest were inserted
+    assert [e["index"] for e in error.value.details["writeErrors"]] == [3]
+    assert error.value.details["nInserted"] == 4
+    assert chunks[1].errors[0]["index"] == 1
+    assert chunks[1].inserted == [dragons[2]]
+    assert Dragon.count() == 5
+
+
+def test_insert_many_chunked_ordered(mongo_client):
+    """Should stop an ordered insert at the first chunk with errors"""
+    burt = Dragon(name="Burt")
+    burt.insert()
+
+    for max_workers in (1, 3):
+        dragons = [Dragon(name=f"Dragon {i}") for i in range(10)]
+        dragons[1]._id = burt._id
+
+        chunks = []
+        with pytest.raises(BulkWriteError) as error:
+            Dragon.insert_many(dragons, chunk_size=5, max_workers=max_workers, ordered=True, on_chunk=chunks.append)
+
+        # Check no chunk after the failed one was inserted
+        assert [e["index"] for e in error.value.details["writeErrors"]] == [1]
+        assert error.value.details["nInserted"] == 1
+        assert len(chunks) == 1
+        assert Dragon.count(In(Q.name, [d.name for d in dragons[5:]])) == 0
+        Dragon.delete_many(Dragon.many(Q.name != "Burt"))
+
+
 def test_insert_many(mongo_client):
     """Should insert multiple documents records into the database"""
 
@@ -421,6 +735,37 @@ def test_ids(mongo_client, example_dataset_many):
     assert len(ids) == 1
 
 
+def test_iter_ids(mongo_client, example_dataset_many):
+    """Should stream the ids of documents matching the given query"""
+    ids = ComplexDragon.ids(sort=[("_id", ASC)])
+
+    iter_ids = ComplexDragon.iter_ids(batch_size=2, sort=[("_id", ASC)])
+    assert not isinstance(iter_ids, list)
+    assert list(iter_ids) == ids
+    assert list(ComplexDragon.iter_ids(Q.name == "Burt")) == ComplexDragon.ids(Q.name == "Burt")
+
+    # Covered reads hint the `_id` index
+    assert ComplexDragon.ids(covered=True) == ids
+    assert list(ComplexDragon.iter_ids(In(Q._id, ids[1:]), covered=True)) == ids[1:]
+
+
+def test_distinct(mongo_client, example_dataset_many):
+    """Should return the distinct values of a field for documents matching the given query"""
+    assert sorted(ComplexDragon.distinct("breed")) == ["Cold-drake", "Fire-drake", "Stone dragon"]
+    assert sorted(ComplexDragon.distinct("traits", Q.dob >= datetime(1980, 1, 1))) == [
+        "cunning",
+        "impulsive",
+        "loyal",
+        "reclusive",
+    ]
+
+    # References are filtered on (and returned as) Ids
+    lair = Lair.one(Q.name == "Cave")
+    assert ComplexDragon.distinct("name", Q.lair == lair) == ["Burt"]
+    assert ComplexDragon.distinct("lair", Q.lair == lair) == [lair._id]
+    assert Lair.distinct("inventory.gold", {"name": {"$ne": "Cave"}}) == [2000, 3000]
+
+
 def test_one(mongo_client, example_dataset_many):
     """Should return a the first document that matches the given query"""
 
@@ -483,6 +828,78 @@ def test_many(mongo_client, example_dataset_many):
     assert dragons[2].breed is None
 
 
+def test_iter_many(mongo_client, example_dataset_many):
+    """Should stream all documents that match the given query in batches"""
+
+    # Stream all dragons in batches smaller than the result set
+    dragons = ComplexDragon.iter_many(sort=[("_id", ASC)], batch_size=2)
+    assert not isinstance(dragons, list)
+
+    dragons = list(dragons)
+    assert [d.name for d in dragons] == ["Burt", "Fred", "Albert"]
+
+    # References and sub-specs should be applied to every batch
+    assert [d.lair.name for d in dragons] == ["Cave", "Castle", "Mountain"]
+    assert [d.lair.inventory.gold for d in dragons] == [1000, 2000, 3000]
+
+    # Stream with a filter
+    dragons = list(ComplexDragon.iter_many(Q.dob > datetime(1980, 1, 1), sort=[("dob", DESC)], batch_size=1))
+    assert [d.name for d in dragons] == ["Albert", "Fred"]
+
+
+def test_iter_find(mongo_client, example_dataset_many):
+    """Should stream raw documents that match the given query in batches"""
+
+    documents = list(ComplexDragon.iter_find(sort=[("_id", ASC)], batch_size=2))
+
+    assert [d["name"] for d in documents] == ["Burt", "Fred", "Albert"]
+    assert [d["lair"].name for d in documents] == ["Cave", "Castle", "Mountain"]
+
+
+def test_from_raw_bson(mongo_client):
+    """Should hydrate specs from raw BSON documents"""
+    burt = Dragon(name="Burt", breed="Cold-drake")
+    fred = Dragon(name="Fred", breed="Fire-drake")
+    Dragon.insert_many([burt, fred])
+
+    documents = list(Dragon.get_collection().find(sort=[("name", ASC)]))
+
+    # From bytes and a `RawBSONDocument`
+    raw = encode(documents[0])
+    for raw_bson in (raw, RawBSONDocument(raw)):
+        dragon = Dragon.from_raw_bson(raw_bson)
+        assert dragon == burt
+        assert dragon.name == "Burt"
+        assert dragon.breed == "Cold-drake"
+
+    # Documents are validated unless they're trusted
+    with patch.object(Dragon, "_construct", wraps=Dragon._construct) as construct:
+        assert Dragon.from_raw_bson(raw) == burt
+        assert construct.call_count == 0
+        assert Dragon.from_raw_bson(RawBSONDocument(encode(documents[1])), trusted=True) == fred
+        assert construct.call_count == 1
+
+        # Classes with trusted reads trust raw documents by default
+        with patch.object(Dragon, "_trusted_reads", True):
+            assert Dragon.from_raw_bson(raw) == burt
+            assert construct.call_count == 2
+            assert Dragon.from_raw_bson(raw, trusted=False) == burt
+            assert construct.call_count == 2
+
+
+def test_query_template(mongo_client, example_dataset_many):
+    """Should accept bound query templates as filters"""
+    by_name = compile_query(Q.name == Param("name"))
+    by_lair = compile_query(Q.lair == Param("lair"))
+
+    burt = ComplexDragon.one(by_name(name="Burt"))
+    assert burt
+    assert burt.name == "Burt"
+    assert ComplexDragon.count(by_name(name="Fred")) == 1
+    assert [dragon.name for dragon in ComplexDragon.many(by_lair(lair=burt.lair))] == ["Burt"]
+    assert ComplexDragon.find_one(by_name(name="Albert"))["name"] == "Albert"
+
+
 def test_projection(mongo_client, example_dataset_one):
     """Should allow references and subspecs to be projected"""
 
@@ -533,6 +950,220 @@ def test_projection(mongo_client, example_dataset_one):
     assert burt.misc["spare"].skulls == 100
 
 
+def test_instrumentation(mongo_client, example_dataset_one, caplog):
+    """Should report the timing of reads and log slow reads"""
+    timings = []
+    slow_timings = []
+
+    def on_query(sender, timing):
+        timings.append(timing)
+
+    def on_slow_query(sender, timing):
+        slow_timings.append(timing)
+
+    ComplexDragon.listen("query", on_query)
+    ComplexDragon.listen("slow_query", on_slow_query)
+
+    # Reads aren't instrumented by default
+    ComplexDragon.many()
+    assert timings == []
+
+    ComplexDragon.enable_instrumentation()
+    try:
+        ComplexDragon.many(Q.name == "Burt", projection={"lair": {"$ref": Lair}})
+        ComplexDragon.find_one(Q.name == "Burt")
+        ComplexDragon.count()
+        ComplexDragon.ids()
+
+        assert [(timing.operation, timing.documents) for timing in timings] == [
+            ("many", 1),
+            ("find_one", 1),
+            ("count", 0),
+            ("ids", 1),
+        ]
+        assert timings[0].filter == {"name": "Burt"}
+        assert timings[0].phases["network"] > 0
+        assert timings[0].phases["dereference"] > 0
+        assert timings[0].phases["construct"] > 0
+        assert slow_timings == []
+
+        # Slow reads are logged (with their query plan)
+        ComplexDragon.enable_instrumentation(slow_query_threshold=0, explain=True)
+        with patch.object(type(ComplexDragon.get_db()), "command", return_value={"queryPlanner": {}}) as command:
+            ComplexDragon.one(Q.name == "Burt")
+
+        assert slow_timings == timings[-1:]
+        assert slow_timings[0].explain == {"queryPlanner": {}}
+        assert command.call_args.args[0]["explain"]["filter"] == {"name": "Burt"}
+        assert "Slow query: ComplexDragon.one" in caplog.text
+
+        # Covered reads are explained with the projection and hint they were run with
+        with patch.object(type(ComplexDragon.get_db()), "command", return_value={"queryPlanner": {}}) as command:
+            ComplexDragon.ids(covered=True)
+            assert command.call_args.args[0]["explain"]["projection"] == {"_id": True}
+            assert command.call_args.args[0]["explain"]["hint"] == {"_id": ASC}
+
+            ComplexDragon.scalars("name")
+            assert command.call_args.args[0]["explain"]["projection"] == {"name": True, "_id": False}
+
+    finally:
+        ComplexDragon.disable_instrumentation()
+        ComplexDragon.stop_listening("query", on_query)
+        ComplexDragon.stop_listening("slow_query", on_slow_query)
+
+
+def test_dereference_grouped(mongo_client, example_dataset_many):
+    """Should serve references to the same spec class with a single lookup"""
+
+    # Give burt a list of visited lairs alongside his own lair
+    burt = ComplexDragon.one(Q.name == "Burt")
+    assert burt
+    burt.visited_lairs = Lair.many(sort=[("_id", ASC)])
+    burt.update()
+
+    projection = {"lair": {"$ref": Lair}, "visited_lairs": {"$ref": Lair}}
+
+    # Both paths reference `Lair` so one query serves them
+    with patch.object(Lair, "many", wraps=Lair.many) as many:
+        burt = ComplexDragon.one(Q.name == "Burt", projection=projection)
+        assert many.call_count == 1
+
+    assert burt
+    assert burt.lair.name == "Cave"
+    assert [lair.name for lair in burt.visited_lairs] == ["Cave", "Castle", "Mountain"]
+
+    # Large `$in` lists are split into chunks that are queried in parallel
+    with patch.object(ComplexDragon, "_dereference_chunk_size", 1):
+        with patch.object(Lair, "many", wraps=Lair.many) as many:
+            burt = ComplexDragon.one(Q.name == "Burt", projection=projection)
+            assert many.call_count == 3
+
+    assert burt
+    assert burt.lair.name == "Cave"
+    assert [lair.name for lair in burt.visited_lairs] == ["Cave", "Castle", "Mountain"]
+
+    # The threads are shared between calls and aren't used for a single query
+    with patch.dict(base._dereference_executors, clear=True):
+        with patch.object(base, "ThreadPoolExecutor", wraps=ThreadPoolExecutor) as executor:
+            ComplexDragon.one(Q.name == "Burt", projection=projection)
+            assert executor.call_count == 0
+
+            with patch.object(ComplexDragon, "_dereference_chunk_size", 1):
+                ComplexDragon.one(Q.name == "Burt", projection=projection)
+                ComplexDragon.many(Q.name == "Burt", projection=projection)
+            assert executor.call_count == 1
+
+            # Each worker setting has its own threads
+            with patch.object(ComplexDragon, "_dereference_chunk_size", 1):
+                with patch.object(ComplexDragon, "_dereference_max_workers", 2):
+                    ComplexDragon.one(Q.name == "Burt", projection=projection)
+            assert executor.call_count == 2
+            assert set(base._dereference_executors) == {2, 4}
+
+    # An executor can be given for a class
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        with patch.object(ComplexDragon, "_dereference_executor", Mock(wraps=pool)) as executor:
+            with patch.object(ComplexDragon, "_dereference_chunk_size", 1):
+                burt = ComplexDragon.one(Q.name == "Burt", projection=projection)
+            assert executor.submit.call_count == 3
+    assert [lair.name for lair in burt.visited_lairs] == ["Cave", "Castle", "Mountain"]
+
+
+def test_identity_map(mongo_client, example_dataset_many):
+    """Should serve repeated lookups by Id from the identity map"""
+
+    burt = ComplexDragon.one(Q.name == "Burt")
+    assert burt
+
+    # Outside of an identity map every lookup goes to the database
+    assert ComplexDragon.by_id(burt._id) is not ComplexDragon.by_id(burt._id)
+
+    with identity_map() as specs:
+        # Repeated lookups by Id return the same spec
+        burt = ComplexDragon.by_id(burt._id)
+        assert burt
+        assert ComplexDragon.by_id(burt._id) is burt
+        assert ComplexDragon.one(Q._id == burt._id) is burt
+
+        # Projected lookups bypass the map
+        assert ComplexDragon.by_id(burt._id, projection={"name": True}) is not burt
+
+        # Dereferencing is served from (and fills) the map
+        cave = Lair.by_id(burt.lair._id)
+        projection = {"lair": {"$ref": Lair}}
+        with patch.object(Lair, "many", wraps=Lair.many) as many:
+            dragon = ComplexDragon.one(Q.name == "Burt", projection=projection)
+            assert dragon
+            assert dragon.lair is cave
+            assert many.call_count == 0
+
+            fred = ComplexDragon.one(Q.name == "Fred", projection=projection)
+            assert fred
+            assert Lair.by_id(fred.lair._id) is fred.lair
+            assert many.call_count == 1
+
+        # Writes keep the map coherent
+        burt.update()
+        assert (ComplexDragon, burt._id) not in specs
+        assert ComplexDragon.by_id(burt._id) is not burt
+
+        dragon = Dragon(name="Albert")
+        dragon.insert()
+        assert Dragon.by_id(dragon._id) is dragon
+
+        dragon.delete()
+        assert Dragon.by_id(dragon._id) is None
+
+
+def test_query_cache(mongo_client, example_dataset_many):
+    """Should serve repeated queries from the cache until the class is written to"""
+
+    cache = Dragon.enable_cache(max_size=10)
+    try:
+        burt = Dragon(name="Burt", breed="Cold-drake")
+        burt.insert()
+
+        # Repeated queries are served from the cache (as copies)
+        assert Dragon.one(Q.name == "Burt") == Dragon.one(Q.name == "Burt")
+        assert Dragon.by_id(burt._id) == Dragon.by_id(burt._id)
+        assert Dragon.many(sort=[("name", ASC)])[0] == Dragon.many(sort=[("name", ASC)])[0]
+        assert Dragon.count() == Dragon.count() == 1
+        assert cache.stats == {"hits": 4, "misses": 4, "evictions": 0, "size": 4}
+
+        # Changes to a spec read from the cache don't leak into later reads
+        dragon = Dragon.by_id(burt._id)
+        assert dragon is not Dragon.by_id(burt._id)
+        dragon.breed = "Fire-drake"
+        assert Dragon.by_id(burt._id).breed == "Cold-drake"
+        Dragon.many(sort=[("name", ASC)])[0].breed = "Fire-drake"
+        assert Dragon.many(sort=[("name", ASC)])[0].breed == "Cold-drake"
+        assert cache.stats["misses"] == 4
+
+        # Queries with other arguments bypass the cache
+        Dragon.many(batch_size=10)
+        assert cache.stats["size"] == 4
+
+        # Writes clear the cache
+        burt.breed = "Fire-drake"
+        burt.update()
+        assert len(cache) == 0
+        dragon = Dragon.one(Q.name == "Burt")
+        assert dragon
+        assert dragon.breed == "Fire-drake"
+
+        Dragon(name="Fred").insert()
+        assert Dragon.count() == 2
+
+        # Subclasses don't share the cache
+        assert ComplexDragon.count() == 3
+        assert Dragon.count() == 2
+
+    finally:
+        Dragon.disable_cache()
+
+    assert Dragon.one(Q.name == "Burt") is not Dragon.one(Q.name == "Burt")
+
+
 def test_timestamp_insert(mongo_client):
     """
     Should assign a timestamp to the `created` and `modified` field for a
@@ -759,6 +1390,22 @@ def test_get_fields(mongo_client):
     assert Dragon.get_fields() == {"_id", "name", "breed"}
 
 
+def test_get_metadata(mongo_client):
+    """Return the (cached) field metadata for the class"""
+    metadata = ComplexDragon.get_metadata()
+
+    assert ComplexDragon.get_metadata() is metadata
+    assert Dragon.get_metadata() is not metadata
+    assert metadata.fields == ComplexDragon.get_fields()
+    assert metadata.aliases == {}
+    assert metadata.path("lair.inventory.gold").keys == ("lair", "inventory", "gold")
+
+    # Paths are compiled once per class
+    assert metadata.path("lair") is metadata.compiled_paths["lair"]
+    assert metadata.path("lair.inventory.gold") is metadata.path("lair.inventory.gold")
+    assert "lair.inventory.gold" not in Dragon.get_metadata().compiled_paths
+
+
 # def test_get_private_fields(mongo_client):
 #     """Return the private fields for the class"""
 #     assert Dragon.get_private_fields() == {"breed"}
@@ -774,6 +1421,200 @@ def test_flattern_projection():
     assert projection == {"name": True, "inventory.gold": True, "inventory.secret_draw.gold": True}
 
 
+def test_trusted_reads(mongo_client, example_dataset_many):
+    """Should build trusted documents (and their references) without validation"""
+    dragons = ComplexDragon.many(sort=[("name", ASC)])
+
+    with patch.object(ComplexDragon, "_construct", wraps=ComplexDragon._construct) as construct:
+        with patch.object(Lair, "_construct", wraps=Lair._construct) as construct_lair:
+            trusted = ComplexDragon.many(sort=[("name", ASC)], trusted=True)
+        assert [d.to_dict() for d in trusted] == [d.to_dict() for d in dragons]
+        assert trusted[0].lair.inventory.gold == 3000
+        assert construct.call_count == 3
+        assert construct_lair.call_count == 3
+
+        assert ComplexDragon.one(Q.name == "Burt", trusted=True).to_dict() == dragons[1].to_dict()
+        assert [d.name for d in ComplexDragon.iter_many(sort=[("name", ASC)], trusted=True)] == [
+            "Albert",
+            "Burt",
+            "Fred",
+        ]
+        assert construct.call_count == 7
+
+        # Reads can be trusted for a class
+        with patch.object(ComplexDragon, "_trusted_reads", True):
+            assert ComplexDragon.by_id(dragons[2]._id).name == "Fred"
+            assert [d.name for d in Paginator(ComplexDragon, per_page=2)[1]] == ["Burt", "Fred"]
+        assert construct.call_count == 10
+
+        # Validated reads don't use the trusted constructor
+        ComplexDragon.many(trusted=False)
+        assert construct.call_count == 10
+
+
+def test_view(mongo_client, example_dataset_many):
+    """Should read into partial spec classes with only the given fields"""
+    view = ComplexDragon.view("name", "lair")
+    assert ComplexDragon.view("name", "lair") is view
+    assert view.__name__ == "ComplexDragonView"
+    assert view.get_fields() == {"_id", "name", "lair"}
+
+    # Only the view's fields are read (reference projections are kept)
+    assert set(view.projection_plan().projection) == {"_id", "name", "lair"}
+    dragons = view.many(sort=[("name", ASC)])
+    assert [d.name for d in dragons] == ["Albert", "Burt", "Fred"]
+    assert isinstance(dragons[0], view)
+    assert isinstance(dragons[0].lair, Lair)
+    assert isinstance(dragons[0].lair.inventory, Inventory)
+    assert dragons[0]._id == ComplexDragon.one(Q.name == "Albert")._id
+    assert not hasattr(dragons[0], "traits")
+
+    assert [d.name for d in view.iter_many(sort=[("name", ASC)], batch_size=2)] == ["Albert", "Burt", "Fred"]
+    assert [d.name for d in Paginator(view, filter_kwargs={"sort": [("name", ASC)]}, per_page=2)[2]] == ["Fred"]
+    assert view.one(Q.name == "Burt").lair.name == "Cave"
+
+    # A view projects its own fields whatever the class's projection includes
+    class NamedDragon(ComplexDragon):
+        _default_projection = {"name": True, "breed": True, "lair": {"$ref": Lair}}
+
+    view = NamedDragon.view("name", "dob", "lair")
+    assert set(view.projection_plan().projection) == {"_id", "name", "dob", "lair"}
+    burt = view.one(Q.name == "Burt")
+    assert burt.dob == ComplexDragon.one(Q.name == "Burt").dob
+    assert burt.lair.name == "Cave"
+
+    with pytest.raises(ValueError):
+        ComplexDragon.view("name", "wings")
+
+
+def test_values(mongo_client, example_dataset_many):
+    """Should read the values of fields without building specs"""
+    sort = [("name", ASC)]
+    assert ComplexDragon.values("name", "breed", sort=sort) == [
+        ("Albert", "Stone dragon"),
+        ("Burt", "Cold-drake"),
+        ("Fred", "Fire-drake"),
+    ]
+    assert ComplexDragon.scalars("name", Q.dob >= datetime(1980, 1, 1), sort=sort) == ["Albert", "Fred"]
+
+    # References are left as stored, paths can be `.` separated
+    lair_ids = ComplexDragon.scalars("lair", sort=sort)
+    assert lair_ids == [d.lair._id for d in ComplexDragon.many(sort=sort)]
+    assert Lair.values("_id", "inventory.gold", filter=Q._id == lair_ids[0]) == [(lair_ids[0], 3000)]
+
+    # The Id is only read if it's asked for
+    assert ComplexDragon.values("_id", "name", filter=Q.name == "Burt")[0][0] == ComplexDragon.ids(Q.name == "Burt")[0]
+    assert ComplexDragon.scalars("misc.missing") == [None, None, None]
+
+    with pytest.raises(ValueError):
+        ComplexDragon.values()
+
+
+def test_view_settings(mongo_client, example_dataset_many):
+    """Should resolve a view's client, collection and settings through the class it's of"""
+
+    class NamedDragon(ComplexDragon):
+        def title(self):
+            return f"{self.name} the dragon"
+
+    # The client is resolved when the view is read from (not when it's created)
+    with patch.object(Spec, "_client", None):
+        view = NamedDragon.view("name")
+        with pytest.raises(NotImplementedError):
+            view.count()
+
+        NamedDragon._client = mongo_client
+        assert view.count() == 3
+        assert view.one(Q.name == "Burt").title() == "Burt the dragon"
+
+    with NamedDragon.with_options(read_preference=ReadPreference.SECONDARY) as collection:
+        assert view.get_collection() is collection
+
+    for setting in ("_track_changes", "_trusted_reads"):
+        with patch.object(NamedDragon, setting, True):
+            assert getattr(view, setting) is True
+
+    # Views share the query cache of the class they're of (keyed apart)
+    cache = NamedDragon.enable_cache()
+    view.many(Q.name == "Burt")
+    assert isinstance(view.many(Q.name == "Burt")[0], view)
+    assert cache.stats["hits"] == 1
+    assert isinstance(NamedDragon.many(Q.name == "Burt")[0], NamedDragon)
+
+    view.one(Q.name == "Burt").update()
+    assert len(cache) == 0
+    NamedDragon.disable_cache()
+
+
+def test_projection_plan(mongo_client, example_dataset_one):
+    """Should compile projections once and accept compiled plans"""
+    projection = {"name": True, "lair": {"$ref": Lair, "name": True}}
+    plan = ComplexDragon.projection_plan(projection)
+
+    assert ComplexDragon.projection_plan(dict(projection)) is plan
+    assert ComplexDragon.projection_plan(plan) is plan
+    assert Dragon.projection_plan(projection) is not plan
+    assert plan.projection == {"name": True, "lair": True}
+    assert plan.references == {"lair": {"$ref": Lair, "name": True}}
+    assert plan.subs == {}
+
+    # Empty projections select every field
+    assert ComplexDragon.projection_plan(None) is ComplexDragon.projection_plan({})
+    assert set(ComplexDragon.projection_plan().projection) == ComplexDragon.get_fields()
+
+    # Plans are read-only
+    with pytest.raises(TypeError):
+        plan.projection["breed"] = True
+
+    # Plans can be passed as the projection of a read
+    burt = ComplexDragon.one(Q.name == "Burt", projection=plan)
+    assert burt
+    assert burt.lair.name == "Cave"
+    assert ComplexDragon.many(projection=plan) == [burt]
+    assert ComplexDragon.find_one(Q.name == "Burt", projection=plan)["lair"].name == "Cave"
+
+
+def test_aggregate(mongo_client, example_dataset_many):
+    """Should run aggregation pipelines, looking up references server side"""
+    pipeline = Pipeline().match(In(Q.name, ["Burt", "Fred"])).sort(SortBy(Q.name))
+
+    # References are looked up by the pipeline rather than further queries
+    with patch.object(Lair, "many", side_effect=AssertionError):
+        dragons = ComplexDragon.aggregate(pipeline)
+
+    assert [d.name for d in dragons] == ["Burt", "Fred"]
+    assert isinstance(dragons[0], ComplexDragon)
+    assert dragons[0].lair.name == "Cave"
+    assert isinstance(dragons[0].lair, Lair)
+    assert isinstance(dragons[0].lair.inventory, Inventory)
+    assert dragons[0].lair.inventory.gold == 1000
+    assert dragons[1].lair.name == "Castle"
+
+    # Streamed in batches
+    assert list(ComplexDragon.iter_aggregate(pipeline, batch_size=1)) == dragons
+
+    # Lists of references keep their order, dictionaries of references are
+    # dereferenced client side.
+    castle, cave, _ = Lair.many(sort=[("name", ASC)])
+    ComplexDragon.get_collection().update_one(
+        {"name": "Burt"}, {"$set": {"visited_lairs": [castle._id, cave._id], "misc": {"home": cave._id}}}
+    )
+    burt = ComplexDragon.aggregate(
+        Pipeline().match(Q.name == "Burt"),
+        projection={"name": True, "visited_lairs": {"$ref": Lair}, "misc": {"$ref": Lair}},
+    )[0]
+    assert [lair.name for lair in burt.visited_lairs] == ["Castle", "Cave"]
+    assert burt.misc["home"].name == "Cave"
+
+    # Results can be hydrated into another class or returned raw
+    assert ComplexDragon.aggregate(Pipeline().match(Q.name == "Albert"), hydrate=Dragon)[0].name == "Albert"
+    inventories = Lair.aggregate(
+        Pipeline().sort(SortBy(Q.name)).project({"_id": False, "gold": "$inventory.gold"}), hydrate=Inventory
+    )
+    assert [inventory.gold for inventory in inventories] == [2000, 1000, 3000]
+    assert ComplexDragon.aggregate(Pipeline().count("total"), hydrate=False) == [{"total": 3}]
+
+
 def test_with_options(mongo_client):
     """Flattern projection"""
 
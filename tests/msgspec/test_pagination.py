@@ -1,6 +1,12 @@
+import base64
+from typing import Optional
+from unittest.mock import patch
+
+import bson
 import pytest
 
-from mongospecs import DESC, Empty, Paginator, Q
+from mongospecs import DESC, Empty, KeysetPaginator, Paginator, Q
+from mongospecs.helpers.pagination import InvalidPage
 from mongospecs.msgspec import Spec
 
 from .fixtures import mongo_client  # noqa
@@ -17,6 +23,16 @@ class Orc(Spec):
     name: str = Empty
 
 
+class Goblin(Spec):
+    """
+    A goblin.
+    """
+
+    _collection = "Goblin"
+    name: str = Empty
+    rank: Optional[int] = None
+
+
 @pytest.fixture(scope="function")
 def example_dataset(mongo_client):
     """Connect to the database and create a set of example data (orcs)"""
@@ -67,6 +83,20 @@ def test_paginator_with_filter(example_dataset):
             i += 1
 
 
+def test_paginator_copies_filter(example_dataset):
+    """Paginate a copy of the filter the paginator was given"""
+    names = ["Orc 0001", "Orc 0002"]
+    filter = {"name": {"$in": names}}
+    paginator = Paginator(Orc, filter)
+    keyset_paginator = KeysetPaginator(Orc, filter, sort_by="name")
+
+    names.append("Orc 0003")
+    filter["name"] = "Orc 0004"
+    assert paginator.item_count == 2
+    assert [orc.name for orc in paginator[1]] == ["Orc 0001", "Orc 0002"]
+    assert [orc.name for orc in keyset_paginator.page()] == ["Orc 0001", "Orc 0002"]
+
+
 def test_paginator_with_sort(example_dataset):
     """Paginate all orcs but sort them in reverse"""
 
@@ -141,6 +171,163 @@ def test_paginator_with_orphans(example_dataset):
     assert len(paginator[4]) == 22
 
 
+def test_paginator_lazy_count(example_dataset):
+    """Paginate all orcs without counting them up front"""
+
+    with patch.object(Orc, "count", wraps=Orc.count) as count:
+        paginator = Paginator(Orc, Q.name >= "Orc 0918", orphans=2, count_mode="lazy")
+
+        i = 918
+        for page in paginator:
+            for orc in page:
+                assert orc.name == "Orc {0:04d}".format(i)
+                i += 1
+
+        # Check the last page holds the orphans and nothing was counted
+        assert i == 1000
+        assert page.number == 4
+        assert page.next is None
+        assert len(page) == 22
+        assert count.call_count == 0
+
+        # Check the total is counted when read
+        assert paginator.item_count == 82
+        assert paginator.page_count == 4
+        assert count.call_count == 1
+
+    # Check pages past the end are rejected
+    with pytest.raises(InvalidPage):
+        paginator[5]
+
+
+def test_paginator_estimated_count(example_dataset):
+    """Paginate all orcs using an estimated count"""
+
+    paginator = Paginator(Orc, count_mode="estimated")
+    assert paginator.item_count == 1000
+    assert paginator.page_count == 50
+
+    page = paginator[50]
+    assert page.next is None
+    assert page.prev == 49
+
+    with pytest.raises(ValueError):
+        Paginator(Orc, count_mode="guess")
+
+
+def test_paginator_count_ttl(example_dataset):
+    """Share the count between paginators for a time"""
+
+    with patch.object(Orc, "count", wraps=Orc.count) as count:
+        assert Paginator(Orc, Q.name >= "Orc 0900", count_ttl=60).item_count == 100
+        assert Paginator(Orc, Q.name >= "Orc 0900", count_ttl=60).item_count == 100
+        assert Paginator(Orc, Q.name >= "Orc 0950", count_ttl=60).item_count == 50
+        assert count.call_count == 2
+
+
+def test_paginator_with_prefetch(example_dataset):
+    """Paginate all orcs fetching pages ahead in the background"""
+
+    for count_mode in ("exact", "lazy"):
+        paginator = Paginator(Orc, Q.name >= "Orc 0918", orphans=2, prefetch=3, count_mode=count_mode)
+
+        i = 918
+        numbers = []
+        for page in paginator:
+            numbers.append(page.number)
+            for orc in page:
+                assert orc.name == "Orc {0:04d}".format(i)
+                i += 1
+
+        assert i == 1000
+        assert numbers == [1, 2, 3, 4]
+
+    # Check stopping early is safe
+    for page in Paginator(Orc, prefetch=2):
+        break
+    assert page.number == 1
+
+
+def test_keyset_paginator(example_dataset):
+    """Paginate all orcs by seeking from page to page"""
+
+    # Walk forwards through all orcs
+    paginator = KeysetPaginator(Orc, sort_by="name")
+
+    i = 0
+    pages = []
+    for page in paginator:
+        for orc in page:
+            assert orc.name == "Orc {0:04d}".format(i)
+            i += 1
+        pages.append(page)
+
+    assert i == 1000
+    assert len(pages) == 50
+    assert pages[0].prev_token is None
+    assert pages[-1].next_token is None
+    assert pages[-1].number == 50
+    assert pages[-1].offset == 980
+
+    # Walk backwards from the last page
+    page = paginator.page(pages[-1].prev_token)
+    assert page.number == 49
+    assert page.items[0].name == "Orc 0960"
+    assert page.items[-1].name == "Orc 0979"
+    assert page.next_token is not None
+
+    page = paginator.page(page.next_token)
+    assert page.number == 50
+    assert page.items[0].name == "Orc 0980"
+
+    # Check an invalid token is rejected
+    with pytest.raises(InvalidPage):
+        paginator.page("not-a-token")
+
+
+def test_keyset_paginator_with_filter_and_sort(example_dataset):
+    """Paginate the last 100 orcs in reverse by seeking from page to page"""
+
+    paginator = KeysetPaginator(Orc, Q.name >= "Orc 0900", per_page=30, sort_by="name", direction=DESC)
+
+    i = 999
+    for page in paginator:
+        for orc in page:
+            assert orc.name == "Orc {0:04d}".format(i)
+            i -= 1
+
+    assert i == 899
+    assert len(page) == 10
+
+
+def test_keyset_paginator_with_null_keys(mongo_client):
+    """Paginate across results with null (or missing) sort keys"""
+    for i, rank in enumerate([None, None, 3, 1, 2]):
+        Goblin(name=f"Goblin {i}", rank=rank).insert()
+    Goblin.get_collection().insert_one({"name": "Goblin 5"})
+
+    def names(page):
+        return [goblin.name[-1] for goblin in page]
+
+    # Null (and missing) keys sort before all others
+    paginator = KeysetPaginator(Goblin, per_page=2, sort_by="rank")
+    pages = list(paginator)
+    assert [names(page) for page in pages] == [["0", "1"], ["5", "3"], ["4", "2"]]
+
+    page = paginator.page(pages[-1].prev_token)
+    assert names(page) == ["5", "3"]
+    assert names(paginator.page(page.prev_token)) == ["0", "1"]
+
+    paginator = KeysetPaginator(Goblin, per_page=2, sort_by="rank", direction=DESC)
+    pages = list(paginator)
+    assert [names(page) for page in pages] == [["2", "4"], ["3", "5"], ["1", "0"]]
+    assert names(paginator.page(pages[-1].prev_token)) == ["3", "5"]
+
+    # Check a token without a seek position is rejected
+    with pytest.raises(InvalidPage):
+        paginator.page(base64.urlsafe_b64encode(bson.encode({"n": 2})).decode())
+
+
 # Page tests
 
 
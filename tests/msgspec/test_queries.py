@@ -2,7 +2,7 @@ from bson import ObjectId
 
 from mongospecs import All, And, ElemMatch, Exists, In, Nor, Not, NotIn, Or, Q, Size, SortBy, Type
 from mongospecs.msgspec import Spec
-from mongospecs.utils import to_refs
+from mongospecs.utils import copy_refs, to_refs
 
 
 def test_q():
@@ -139,3 +139,27 @@ def test_to_refs():
 
     # Convert a dictionary of Spec instances
     assert to_refs({1: Spec(_id=ids[0]), 2: Spec(_id=ids[1])}) == {1: ids[0], 2: ids[1]}
+
+
+def test_to_refs_copies_on_change():
+    """Should only copy lists and dictionaries that contain Spec instances"""
+
+    id = ObjectId()
+    value = {"a": [1, {"b": 2}], "c": {"d": "e"}}
+    assert to_refs(value) is value
+
+    value = {"a": [1, Spec(_id=id)], "c": {"d": "e"}}
+    refs = to_refs(value)
+    assert refs == {"a": [1, id], "c": {"d": "e"}}
+    assert refs is not value
+    assert refs["c"] is value["c"]
+    assert isinstance(value["a"][1], Spec)
+
+    # Tuples are converted to lists
+    assert to_refs((1, 2)) == [1, 2]
+
+    # Copies are always made by `copy_refs`
+    value = {"a": [1, {"b": 2}]}
+    refs = copy_refs(value)
+    assert refs == value
+    assert refs["a"] is not value["a"]
@@ -0,0 +1,52 @@
+from typing import Optional
+
+from pydantic import Field
+
+from mongospecs.pydantic import AsyncSpec, SubSpec
+
+__all__ = [
+    "AsyncDragon",
+    "AsyncInventory",
+    "AsyncLair",
+    "AsyncComplexDragon",
+]
+
+
+class AsyncDragon(AsyncSpec):
+    """
+    A dragon.
+    """
+
+    _collection = "Dragon"
+
+    name: str
+    breed: Optional[str] = None
+
+
+class AsyncInventory(SubSpec):
+    """
+    An inventory of items kept within a lair.
+    """
+
+    gold: int = 0
+    skulls: int = 0
+
+
+class AsyncLair(AsyncSpec):
+    """
+    A lair in which a dragon resides.
+    """
+
+    _collection = "Lair"
+
+    name: str = ""
+    inventory: AsyncInventory = Field(default_factory=AsyncInventory)
+
+
+class AsyncComplexDragon(AsyncDragon):
+    _collection = "ComplexDragon"
+
+    lair: AsyncLair = Field(default_factory=AsyncLair)
+    traits: list[str] = []
+
+    _default_projection = {"lair": {"$ref": AsyncLair, "inventory": {"$sub": AsyncInventory}}}
@@ -1,8 +1,11 @@
+import asyncio
 from datetime import datetime
 
 import pytest
 from mongomock import MongoClient
+from mongomock_motor import AsyncMongoMockClient
 
+from mongospecs.base import AsyncSpecBase
 from mongospecs.pydantic import Spec
 
 from .models import ComplexDragon, Inventory, Lair
@@ -23,6 +26,20 @@ def mongo_client(request):
     del Spec._client
 
 
+@pytest.fixture
+def async_mongo_client(request):
+    """Connect to the test database with an asyncio client"""
+
+    client = AsyncMongoMockClient()
+    AsyncSpecBase._client = client
+    AsyncSpecBase._db = client["mongospecs_test"]
+    yield client
+
+    asyncio.run(client.drop_database("mongospecs_test"))
+    AsyncSpecBase._client = None
+    AsyncSpecBase._db = None
+
+
 @pytest.fixture
 def example_dataset_one(request):
     """Create an example set of data that can be used in testing"""
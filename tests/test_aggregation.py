@@ -0,0 +1,106 @@
+from bson import ObjectId
+
+from mongospecs import DESC, In, Pipeline, Q, SortBy
+from mongospecs.helpers.aggregation import join_references
+
+from .msgspec.fixtures import mongo_client  # noqa
+from .msgspec.models import Inventory, Lair
+
+
+def test_pipeline():
+    """Should build a pipeline stage by stage"""
+    pipeline = (
+        Pipeline()
+        .match(In(Q.breed, ["Cold-drake", "Fire-drake"]))
+        .sort(SortBy(Q.dob.desc, Q.name))
+        .skip(10)
+        .limit(5)
+        .project({"name": True})
+    )
+
+    assert len(pipeline) == 5
+    assert pipeline.to_list() == [
+        {"$match": {"breed": {"$in": ["Cold-drake", "Fire-drake"]}}},
+        {"$sort": {"dob": DESC, "name": 1}},
+        {"$skip": 10},
+        {"$limit": 5},
+        {"$project": {"name": True}},
+    ]
+    assert list(pipeline) == pipeline.to_list()
+
+    # Stages are appended to a copy of the pipeline
+    base = Pipeline().match({"breed": "Cold-drake"})
+    assert len(base.limit(1)) == 2
+    assert len(base) == 1
+
+
+def test_pipeline_match_copies_filter():
+    """Should hold a copy of the filter matched on"""
+    breeds = ["Cold-drake"]
+    filter = {"breed": {"$in": breeds}}
+    pipeline = Pipeline().match(filter).match(In(Q.breed, breeds))
+
+    breeds.append("Fire-drake")
+    filter["name"] = "Burt"
+    assert pipeline.to_list() == [
+        {"$match": {"breed": {"$in": ["Cold-drake"]}}},
+        {"$match": {"breed": {"$in": ["Cold-drake"]}}},
+    ]
+
+
+def test_pipeline_stages():
+    """Should build each stage"""
+    cave = Lair(_id=ObjectId(), name="Cave")
+
+    assert Pipeline().match(Q.lair == cave).to_list() == [{"$match": {"lair": cave._id}}]
+    assert Pipeline().match(None).to_list() == [{"$match": {}}]
+    assert Pipeline().add_fields(age={"$subtract": [2000, "$year"]}).to_list() == [
+        {"$addFields": {"age": {"$subtract": [2000, "$year"]}}}
+    ]
+    assert Pipeline().group("$breed", total={"$sum": 1}).to_list() == [
+        {"$group": {"_id": "$breed", "total": {"$sum": 1}}}
+    ]
+    assert Pipeline().unwind("traits").to_list() == [{"$unwind": {"path": "$traits"}}]
+    assert Pipeline().unwind("traits", True).to_list() == [
+        {"$unwind": {"path": "$traits", "preserveNullAndEmptyArrays": True}}
+    ]
+    assert Pipeline().lookup("Lair", "lair", "_id", "lairs").to_list() == [
+        {"$lookup": {"from": "Lair", "localField": "lair", "foreignField": "_id", "as": "lairs"}}
+    ]
+    assert Pipeline().count("total").to_list() == [{"$count": "total"}]
+    assert Pipeline().facet(first=Pipeline().limit(1), rest=[{"$skip": 1}]).to_list() == [
+        {"$facet": {"first": [{"$limit": 1}], "rest": [{"$skip": 1}]}}
+    ]
+    assert Pipeline().stage({"$sample": {"size": 3}}).to_list() == [{"$sample": {"size": 3}}]
+
+
+def test_join_references(mongo_client):
+    """Should convert reference projections into `$lookup` stages"""
+    stages, joins = join_references(
+        {
+            "lair": {"$ref": Lair, "inventory": {"$sub": Inventory}},
+            "visited_lairs": {"$ref": Lair, "name": True},
+            "inventory": {"$sub": Inventory},
+        }
+    )
+
+    assert stages == [
+        {"$lookup": {"from": "Lair", "localField": "lair", "foreignField": "_id", "as": "__join_0"}},
+        {
+            "$lookup": {
+                "from": "Lair",
+                "localField": "visited_lairs",
+                "foreignField": "_id",
+                "as": "__join_1",
+                "pipeline": [{"$project": {"name": True}}],
+            }
+        },
+    ]
+    assert [(join.path, join.ref, join.field) for join in joins] == [
+        ("lair", Lair, "__join_0"),
+        ("visited_lairs", Lair, "__join_1"),
+    ]
+
+    # Documents not projected by the lookup are trimmed to the spec's fields
+    assert joins[0].fields == Lair.get_fields() | {"_id"}
+    assert joins[1].fields is None
@@ -0,0 +1,75 @@
+from unittest.mock import patch
+
+import pytest
+
+from mongospecs.helpers.cache import QueryCache, freeze
+
+
+def test_freeze():
+    """Should convert filters into hashable, key-order independent values"""
+    assert freeze({"a": 1, "b": [1, 2]}) == freeze({"b": [1, 2], "a": 1})
+    assert freeze({"a": {"$in": [1, 2]}}) != freeze({"a": {"$in": [2, 1]}})
+    hash(freeze({"a": {"$in": [1, 2]}, "b": ("x", "y")}))
+
+
+def test_get_and_set():
+    """Should record hits and misses"""
+    cache = QueryCache()
+
+    assert cache.get("key") == (False, None)
+    cache.set("key", None)
+    assert cache.get("key") == (True, None)
+
+    assert cache.stats == {"hits": 1, "misses": 1, "evictions": 0, "size": 1}
+
+
+def test_lru_eviction():
+    """Should evict the least recently used entry once full"""
+    cache = QueryCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    # Touch `a` so `b` becomes the least recently used entry
+    assert cache.get("a") == (True, 1)
+    cache.set("c", 3)
+
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1)
+    assert cache.get("c") == (True, 3)
+    assert cache.evictions == 1
+    assert len(cache) == 2
+
+
+def test_ttl():
+    """Should expire entries once their time to live has passed"""
+    cache = QueryCache(ttl=10)
+
+    with patch("mongospecs.helpers.cache.time.monotonic", return_value=100.0):
+        cache.set("a", 1)
+
+    with patch("mongospecs.helpers.cache.time.monotonic", return_value=105.0):
+        assert cache.get("a") == (True, 1)
+
+    with patch("mongospecs.helpers.cache.time.monotonic", return_value=111.0):
+        assert cache.get("a") == (False, None)
+
+    assert len(cache) == 0
+
+
+def test_ttl_per_entry():
+    """Should let an entry override the cache's time to live"""
+    cache = QueryCache()
+
+    with patch("mongospecs.helpers.cache.time.monotonic", return_value=100.0):
+        cache.set("a", 1, ttl=5)
+        cache.set("b", 2)
+
+    with patch("mongospecs.helpers.cache.time.monotonic", return_value=106.0):
+        assert cache.get("a") == (False, None)
+        assert cache.get("b") == (True, 2)
+
+
+def test_invalid_max_size():
+    """Should reject a cache that can't hold any entries"""
+    with pytest.raises(ValueError):
+        QueryCache(max_size=0)
@@ -0,0 +1,38 @@
+from mongospecs.helpers.changes import diff, discard_snapshot, get_snapshot, set_snapshot
+
+
+class Document:
+    """A weakly referenceable stand-in for a spec"""
+
+
+def test_diff():
+    """Should return changed values keyed by path"""
+    snapshot = {"name": "Cave", "inventory": {"gold": 1000, "skulls": 100}, "tags": ["a"], "size": 1}
+    document = {"name": "Cave", "inventory": {"gold": 2000, "skulls": 100}, "tags": ["a", "b"], "size": 1.0}
+
+    assert diff(snapshot, document) == {"inventory.gold": 2000, "tags": ["a", "b"], "size": 1.0}
+    assert diff(snapshot, snapshot) == {}
+
+
+def test_diff_embedded_documents():
+    """Should set embedded documents whole when keys have been removed from them"""
+    snapshot = {"inventory": {"gold": 1000, "skulls": 100}}
+
+    assert diff(snapshot, {"inventory": {"gold": 1000}}) == {"inventory": {"gold": 1000}}
+    assert diff(snapshot, {"inventory": {}}) == {"inventory": {}}
+    assert diff(snapshot, {"inventory": {"gold": 1000, "skulls": 100, "gems": 1}}) == {"inventory.gems": 1}
+    assert diff({}, {"name": "Cave"}) == {"name": "Cave"}
+
+
+def test_snapshots():
+    """Should store snapshots until the spec is discarded or collected"""
+    document = Document()
+    set_snapshot(document, {"name": "Cave"})
+    assert get_snapshot(document) == {"name": "Cave"}
+
+    discard_snapshot(document)
+    assert get_snapshot(document) is None
+
+    # Objects that can't be weakly referenced aren't tracked
+    set_snapshot({}, {"name": "Cave"})
+    assert get_snapshot({}) is None
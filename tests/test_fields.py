@@ -0,0 +1,56 @@
+import typing as t
+
+import pytest
+
+from mongospecs.helpers.fields import FieldPath, compile_path
+
+
+def test_compile_path():
+    """Should compile paths once"""
+    path = compile_path("a.b.c")
+    assert compile_path("a.b.c") is path
+    assert path.keys == ("a", "b", "c")
+    assert path.parent_keys == ("a", "b")
+    assert path.leaf == "c"
+
+
+@pytest.mark.parametrize(
+    "document, expected",
+    [
+        ({"a": {"b": {"c": 1}}}, 1),
+        ({"a": {"b": {}}}, None),
+        ({"a": {}}, None),
+        ({}, None),
+    ],
+)
+def test_get(document, expected):
+    assert FieldPath("a.b.c").get(document) == expected
+
+
+def test_set():
+    """Should set values paving the path as needed"""
+    document: dict[str, t.Any] = {"a": 1}
+    FieldPath("a.b.c").set(document, 2)
+    assert document == {"a": {"b": {"c": 2}}}
+
+    FieldPath("a.b.d").set(document, 3)
+    assert document == {"a": {"b": {"c": 2, "d": 3}}}
+
+
+def test_replace():
+    """Should replace values at existing paths"""
+    document = {"a": {"b": 1}}
+    FieldPath("a.b").replace(document, 2)
+    assert document == {"a": {"b": 2}}
+
+    with pytest.raises(KeyError):
+        FieldPath("x.y").replace(document, 2)
+
+
+def test_remove():
+    """Should remove values (if there are any)"""
+    document = {"a": {"b": 1, "c": 2}, "d": 3}
+    FieldPath("a.b").remove(document)
+    FieldPath("d.e").remove(document)
+    FieldPath("x.y").remove(document)
+    assert document == {"a": {"c": 2}, "d": 3}
@@ -0,0 +1,96 @@
+from unittest.mock import Mock
+
+from pymongo import ASCENDING
+
+from mongospecs.helpers.instrumentation import (
+    Instrumentation,
+    QueryListener,
+    QueryTiming,
+    Recording,
+    explain_command,
+)
+
+
+class Dragon:
+    pass
+
+
+def test_phases():
+    """Should time each phase of a read"""
+    recording = Recording(Instrumentation(), Dragon, "many", {"name": "Burt"})
+    with recording.phase("network"):
+        pass
+    with recording.phase("construct"):
+        pass
+
+    timing = recording.finish(3)
+    assert timing.documents == 3
+    assert timing.phases["network"] > 0
+    assert timing.phases["construct"] > 0
+    assert timing.phases["decode"] == 0
+    assert timing.duration >= sum(timing.phases.values())
+    assert not timing.slow
+
+
+def test_slow():
+    """Should flag reads that exceed the slow query threshold"""
+    assert Recording(Instrumentation(slow_query_threshold=0), Dragon, "one", {}).finish(1).slow
+    assert not Recording(Instrumentation(slow_query_threshold=60), Dragon, "one", {}).finish(1).slow
+
+
+def test_query_listener():
+    """Should attribute commands sent while fetching to the read"""
+    listener = QueryListener(forward=Mock())
+    event = Mock(command_name="find", request_id=1, duration_micros=1)
+
+    recording = Recording(Instrumentation(), Dragon, "many", {})
+    listener.succeeded(event)
+    with recording.phase("network"):
+        listener.started(event)
+        listener.succeeded(event)
+    with recording.phase("dereference"):
+        listener.succeeded(event)
+
+    assert recording.timing.commands == [
+        {"command_name": "find", "request_id": 1, "duration": 0.000001, "succeeded": True}
+    ]
+    assert listener.forward.succeeded.call_count == 3
+    listener.forward.started.assert_called_once_with(event)
+
+    # The time spent fetching is split into network and decoding time
+    timing = recording.finish(0)
+    assert timing.phases["network"] <= 0.000001
+    assert timing.phases["decode"] >= 0
+
+
+def test_explain_command():
+    """Should build the explain command for a read"""
+    timing = QueryTiming(Dragon, "one", {"name": "Burt"})
+    assert explain_command("Dragon", timing, {"projection": {"name": True}, "sort": [("name", ASCENDING)]}) == {
+        "explain": {
+            "find": "Dragon",
+            "filter": {"name": "Burt"},
+            "projection": {"name": True},
+            "sort": {"name": ASCENDING},
+            "limit": 1,
+        },
+        "verbosity": "queryPlanner",
+    }
+
+    timing = QueryTiming(Dragon, "ids", None)
+    assert explain_command("Dragon", timing, {"projection": {"_id": True}, "hint": [("_id", ASCENDING)]}) == {
+        "explain": {"find": "Dragon", "filter": {}, "projection": {"_id": True}, "hint": {"_id": ASCENDING}},
+        "verbosity": "queryPlanner",
+    }
+
+    timing = QueryTiming(Dragon, "count", None)
+    assert explain_command("Dragon", timing, {}) == {
+        "explain": {"count": "Dragon", "query": {}},
+        "verbosity": "queryPlanner",
+    }
+
+    timing = QueryTiming(Dragon, "distinct", {"name": "Burt"})
+    assert explain_command("Dragon", timing, {"key": "breed"}) == {
+        "explain": {"distinct": "Dragon", "key": "breed", "query": {"name": "Burt"}},
+        "verbosity": "queryPlanner",
+    }
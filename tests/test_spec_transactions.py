@@ -1,9 +1,10 @@
-from unittest.mock import MagicMock, patch
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from pymongo.errors import ConnectionFailure, OperationFailure
 
-from mongospecs.pydantic import Spec
+from mongospecs.pydantic import AsyncSpec, Spec
 
 
 @pytest.fixture
@@ -95,6 +96,16 @@ def test_missing_client():
             pass
 
 
+def test_bulk_uses_transaction(mock_client):
+    """Test that a bulk flush can be made inside a transaction."""
+    with Spec.bulk(transaction=True) as bulk:
+        bulk.insert(Spec())
+
+    mock_client.verify_operation_used_session("bulk_write")
+    mock_client.mock_session.commit_transaction.assert_called_once()
+    mock_client.mock_session.end_session.assert_called_once()
+
+
 def test_transaction_signals_committed(mock_client):
     """Test that transaction signals are emitted correctly."""
     committed_signal_received = []
@@ -134,3 +145,51 @@ def test_transaction_signals_aborted(mock_client):
     assert aborted_signal_received[0] == Spec
 
     Spec.stop_listening("transaction_aborted", abort_commit)
+
+
+@pytest.fixture
+def mock_async_client():
+    """Fixture to create a mock asyncio MongoDB client (motor style)."""
+    mock_client = MagicMock()
+    mock_session = MagicMock()
+    mock_session.commit_transaction = AsyncMock()
+    mock_session.abort_transaction = AsyncMock()
+    mock_session.end_session = AsyncMock()
+    mock_client.start_session = AsyncMock(return_value=mock_session)
+    mock_client.mock_session = mock_session
+
+    AsyncSpec._client = mock_client
+    yield mock_client
+    AsyncSpec._client = None
+
+
+def test_async_transaction_success(mock_async_client):
+    """Test that an async transaction can be successfully committed."""
+
+    async def run():
+        async with AsyncSpec.transaction() as session:
+            session.commit_transaction.assert_not_called()
+
+    asyncio.run(run())
+
+    session = mock_async_client.mock_session
+    session.start_transaction.assert_called_once()
+    session.commit_transaction.assert_awaited_once()
+    session.end_session.assert_awaited_once()
+
+
+@pytest.mark.parametrize("exception", [OperationFailure, ConnectionFailure])
+def test_async_transaction_abort(mock_async_client, exception):
+    """Test that an async transaction is aborted on error."""
+
+    async def run():
+        async with AsyncSpec.transaction():
+            raise exception("Simulated failure")
+
+    with pytest.raises(exception):
+        asyncio.run(run())
+
+    session = mock_async_client.mock_session
+    session.abort_transaction.assert_awaited_once()
+    session.commit_transaction.assert_not_called()
+    session.end_session.assert_awaited_once()
@@ -0,0 +1,61 @@
+import pytest
+
+from mongospecs import And, ElemMatch, In, Param, Q, compile_query
+from mongospecs.helpers.templates import BoundQuery
+from mongospecs.utils import to_refs
+
+
+def test_compile_query():
+    """Should compile a query expression into a template"""
+    template = compile_query(And(Q.name == Param("name"), In(Q.breed, Param("breeds")), Q.age > 10))
+
+    assert template.params == {"name", "breeds"}
+    assert template.filter == {
+        "$and": [{"name": Param("name")}, {"breed": {"$in": Param("breeds")}}, {"age": {"$gt": 10}}]
+    }
+
+
+def test_bind():
+    """Should replace placeholders with parameters, copying only what's changed"""
+    template = compile_query(And(Q.name == Param("name"), Q.age > 10, ElemMatch(Q.lairs, Q.name == Param("lair"))))
+
+    bound = template(name="Burt", lair="Cave")
+    assert isinstance(bound, BoundQuery)
+    assert bound == {"$and": [{"name": "Burt"}, {"age": {"$gt": 10}}, {"lairs": {"$elemMatch": {"name": "Cave"}}}]}
+    assert template.bind(name="Fred", lair="Castle")["$and"][0] == {"name": "Fred"}
+
+    # The template is left unchanged and unchanged parts are shared
+    assert template.filter["$and"][0] == {"name": Param("name")}
+    assert bound["$and"][1] is template.filter["$and"][1]
+
+    # Bound queries are used as is by `to_refs`
+    assert to_refs(bound) is bound
+
+
+def test_bind_errors():
+    """Should require exactly the template's parameters"""
+    template = compile_query(Q.name == Param("name"))
+
+    with pytest.raises(ValueError, match="Missing query parameters: name"):
+        template()
+
+    with pytest.raises(ValueError, match="Unexpected query parameters: age"):
+        template(name="Burt", age=10)
+
+
+def test_no_params():
+    """Should bind templates without placeholders"""
+    template = compile_query({"name": "Burt"})
+    assert template.params == set()
+    assert template() == {"name": "Burt"}
+    assert compile_query(None)() == {}
+
+
+def test_copies_filter():
+    """Should hold a copy of the filter it's compiled from"""
+    filter = {"name": Param("name"), "breed": {"$in": ["Cold-drake"]}}
+    template = compile_query(filter)
+
+    filter["breed"]["$in"].append("Fire-drake")
+    filter["age"] = 10
+    assert template(name="Burt") == {"name": "Burt", "breed": {"$in": ["Cold-drake"]}}